@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+"""Compare the speed and accuracy of the raster and polygon Regionalizers.
+
+Requires the global tectonic and oceanic grids in the data folder (see
+strec/data/REGION_GRIDS_README.txt).
+
+Usage: python benchmarks/regionalizer.py [NEVENTS [DATAFOLDER]]
+"""
+
+# stdlib imports
+import sys
+import time
+
+# third party imports
+import numpy as np
+
+# local imports
+from strec.gmreg import Regionalizer, PolygonRegionalizer
+from strec.utils import get_config
+
+DISTANCE_COLUMNS = ['DistanceToStable', 'DistanceToActive',
+                    'DistanceToSubduction', 'DistanceToVolcanic',
+                    'DistanceToOceanic', 'DistanceToContinental']
+
+
+def get_regions(regionalizer, lats, lons):
+    t1 = time.perf_counter()
+    results = [regionalizer.getRegions(lat, lon, 10.0)
+               for lat, lon in zip(lats, lons)]
+    elapsed = time.perf_counter() - t1
+    return (results, elapsed)
+
+
+def main(nevents, datafolder):
+    np.random.seed(1)
+    lats = np.degrees(np.arcsin(np.random.uniform(-1, 1, nevents)))
+    lons = np.random.uniform(-180, 180, nevents)
+
+    t1 = time.perf_counter()
+    polygon_regionalizer = PolygonRegionalizer(datafolder)
+    print('polygon engine loaded in %.2f s' % (time.perf_counter() - t1))
+
+    raster, raster_time = get_regions(Regionalizer(datafolder), lats, lons)
+    polygon, polygon_time = get_regions(polygon_regionalizer, lats, lons)
+    for name, elapsed in [('raster', raster_time), ('polygon', polygon_time)]:
+        print('%-8s %10.2f ms/event %8.1fx' %
+              (name, elapsed / nevents * 1e3, raster_time / elapsed))
+
+    same = np.mean([r1['TectonicRegion'] == r2['TectonicRegion'] and
+                    r1['Oceanic'] == r2['Oceanic']
+                    for r1, r2 in zip(raster, polygon)])
+    print('same TectonicRegion and Oceanic for %.1f%% of events' % (same * 100))
+    for column in DISTANCE_COLUMNS:
+        d1 = np.array([r[column] for r in raster])
+        d2 = np.array([r[column] for r in polygon])
+        finite = np.isfinite(d1) & np.isfinite(d2)
+        # distances of zero in one engine and not the other are included
+        diffs = np.abs(d1[finite] - d2[finite])
+        nmismatch = np.sum(np.isfinite(d1) != np.isfinite(d2))
+        if not len(diffs):
+            diffs = np.array([np.nan])
+        print('%-22s median %6.2f km, 95%% %6.2f km, max %7.2f km, '
+              '%i finite/inf mismatches' %
+              (column, np.median(diffs), np.percentile(diffs, 95),
+               np.max(diffs), nmismatch))
+
+
+if __name__ == '__main__':
+    nevents = 500
+    if len(sys.argv) > 1:
+        nevents = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        datafolder = sys.argv[2]
+    else:
+        datafolder = get_config()['DATA']['folder']
+    main(nevents, datafolder)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+"""Compare per-point slab grid lookups using Grid2D.getValue() with GridSampler.
+
+Usage: python benchmarks/slab_sampler.py [NPOINTS]
+"""
+
+# stdlib imports
+import os.path
+import sys
+import time
+
+# third party imports
+from mapio.gmt import GMTGrid
+import numpy as np
+
+# local imports
+from strec.slab import GridSampler
+
+SLAB_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           '..', 'strec', 'data', 'slabs')
+REGION = 'kur_slab2_%s_02.24.18.grd'
+
+
+def sample_getvalue(grids, lats, lons):
+    # four Grid2D.getValue() calls per point, as GridSlab.getSlabInfo() did
+    for lat, lon in zip(lats, lons):
+        for grid in grids:
+            grid.getValue(lat, lon)
+
+
+def sample_sampler(grids, lats, lons, method):
+    # one GridSampler per point, shared by all four grids
+    gdict = grids[0].getGeoDict()
+    layers = [grid.getData() for grid in grids]
+    for lat, lon in zip(lats, lons):
+        sampler = GridSampler(gdict, lat, lon, method=method)
+        for data in layers:
+            sampler.sample(data)
+
+
+def sample_batch(grids, lats, lons, method):
+    # one GridSampler for all points
+    gdict = grids[0].getGeoDict()
+    layers = [grid.getData() for grid in grids]
+    sampler = GridSampler(gdict, lats, lons, method=method)
+    for data in layers:
+        sampler.sample(data)
+
+
+def main(npoints):
+    grids = [GMTGrid.load(os.path.join(SLAB_FOLDER, REGION % layer))
+             for layer in ['dep', 'dip', 'str', 'unc']]
+    gdict = grids[0].getGeoDict()
+    np.random.seed(1)
+    lats = np.random.uniform(gdict.ymin, gdict.ymax, npoints)
+    lons = np.random.uniform(gdict.xmin, gdict.xmax, npoints)
+
+    runs = [('getValue', lambda: sample_getvalue(grids, lats, lons)),
+            ('sampler nearest', lambda: sample_sampler(grids, lats, lons, 'nearest')),
+            ('sampler bilinear', lambda: sample_sampler(grids, lats, lons, 'bilinear')),
+            ('batch nearest', lambda: sample_batch(grids, lats, lons, 'nearest')),
+            ('batch bilinear', lambda: sample_batch(grids, lats, lons, 'bilinear'))]
+    baseline = None
+    for name, run in runs:
+        t1 = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - t1
+        per_point = elapsed / npoints * 1e6
+        if baseline is None:
+            baseline = per_point
+        print('%-18s %10.2f us/point %8.1fx' % (name, per_point, baseline / per_point))
+
+
+if __name__ == '__main__':
+    npoints = 20000
+    if len(sys.argv) > 1:
+        npoints = int(sys.argv[1])
+    main(npoints)
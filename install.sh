@@ -40,7 +40,7 @@ package_list=(
     "pytest-cov"
     "python>=3.8"
     "rasterio"
-    "shapely>=1.7.1"
+    "shapely>=2.0"
     "xlrd"
     "xlwt"
 )
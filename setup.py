@@ -13,7 +13,7 @@ setup(name='STREC',
       author_email='mhearne@usgs.gov, emthompson@usgs.gov, cbworden@usgs.gov',
       url='https://github.com/usgs/strec/',
       packages=['strec'],
-      scripts=['bin/subselect'],
+      scripts=['bin/subselect', 'bin/strec_cache'],
       package_data={'strec': ['data/*.csv', 'data/*.txt',
                               'data/*.ini', 'data/*.json',
                               'data/*.geojson', 'data/*.grd',
@@ -2,16 +2,25 @@
 
 # stdlib imports
 import os.path
+import json
 from collections import OrderedDict
 
 # third party
 import numpy as np
 import pandas as pd
-from mapio.geodict import GeoDict
+import shapely
+from shapely.geometry import shape
+from mapio.geodict import GeoDict, geodict_from_affine
+from mapio.grid2d import Grid2D
 from mapio.reader import read
+import rasterio
+from rasterio.windows import Window
+from scipy.ndimage import distance_transform_cdt
+from scipy.spatial import cKDTree
 
 # local imports
 from strec.utils import get_config
+from strec.slab import GridCache
 
 # As we add more layers, define their name/file mappings here.
 # All of these files have polygons where the attribute is true.
@@ -25,6 +34,99 @@ OCEANIC_REGIONS = {1: 'DistanceToOceanic',
 DX = DY = 0.0083333333
 XSPAN = YSPAN = 4.0
 
+# size (decimal degrees) of the tiles that the tectonic and oceanic grids are
+# read and cached in, and the default memory budget (bytes) of the tile cache.
+TILE_SIZE = 1.0
+TILE_CACHE_BYTES = 128 * 1024 * 1024
+
+# widths (decimal degrees) of the windows searched for each region type before
+# searching the whole XSPAN x YSPAN window
+WINDOW_STEPS = [0.25, 0.5, 1.0, 2.0]
+
+# global rasters of tectonic region codes and oceanic flags
+TECTONIC_GRID = 'tectonic_global.grd'
+OCEANIC_GRID = 'oceanic_global.grd'
+
+# mean radius of the earth (km)
+EARTH_RADIUS = 6371.0
+
+# names of the raw file holding the global distance rasters to each tectonic
+# and oceanic region type, and of the JSON header describing it.  Distances
+# are stored as uint16 counts of DISTANCE_SCALE km, and DISTANCE_NODATA marks
+# cells farther from a region type than the largest distance that can be
+# stored.
+DISTANCE_FILE = 'region_distances.bin'
+DISTANCE_HEADER_FILE = 'region_distances.json'
+DISTANCE_SCALE = 0.1
+DISTANCE_NODATA = 65535
+
+# distance fields, in the order they are stored in the distance rasters, and
+# the region code each of them refers to in the tectonic or oceanic grid.
+DISTANCE_FIELDS = (list(TECTONIC_REGIONS.values()) +
+                   list(OCEANIC_REGIONS.values()))
+DISTANCE_CODES = (list(TECTONIC_REGIONS.keys()) +
+                  list(OCEANIC_REGIONS.keys()))
+
+# number of grid rows processed at a time when computing distance rasters
+DISTANCE_BLOCK_ROWS = 120
+
+# name of the file caching the edge cells of each tectonic and oceanic
+# region type
+REGION_TREE_FILE = 'region_boundaries.npz'
+
+# name of the file holding summaries of the TILE_SIZE tiles of the tectonic
+# and oceanic grids: the region codes present in each tile, and the distance
+# in tiles (up to TILE_REACH_MAX) to the nearest tile with each region code.
+REGION_TILE_FILE = 'region_tiles.npz'
+TILE_REACH_MAX = 255
+
+# number of grid cells between an epicenter and the edges of its tile for the
+# tile to give the region code at the epicenter
+TILE_MARGIN = 3
+
+# region code given to the cells of the tectonic and oceanic grids with no
+# data, in their raw uint8 copies, the packed raster and the tile summaries.
+# It is not a code of TECTONIC_REGIONS or OCEANIC_REGIONS, and fits in the
+# three bits of a tectonic region code in the packed raster.
+REGION_NODATA = 7
+
+# extensions of the raw uint8 copies of the tectonic and oceanic grids, and
+# of the JSON headers describing them
+REGION_CODE_EXT = '.bin'
+REGION_CODE_HEADER_EXT = '.json'
+
+# names of the raw file holding the tectonic region codes and oceanic flags
+# packed together, and of the JSON header describing it.  Each cell is packed
+# into a nibble (tectonic region code in the low three bits, oceanic flag in
+# the high bit), with even columns in the low nibble of each byte.  Cells
+# with no data in either grid are packed as REGION_TYPE_NODATA.
+REGION_TYPE_FILE = 'region_types.bin'
+REGION_TYPE_HEADER_FILE = 'region_types.json'
+REGION_TYPE_NODATA = 0x0F
+
+# tectonic region type of each tectonic region code, and the labels returned
+# when only region types are requested
+TECTONIC_TYPES = {1: 'Stable', 2: 'Active', 3: 'Volcanic', 4: 'Subduction'}
+REGION_TYPE_LABELS = pd.Index(['TectonicRegion', 'Oceanic'])
+
+# labels returned by Regionalizer.getRegions()
+REGION_COLUMNS = ['TectonicRegion', 'DistanceToStable', 'DistanceToActive',
+                  'DistanceToSubduction', 'DistanceToVolcanic', 'Oceanic',
+                  'DistanceToOceanic', 'DistanceToContinental']
+
+# polygons of the tectonic region types, in the order they are rasterized into
+# the tectonic grid (so that later types take precedence where they overlap),
+# and of oceanic regions.
+TECTONIC_POLYGONS = OrderedDict([(1, 'stable.geojson'),
+                                 (2, 'active.geojson'),
+                                 (3, 'volcanic.geojson'),
+                                 (4, 'subduction.geojson')])
+OCEANIC_POLYGONS = 'ocean.geojson'
+
+# size (decimal degrees) of the tiles that region polygons are split into, so
+# that only small pieces of them are searched for each event.
+POLYGON_TILE_SIZE = 10.0
+
 # for each of the above regions, when we're inside a polygon, we should
 # capture the field below as the "Tectonic Domain".
 DOMAIN_FIELD = 'REGIME_TYP'
@@ -62,9 +164,867 @@ def geodetic_distance(lon1, lat1, lon2, lat2):
     return distance
 
 
+def _get_source_stamp(grid_file):
+    stat = os.stat(grid_file)
+    return {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+
+def _is_global(gdict):
+    return abs(gdict.nx * gdict.dx - 360.0) < gdict.dx / 2
+
+
+def _get_geodict_header(gdict):
+    return {'xmin': gdict.xmin, 'xmax': gdict.xmax,
+            'ymin': gdict.ymin, 'ymax': gdict.ymax,
+            'dx': gdict.dx, 'dy': gdict.dy,
+            'nx': gdict.nx, 'ny': gdict.ny}
+
+
+def _get_unit_vectors(lats, lons):
+    # cartesian coordinates of points on the unit sphere
+    lats = np.radians(lats)
+    lons = np.radians(lons)
+    coslat = np.cos(lats)
+    return np.column_stack([coslat * np.cos(lons),
+                            coslat * np.sin(lons),
+                            np.sin(lats)])
+
+
+def get_pixel_index(gdict, lats, lons):
+    """Return the row and column of the grid cells containing points.
+
+    Points outside of the grid are assigned to the nearest edge cell, and
+    longitudes wrap around on global grids.
+
+    Args:
+        gdict (GeoDict): GeoDict describing a pixel registered grid.
+        lats (float or ndarray): Latitudes in decimal degrees.
+        lons (float or ndarray): Longitudes in decimal degrees.
+    Returns:
+        tuple: (rows, columns) as integers or integer arrays.
+    """
+    rows = np.round((gdict.ymax - np.asarray(lats)) / gdict.dy).astype(int)
+    rows = np.clip(rows, 0, gdict.ny - 1)
+    cols = np.round((np.asarray(lons) - gdict.xmin) / gdict.dx).astype(int)
+    if _is_global(gdict):
+        cols = cols % gdict.nx
+    else:
+        cols = np.clip(cols, 0, gdict.nx - 1)
+    return (rows, cols)
+
+
+def get_window_cell(gdict, lat, lon):
+    """Return the row and column of the cell of a grid window containing a point.
+
+    Points outside of the window are assigned to the nearest edge cell.  The
+    window may cross the antimeridian, but is not global (see
+    get_pixel_index()).
+
+    Args:
+        gdict (GeoDict): GeoDict describing a pixel registered grid window.
+        lat (float): Latitude in decimal degrees.
+        lon (float): Longitude in decimal degrees.
+    Returns:
+        tuple: (row, column) as integers.
+    """
+    dlon = np.mod(lon - gdict.xmin + 180, 360) - 180
+    row = int(np.clip(np.round((gdict.ymax - lat) / gdict.dy), 0, gdict.ny - 1))
+    col = int(np.clip(np.round(dlon / gdict.dx), 0, gdict.nx - 1))
+    return (row, col)
+
+
+def compute_region_boundary(data, code, wrap=False):
+    """Find the cells of a region type that border cells of other types.
+
+    Args:
+        data (ndarray): 2D array of region codes.
+        code (int): Region code.
+        wrap (bool): True if the first and last columns of data are
+            neighbours (i.e., data is a global grid).
+    Returns:
+        ndarray: Boolean array, True for cells of type code with at least one
+                 of their four neighbours of another type.  Cells outside of
+                 data are treated as being of type code.
+    """
+    inside = data == code
+    padded = np.pad(inside, 1, mode='edge')
+    if wrap:
+        padded[1:-1, 0] = inside[:, -1]
+        padded[1:-1, -1] = inside[:, 0]
+    border = ~padded[:-2, 1:-1] | ~padded[2:, 1:-1]
+    border |= ~padded[1:-1, :-2] | ~padded[1:-1, 2:]
+    return inside & border
+
+
+def _get_chord_distance(chords):
+    # great circle distance (km) from chord length on the unit sphere
+    return 2 * EARTH_RADIUS * np.arcsin(np.minimum(chords / 2, 1))
+
+
+def _get_boundary_points(data, gdict, code):
+    # latitudes and longitudes of the cells on the edges of a region type
+    boundary = compute_region_boundary(data, code, wrap=_is_global(gdict))
+    brows, bcols = np.nonzero(boundary)
+    return (gdict.ymax - brows * gdict.dy, gdict.xmin + bcols * gdict.dx)
+
+
+def get_boundary_tree(data, gdict, code):
+    """Make a KD-tree of the cells on the edges of a region type.
+
+    Args:
+        data (ndarray): 2D array of region codes.
+        gdict (GeoDict): GeoDict describing data.
+        code (int): Region code.
+    Returns:
+        cKDTree: KD-tree of the positions of the edge cells on the unit
+                 sphere, or None if there are no cells of type code.
+    """
+    blats, blons = _get_boundary_points(data, gdict, code)
+    if not len(blats):
+        return None
+    return cKDTree(_get_unit_vectors(blats, blons))
+
+
+def compute_distance_raster(data, gdict, code, out=None, tree=None,
+                            block_rows=DISTANCE_BLOCK_ROWS):
+    """Compute the great circle distance from each cell to a region type.
+
+    Distances are measured between cell centers on a sphere of radius
+    EARTH_RADIUS, to the nearest cell of the region type.  Only cells on the
+    edges of the region are searched, using a KD-tree of their positions on
+    the unit sphere.
+
+    Args:
+        data (ndarray): 2D array of region codes.
+        gdict (GeoDict): GeoDict describing data.
+        code (int): Region code.
+        out (ndarray): uint16 array the same shape as data to hold the
+            result, or None to allocate a new one.
+        tree (cKDTree): Tree returned by get_boundary_tree() for this region
+            type, or None to make one.
+        block_rows (int): Number of rows of data to process at a time.
+    Returns:
+        ndarray: uint16 array of distances in counts of DISTANCE_SCALE km,
+                 DISTANCE_NODATA where the region type is farther away than
+                 can be stored.
+    """
+    ny, nx = data.shape
+    if out is None:
+        out = np.empty((ny, nx), dtype=np.uint16)
+    if tree is None:
+        tree = get_boundary_tree(data, gdict, code)
+    if tree is None:
+        out[:] = DISTANCE_NODATA
+        out[data == code] = 0
+        return out
+    max_distance = (DISTANCE_NODATA - 1) * DISTANCE_SCALE
+    max_chord = 2 * np.sin(min(max_distance / (2 * EARTH_RADIUS), np.pi / 2))
+    lons = gdict.xmin + np.arange(nx) * gdict.dx
+    for row0 in range(0, ny, block_rows):
+        row1 = min(row0 + block_rows, ny)
+        block = np.zeros((row1 - row0, nx), dtype=np.uint16)
+        rows, cols = np.nonzero(data[row0:row1] != code)
+        if len(rows):
+            points = _get_unit_vectors(gdict.ymax - (rows + row0) * gdict.dy,
+                                       lons[cols])
+            chords, _ = tree.query(points, distance_upper_bound=max_chord,
+                                   workers=-1)
+            far = ~np.isfinite(chords)
+            chords[far] = 0
+            counts = np.round(_get_chord_distance(chords) / DISTANCE_SCALE)
+            counts[far | (counts >= DISTANCE_NODATA)] = DISTANCE_NODATA
+            block[rows, cols] = counts
+        out[row0:row1] = block
+    return out
+
+
+def _get_region_sources(datafolder):
+    return {grid_name: _get_source_stamp(os.path.join(datafolder, grid_name))
+            for grid_name in [TECTONIC_GRID, OCEANIC_GRID]}
+
+
+def _check_region_sources(datafolder, sources):
+    # derived files are stale if either source grid has changed since they
+    # were made.
+    for grid_name, stamp in sources.items():
+        grid_file = os.path.join(datafolder, grid_name)
+        if not os.path.isfile(grid_file) or _get_source_stamp(grid_file) != stamp:
+            return False
+    return True
+
+
+def _load_region_grid(grid_file):
+    # region codes of a tectonic or oceanic grid, with REGION_NODATA where the
+    # grid has no data
+    grid = read(grid_file)
+    data = grid.getData()
+    data[np.isnan(data)] = REGION_NODATA
+    return (data.astype(np.uint8), grid.getGeoDict())
+
+
+def build_region_distances(datafolder):
+    """Write global distance rasters to each tectonic and oceanic region type.
+
+    The rasters are computed from the tectonic and oceanic grids in
+    datafolder, and written as a raw uint16 file with one band per field in
+    DISTANCE_FIELDS (DISTANCE_FILE), plus a JSON header (DISTANCE_HEADER_FILE).
+    For the global grids, this takes a long time and about 11 GB of disk.
+
+    Args:
+        datafolder (str): Path to directory containing the tectonic and
+            oceanic grids.
+    Returns:
+        str: Path to distance raster file.
+    Raises:
+        ValueError: If the tectonic and oceanic grids do not have the same
+            dimensions.
+    """
+    tectonic_file = os.path.join(datafolder, TECTONIC_GRID)
+    oceanic_file = os.path.join(datafolder, OCEANIC_GRID)
+    tectonic, gd = _load_region_grid(tectonic_file)
+    oceanic, ogd = _load_region_grid(oceanic_file)
+    if tectonic.shape != oceanic.shape:
+        raise ValueError('Tectonic and oceanic grids have different dimensions.')
+    data_file = os.path.join(datafolder, DISTANCE_FILE)
+    header_file = os.path.join(datafolder, DISTANCE_HEADER_FILE)
+    tmp_data_file = data_file + '.tmp'
+    tmp_header_file = header_file + '.tmp'
+    distances = np.memmap(tmp_data_file, dtype=np.uint16, mode='w+',
+                          shape=(len(DISTANCE_FIELDS),) + tectonic.shape)
+    band = 0
+    for data, regions in [(tectonic, TECTONIC_REGIONS),
+                          (oceanic, OCEANIC_REGIONS)]:
+        for code in regions.keys():
+            compute_distance_raster(data, gd, code, out=distances[band])
+            band += 1
+    distances.flush()
+    del distances
+    header = _get_geodict_header(gd)
+    header.update({'fields': DISTANCE_FIELDS,
+                   'scale': DISTANCE_SCALE,
+                   'nodata': DISTANCE_NODATA,
+                   'sources': _get_region_sources(datafolder)})
+    with open(tmp_header_file, 'wt') as f:
+        json.dump(header, f)
+    os.replace(tmp_data_file, data_file)
+    os.replace(tmp_header_file, header_file)
+    return data_file
+
+
+def read_region_distances(datafolder):
+    """Memory map the distance rasters written by build_region_distances().
+
+    Args:
+        datafolder (str): Path to directory containing the tectonic and
+            oceanic grids.
+    Returns:
+        tuple: (Read-only uint16 memmap of distance counts, with one band per
+               field in DISTANCE_FIELDS, GeoDict), or None if there are no up
+               to date distance rasters in datafolder.
+    """
+    data_file = os.path.join(datafolder, DISTANCE_FILE)
+    header_file = os.path.join(datafolder, DISTANCE_HEADER_FILE)
+    if not os.path.isfile(data_file) or not os.path.isfile(header_file):
+        return None
+    with open(header_file, 'rt') as f:
+        header = json.load(f)
+    if header['fields'] != DISTANCE_FIELDS:
+        return None
+    if not _check_region_sources(datafolder, header['sources']):
+        return None
+    keys = ['xmin', 'xmax', 'ymin', 'ymax', 'dx', 'dy', 'nx', 'ny']
+    gdict = GeoDict({key: header[key] for key in keys})
+    data = np.memmap(data_file, dtype=np.uint16, mode='r',
+                     shape=(len(DISTANCE_FIELDS), gdict.ny, gdict.nx))
+    return (data, gdict)
+
+
+def build_region_boundaries(datafolder):
+    """Write the edges of each tectonic and oceanic region type.
+
+    The latitudes and longitudes of the edge cells of each region type in the
+    tectonic and oceanic grids in datafolder are saved to REGION_TREE_FILE,
+    from which read_region_boundaries() makes the same KD-trees as
+    get_boundary_tree().
+
+    Args:
+        datafolder (str): Path to directory containing the tectonic and
+            oceanic grids.
+    Returns:
+        str: Path to boundary file.
+    """
+    arrays = {}
+    for grid_name, regions in [(TECTONIC_GRID, TECTONIC_REGIONS),
+                               (OCEANIC_GRID, OCEANIC_REGIONS)]:
+        data, gd = _load_region_grid(os.path.join(datafolder, grid_name))
+        for code, field in regions.items():
+            blats, blons = _get_boundary_points(data, gd, code)
+            arrays[field + '_lats'] = blats
+            arrays[field + '_lons'] = blons
+        del data
+    tree_file = os.path.join(datafolder, REGION_TREE_FILE)
+    tmp_file = tree_file + '.tmp.npz'
+    np.savez(tmp_file,
+             sources=json.dumps(_get_region_sources(datafolder)),
+             fields=json.dumps(DISTANCE_FIELDS),
+             **arrays)
+    os.replace(tmp_file, tree_file)
+    return tree_file
+
+
+def read_region_boundaries(datafolder):
+    """Make KD-trees of the edges written by build_region_boundaries().
+
+    Args:
+        datafolder (str): Path to directory containing the tectonic and
+            oceanic grids.
+    Returns:
+        list: cKDTree (or None, for region types not in the grids) for each
+              field in DISTANCE_FIELDS, or None if there are no up to date
+              edges in datafolder.
+    """
+    tree_file = os.path.join(datafolder, REGION_TREE_FILE)
+    if not os.path.isfile(tree_file):
+        return None
+    with np.load(tree_file, allow_pickle=False) as npz:
+        if json.loads(str(npz['fields'])) != DISTANCE_FIELDS:
+            return None
+        if not _check_region_sources(datafolder,
+                                     json.loads(str(npz['sources']))):
+            return None
+        trees = []
+        for field in DISTANCE_FIELDS:
+            blats = npz[field + '_lats']
+            if not len(blats):
+                trees.append(None)
+                continue
+            trees.append(cKDTree(_get_unit_vectors(blats,
+                                                   npz[field + '_lons'])))
+    return trees
+
+
+def compute_region_tiles(data, tile_cells, codes, wrap=False):
+    """Summarize the region codes in each tile of a tectonic or oceanic grid.
+
+    Args:
+        data (ndarray): 2D array of region codes.
+        tile_cells (int): Number of grid rows and columns in each tile.
+        codes (list): Region codes (0-7).
+        wrap (bool): True if columns wrap around (global grids).
+    Returns:
+        tuple: (2D uint8 array of bitmasks, with bit 1 << code set for each
+               region code present in the tile, 3D uint8 array of the
+               chessboard distance in tiles from each tile to the nearest
+               tile containing each code in codes, TILE_REACH_MAX where there
+               is none).
+    """
+    ny, nx = data.shape
+    nty = -(-ny // tile_cells)
+    ntx = -(-nx // tile_cells)
+    classes = np.zeros((nty, ntx), dtype=np.uint8)
+    for tile_row in range(nty):
+        rows = data[tile_row * tile_cells:(tile_row + 1) * tile_cells]
+        for code in codes:
+            present = np.zeros(ntx * tile_cells, dtype=bool)
+            present[:nx] = (rows == code).any(axis=0)
+            present = present.reshape(ntx, tile_cells).any(axis=1)
+            classes[tile_row, present] |= np.uint8(1 << code)
+    reach = np.full((len(codes), nty, ntx), TILE_REACH_MAX, dtype=np.uint8)
+    for band, code in enumerate(codes):
+        absent = (classes & np.uint8(1 << code)) == 0
+        if absent.all():
+            continue
+        if wrap:
+            # distances across the antimeridian, from three copies of the
+            # tiles side by side
+            tiled = distance_transform_cdt(np.tile(absent, 3),
+                                           metric='chessboard')
+            dists = tiled[:, ntx:2 * ntx]
+        else:
+            dists = distance_transform_cdt(absent, metric='chessboard')
+        reach[band] = np.minimum(dists, TILE_REACH_MAX)
+    return (classes, reach)
+
+
+def build_region_tiles(datafolder):
+    """Write summaries of the tiles of the tectonic and oceanic grids.
+
+    The summaries (see compute_region_tiles()) of the TILE_SIZE tiles of the
+    tectonic and oceanic grids in datafolder are written to REGION_TILE_FILE.
+
+    Args:
+        datafolder (str): Path to directory containing the tectonic and
+            oceanic grids.
+    Returns:
+        str: Path to tile summary file.
+    """
+    arrays = {}
+    for key, grid_name, regions in [('tectonic', TECTONIC_GRID, TECTONIC_REGIONS),
+                                    ('oceanic', OCEANIC_GRID, OCEANIC_REGIONS)]:
+        data, gd = _load_region_grid(os.path.join(datafolder, grid_name))
+        tile_cells = int(round(TILE_SIZE / gd.dx))
+        classes, reach = compute_region_tiles(data, tile_cells,
+                                              list(regions.keys()),
+                                              wrap=_is_global(gd))
+        del data
+        arrays[key + '_classes'] = classes
+        arrays[key + '_reach'] = reach
+        arrays[key + '_cells'] = tile_cells
+    tile_file = os.path.join(datafolder, REGION_TILE_FILE)
+    tmp_file = tile_file + '.tmp.npz'
+    np.savez_compressed(tmp_file,
+                        sources=json.dumps(_get_region_sources(datafolder)),
+                        **arrays)
+    os.replace(tmp_file, tile_file)
+    return tile_file
+
+
+def read_region_tiles(datafolder):
+    """Read the tile summaries written by build_region_tiles().
+
+    Args:
+        datafolder (str): Path to directory containing the tectonic and
+            oceanic grids.
+    Returns:
+        dict: Dictionary with the tectonic and oceanic grid file names as
+              keys, and tuples of (number of grid rows and columns in each
+              tile, tile bitmasks, tile reaches) as values, or None if there
+              are no up to date summaries in datafolder.
+    """
+    tile_file = os.path.join(datafolder, REGION_TILE_FILE)
+    if not os.path.isfile(tile_file):
+        return None
+    with np.load(tile_file) as npz:
+        if not _check_region_sources(datafolder, json.loads(str(npz['sources']))):
+            return None
+        tiles = {}
+        for key, grid_name in [('tectonic', TECTONIC_GRID),
+                               ('oceanic', OCEANIC_GRID)]:
+            tiles[grid_name] = (int(npz[key + '_cells']),
+                                npz[key + '_classes'],
+                                npz[key + '_reach'])
+    return tiles
+
+
+def _get_region_code_files(grid_file):
+    stem, ext = os.path.splitext(grid_file)
+    return (stem + REGION_CODE_EXT, stem + REGION_CODE_HEADER_EXT)
+
+
+def build_region_codes(datafolder):
+    """Write raw uint8 copies of the tectonic and oceanic grids.
+
+    Each grid is written next to the source grid, as a raw row-major file of
+    region codes plus a JSON header, so that the region codes at an epicenter
+    can be read from a memory map without reading any grid windows.
+
+    Args:
+        datafolder (str): Path to directory containing the tectonic and
+            oceanic grids.
+    Returns:
+        list: Paths to raw data files.
+    """
+    data_files = []
+    for grid_name in [TECTONIC_GRID, OCEANIC_GRID]:
+        grid_file = os.path.join(datafolder, grid_name)
+        data_file, header_file = _get_region_code_files(grid_file)
+        data, gd = _load_region_grid(grid_file)
+        header = _get_geodict_header(gd)
+        header['source'] = _get_source_stamp(grid_file)
+        tmp_data_file = data_file + '.tmp'
+        tmp_header_file = header_file + '.tmp'
+        np.ascontiguousarray(data).tofile(tmp_data_file)
+        with open(tmp_header_file, 'wt') as f:
+            json.dump(header, f)
+        os.replace(tmp_data_file, data_file)
+        os.replace(tmp_header_file, header_file)
+        data_files.append(data_file)
+    return data_files
+
+
+def read_region_codes(datafolder):
+    """Memory map the raw grid copies written by build_region_codes().
+
+    Args:
+        datafolder (str): Path to directory containing the tectonic and
+            oceanic grids.
+    Returns:
+        dict: Dictionary with the tectonic and oceanic grid file names as
+              keys, and tuples of (read-only uint8 memmap of region codes,
+              GeoDict) as values, or None if there are no up to date copies
+              of both grids in datafolder.
+    """
+    codes = {}
+    for grid_name in [TECTONIC_GRID, OCEANIC_GRID]:
+        grid_file = os.path.join(datafolder, grid_name)
+        data_file, header_file = _get_region_code_files(grid_file)
+        if not os.path.isfile(data_file) or not os.path.isfile(header_file):
+            return None
+        with open(header_file, 'rt') as f:
+            header = json.load(f)
+        if not _check_region_sources(datafolder, {grid_name: header['source']}):
+            return None
+        keys = ['xmin', 'xmax', 'ymin', 'ymax', 'dx', 'dy', 'nx', 'ny']
+        gdict = GeoDict({key: header[key] for key in keys})
+        data = np.memmap(data_file, dtype=np.uint8, mode='r',
+                         shape=(gdict.ny, gdict.nx))
+        codes[grid_name] = (data, gdict)
+    return codes
+
+
+def pack_region_types(tectonic, oceanic):
+    """Pack tectonic region codes and oceanic flags into nibbles.
+
+    Cells where either array holds REGION_NODATA are packed as
+    REGION_TYPE_NODATA.
+
+    Args:
+        tectonic (ndarray): 2D array of tectonic region codes (0-7).
+        oceanic (ndarray): 2D array of oceanic flags (0 or 1, or
+            REGION_NODATA), of the same shape as tectonic.
+    Returns:
+        ndarray: 2D uint8 array with half as many columns (rounded up), as
+                 described for REGION_TYPE_FILE.
+    """
+    ny, nx = tectonic.shape
+    values = np.zeros((ny, nx + nx % 2), dtype=np.uint8)
+    values[:, :nx] = (tectonic.astype(np.uint8) & 0x07) | \
+        ((oceanic.astype(np.uint8) & 0x01) << 3)
+    values[:, :nx][(tectonic == REGION_NODATA) |
+                   (oceanic == REGION_NODATA)] = REGION_TYPE_NODATA
+    return values[:, 0::2] | (values[:, 1::2] << 4)
+
+
+def unpack_region_types(packed, row0, row1, col0, col1):
+    """Unpack a block of cells packed by pack_region_types().
+
+    Args:
+        packed (ndarray): 2D array returned by pack_region_types().
+        row0 (int): First row of the block.
+        row1 (int): End row of the block.
+        col0 (int): First column of the block.
+        col1 (int): End column of the block.
+    Returns:
+        tuple: (2D uint8 array of tectonic region codes, 2D uint8 array of
+               oceanic flags), both with REGION_NODATA where there is no
+               data.
+    """
+    if row1 <= row0 or col1 <= col0:
+        empty = np.empty((max(row1 - row0, 0), max(col1 - col0, 0)),
+                         dtype=np.uint8)
+        return (empty, empty)
+    block = packed[row0:row1, col0 // 2:(col1 + 1) // 2]
+    values = np.empty((block.shape[0], 2 * block.shape[1]), dtype=np.uint8)
+    values[:, 0::2] = block & 0x0F
+    values[:, 1::2] = block >> 4
+    values = values[:, col0 % 2:col0 % 2 + col1 - col0]
+    return _split_region_types(values)
+
+
+def _split_region_types(values):
+    # tectonic region codes and oceanic flags of unpacked nibbles
+    flags = np.where(values == REGION_TYPE_NODATA, REGION_NODATA, values >> 3)
+    return (values & 0x07, flags.astype(np.uint8))
+
+
+def build_region_types(datafolder):
+    """Write the tectonic and oceanic grids packed into one raster.
+
+    The packed raster (see pack_region_types()) is written to
+    REGION_TYPE_FILE, plus a JSON header (REGION_TYPE_HEADER_FILE).  At 30
+    arc seconds it takes about 470 MB, so that it can be kept in memory.
+
+    Args:
+        datafolder (str): Path to directory containing the tectonic and
+            oceanic grids.
+    Returns:
+        str: Path to packed raster file.
+    Raises:
+        ValueError: If the tectonic and oceanic grids do not have the same
+            dimensions.
+    """
+    tectonic_file = os.path.join(datafolder, TECTONIC_GRID)
+    tectonic, gd = _load_region_grid(tectonic_file)
+    oceanic, _ = _load_region_grid(os.path.join(datafolder, OCEANIC_GRID))
+    if tectonic.shape != oceanic.shape:
+        raise ValueError('Tectonic and oceanic grids have different dimensions.')
+    packed = pack_region_types(tectonic, oceanic)
+    del tectonic, oceanic
+    # windows of the packed raster are taken exactly as mapio would read them
+    # from the source grids, from their affine transform.
+    with rasterio.open(tectonic_file) as src:
+        transform = src.transform
+    header = _get_geodict_header(gd)
+    header.update({'transform': [transform.a, transform.b, transform.c,
+                                 transform.d, transform.e, transform.f],
+                   'sources': _get_region_sources(datafolder)})
+    data_file = os.path.join(datafolder, REGION_TYPE_FILE)
+    header_file = os.path.join(datafolder, REGION_TYPE_HEADER_FILE)
+    tmp_data_file = data_file + '.tmp'
+    tmp_header_file = header_file + '.tmp'
+    packed.tofile(tmp_data_file)
+    with open(tmp_header_file, 'wt') as f:
+        json.dump(header, f)
+    os.replace(tmp_data_file, data_file)
+    os.replace(tmp_header_file, header_file)
+    return data_file
+
+
+def read_region_types(datafolder):
+    """Read the packed raster written by build_region_types() into memory.
+
+    Args:
+        datafolder (str): Path to directory containing the tectonic and
+            oceanic grids.
+    Returns:
+        tuple: (2D uint8 array of packed cells, Affine transform of the
+               source grids, GeoDict of the source grids), or None if there is
+               no up to date packed raster in datafolder.
+    """
+    data_file = os.path.join(datafolder, REGION_TYPE_FILE)
+    header_file = os.path.join(datafolder, REGION_TYPE_HEADER_FILE)
+    if not os.path.isfile(data_file) or not os.path.isfile(header_file):
+        return None
+    with open(header_file, 'rt') as f:
+        header = json.load(f)
+    if not _check_region_sources(datafolder, header['sources']):
+        return None
+    keys = ['xmin', 'xmax', 'ymin', 'ymax', 'dx', 'dy', 'nx', 'ny']
+    gdict = GeoDict({key: header[key] for key in keys})
+    packed = np.fromfile(data_file, dtype=np.uint8)
+    packed = packed.reshape((gdict.ny, (gdict.nx + 1) // 2))
+    return (packed, rasterio.Affine(*header['transform']), gdict)
+
+
+def _read_polygons(geojson_file):
+    with open(geojson_file, 'rt') as f:
+        features = json.load(f)['features']
+    return shapely.union_all([shape(feature['geometry'])
+                              for feature in features])
+
+
+def _split_geometry(geom, size=POLYGON_TILE_SIZE):
+    # split a (multi)polygon into its parts, and parts into tiles of size
+    # degrees.
+    pieces = []
+    for part in shapely.get_parts(geom):
+        xmin, ymin, xmax, ymax = part.bounds
+        if xmax - xmin <= size and ymax - ymin <= size:
+            pieces.append(part)
+            continue
+        for x in np.arange(np.floor(xmin / size) * size, xmax, size):
+            for y in np.arange(np.floor(ymin / size) * size, ymax, size):
+                piece = shapely.clip_by_rect(part, x, y, x + size, y + size)
+                if not piece.is_empty:
+                    pieces.append(piece)
+    return pieces
+
+
+def project_aeqd(coords, lat0, lon0):
+    """Project points into an azimuthal equidistant projection.
+
+    The projection is on a sphere of radius EARTH_RADIUS, centered on
+    (lat0, lon0), so that the distance of a projected point from the origin is
+    its great circle distance from the center.
+
+    Args:
+        coords (ndarray): (N, 2) array of longitudes and latitudes in decimal
+            degrees.
+        lat0 (float): Latitude of the projection center.
+        lon0 (float): Longitude of the projection center.
+    Returns:
+        ndarray: (N, 2) array of projected x (east) and y (north) coordinates
+                 in km.
+    """
+    lons = np.radians(coords[:, 0])
+    lats = np.radians(coords[:, 1])
+    lat0 = np.radians(lat0)
+    dlon = lons - np.radians(lon0)
+    sinlat0, coslat0 = np.sin(lat0), np.cos(lat0)
+    sinlat, coslat = np.sin(lats), np.cos(lats)
+    cosdlon = np.cos(dlon)
+    c = np.arccos(np.clip(sinlat0 * sinlat + coslat0 * coslat * cosdlon, -1, 1))
+    sinc = np.sin(c)
+    k = np.ones_like(c)
+    nonzero = sinc > 0
+    k[nonzero] = c[nonzero] / sinc[nonzero]
+    x = EARTH_RADIUS * k * coslat * np.sin(dlon)
+    y = EARTH_RADIUS * k * (coslat0 * sinlat - sinlat0 * coslat * cosdlon)
+    return np.column_stack([x, y])
+
+
+def _get_frame_range(transform, ny, nx, xmin, xmax, ymin, ymax, dx, dy):
+    # rows and columns of a grid file that mapio's read() reads for a window
+    # that does not cross the antimeridian, following its arithmetic.
+    file_west = transform.c
+    file_north = transform.f
+    file_east = nx * transform.a + transform.c
+    file_south = ny * transform.e + transform.f
+    west = max(xmin - dx / 2.0, file_west)
+    south = max((ymin + dy / 2.0) - dy, file_south)
+    east = (xmax - dx / 2.0) + dx
+    if east < west:
+        east = file_east
+    east = min(east, file_east)
+    north = min(ymax + dy / 2.0, file_north)
+    col0 = max(int(np.round((west - file_west) / transform.a)), 0)
+    col1 = min(int(np.round((east - file_west) / transform.a)), nx)
+    row0 = max(int(np.round((north - file_north) / transform.e)), 0)
+    row1 = min(int(np.round((south - file_north) / transform.e)), ny)
+    return (row0, row1, col0, col1)
+
+
+def _get_frame_corner(transform, row, col):
+    # center of the upper left cell of a block of cells read by mapio
+    x = col * transform.a + row * transform.b + transform.c
+    y = col * transform.d + row * transform.e + transform.f
+    return (x + transform.a / 2.0, y + transform.e / 2.0)
+
+
+def get_window_frame(transform, ny, nx, gdict):
+    """Return the cells of a grid file that mapio's read() returns for a window.
+
+    Args:
+        transform (Affine): Affine transform of the grid file.
+        ny (int): Number of rows in the grid file.
+        nx (int): Number of columns in the grid file.
+        gdict (GeoDict): GeoDict describing the window (the samplegeodict
+            argument of read(), without resampling).
+    Returns:
+        tuple: (List of (first row, end row, first column, end column) ranges
+               of grid file cells, to be joined left to right, GeoDict
+               describing the window as read).
+    """
+    dx = transform.a
+    dy = -1 * transform.e
+    if gdict.xmax >= gdict.xmin:
+        frame = [_get_frame_range(transform, ny, nx, gdict.xmin, gdict.xmax,
+                                  gdict.ymin, gdict.ymax, gdict.dx, gdict.dy)]
+        row0, row1, col0, col1 = frame[0]
+        xmin, ymax = _get_frame_corner(transform, row0, col0)
+        xmax = xmin + (col1 - col0 - 1) * dx
+        ymin = ymax - (row1 - row0 - 1) * dy
+    else:
+        # windows crossing the antimeridian are read in two pieces, from
+        # the west edge of the window to the east edge of the grid, and from
+        # the west edge of the grid to the east edge of the window.
+        file_east = nx * transform.a + transform.c
+        left = GeoDict.createDictFromBox(gdict.xmin, file_east + dx / 2.0,
+                                         gdict.ymin, gdict.ymax, dx, dy)
+        right = GeoDict.createDictFromBox(transform.c + dx / 2.0, gdict.xmax,
+                                          gdict.ymin, gdict.ymax, dx, dy)
+        frame = [_get_frame_range(transform, ny, nx, box.xmin, box.xmax,
+                                  box.ymin, box.ymax, box.dx, box.dy)
+                 for box in [left, right]]
+        row0, row1, col0, _ = frame[0]
+        xmin, _ = _get_frame_corner(transform, row0, col0)
+        rrow0, _, rcol0, rcol1 = frame[1]
+        xmax, _ = _get_frame_corner(transform, rrow0, rcol0)
+        xmax += (rcol1 - rcol0 - 1) * dx
+        ymin = gdict.ymin
+        ymax = gdict.ymax
+    window = GeoDict({'xmin': xmin, 'xmax': xmax,
+                      'ymin': ymin, 'ymax': ymax,
+                      'dx': dx, 'dy': dy,
+                      'nx': sum(col1 - col0 for _, _, col0, col1 in frame),
+                      'ny': row1 - row0})
+    return (frame, window)
+
+
+def get_window_boxes(lat, lon, xspan=XSPAN, yspan=YSPAN):
+    """Return the bounds of the search window around an epicenter.
+
+    Args:
+        lat (float): Latitude of epicenter.
+        lon (float): Longitude of epicenter, between -180 and 180.
+        xspan (float): Width of window in decimal degrees.
+        yspan (float): Height of window in decimal degrees.
+    Returns:
+        list: One (xmin, ymin, xmax, ymax) tuple, or two if the window crosses
+              the antimeridian, with longitudes between -180 and 180.
+    """
+    ymin = max(lat - yspan / 2, -90.0)
+    ymax = min(lat + yspan / 2, 90.0)
+    xmin = lon - xspan / 2
+    xmax = lon + xspan / 2
+    boxes = [(max(xmin, -180.0), ymin, min(xmax, 180.0), ymax)]
+    if xmin < -180:
+        boxes.append((xmin + 360, ymin, 180.0, ymax))
+    if xmax > 180:
+        boxes.append((-180.0, ymin, xmax - 360, ymax))
+    return boxes
+
+
+def _get_gap(values, center):
+    # smallest distance from center to a monotonic sequence of values
+    if not len(values):
+        return np.inf
+    low = min(values[0], values[-1])
+    high = max(values[0], values[-1])
+    if low <= center <= high:
+        return 0.0
+    return min(abs(low - center), abs(high - center))
+
+
+def _get_window_terms(xmin, xmax, nx, ymin, ymax, ny, center_lon, center_lat):
+    # axes (radians) of a search window, the terms of geodetic_distance()
+    # from the epicenter that depend only on the column or only on the row of
+    # a cell, so that distances to cells are found without any trigonometry,
+    # and the first column on the other side of the epicenter from the first
+    # column.
+    lons = np.radians(np.linspace(xmin, xmax, nx))
+    lats = np.radians(np.linspace(ymin, ymax, ny))
+    center_lon_rad = np.radians(center_lon)
+    center_lat_rad = np.radians(center_lat)
+    dlons = center_lon_rad - lons
+    coslats = np.cos(0.5 * (center_lat_rad + lats))
+    adlons = np.abs(dlons)
+    dlats2 = (center_lat_rad - lats)**2
+    sides = dlons >= 0
+    change = np.flatnonzero(sides != sides[0])
+    split = int(change[0]) if len(change) else nx
+    return (lons, lats, dlons, adlons, coslats, dlats2, split)
+
+
+def _get_nearest_columns(mask, adlons, split):
+    # rows and columns of the cells of a mask with the smallest longitude
+    # difference from the epicenter in each row, on either side of column
+    # split, where longitude differences change sign.  The longitude axis is
+    # monotonic, so on each side the absolute differences (adlons) are too.
+    nrows, ncols = mask.shape
+    rows = []
+    cols = []
+    index = np.arange(nrows)
+    for col0, col1 in [(0, split), (split, ncols)]:
+        if col1 <= col0:
+            continue
+        block = mask[:, col0:col1]
+        if adlons[col1 - 1] <= adlons[col0]:
+            # nearest cells are the last ones in the row
+            block = block[:, ::-1]
+            first = np.argmax(block, axis=1)
+            hit = block[index, first]
+            cols.append(col1 - 1 - first[hit])
+        else:
+            first = np.argmax(block, axis=1)
+            hit = block[index, first]
+            cols.append(col0 + first[hit])
+        rows.append(index[hit])
+    return (np.concatenate(rows), np.concatenate(cols))
+
+
 def get_dist_to_type(center_lon, center_lat, grid, regions):
     """ Determine distance from point to a feature described in a dictionary object
 
+    Distances are searched for in windows centered on the middle of the grid,
+    starting with a window WINDOW_STEPS[0] degrees wide, and growing until
+    the nearest cell of each region type present in the grid is inside the
+    window, and closer than any cell outside of it could be.  In each row,
+    only the cells of each region type nearest to the epicenter's longitude
+    are measured, with the terms of the distance that depend only on the row
+    or only on the column computed once for the grid.  The results are the
+    same as searching every cell of the grid.
+
     Args:
         center_lon (float): Longitude of event's epicenter
         center_lat (float): Latitude of event's epicenter
@@ -75,19 +1035,18 @@ def get_dist_to_type(center_lon, center_lat, grid, regions):
     #
     # The distance calculation wants everything in radians
     #
-    lons = np.radians(np.linspace(gd.xmin, gd.xmax, gd.nx))
-    lats = np.radians(np.linspace(gd.ymin, gd.ymax, gd.ny))
-    mlons, mlats = np.meshgrid(lons, lats)
+    lons, lats, dlons, adlons, coslats, dlats2, split = _get_window_terms(
+        gd.xmin, gd.xmax, gd.nx, gd.ymin, gd.ymax, gd.ny,
+        center_lon, center_lat)
 
     center_lon_rad = np.radians(center_lon)
     center_lat_rad = np.radians(center_lat)
 
     #
-    # The type at the epicenter is the type in the middle of the grid
-    # (I'm not sure about the "- 1" part)
+    # The type at the epicenter is the type of the cell containing it, as
+    # for getRegions() without distances
     #
-    midx = int(gd.nx / 2 - 1)
-    midy = int(gd.ny / 2 - 1)
+    midy, midx = get_window_cell(gd, center_lat, center_lon)
     mytype = grid._data[midy, midx]
     #
     # Tectonic types are 1: stable, 2: active, 3: volcanic, 4: subduction
@@ -97,34 +1056,140 @@ def get_dist_to_type(center_lon, center_lat, grid, regions):
     dist_to_type = dict(zip(list(regions.values()), distances))
     tectype = regions[mytype]
     dist_to_type[tectype] = 0
-    for tec_code in regions.keys():
-        tectype = regions[tec_code]
-        if tec_code == mytype:
-            continue
-        ixx = grid._data == tec_code
-        if not np.any(ixx):
-            continue
-        tlons = mlons[ixx].flatten()
-        tlats = mlats[ixx].flatten()
-        dists = geodetic_distance(center_lon_rad,
-                                  center_lat_rad,
-                                  tlons, tlats)
+    # region types absent from the grid are only known to be absent once
+    # the whole grid has been searched
+    remaining = [tec_code for tec_code in regions.keys()
+                 if tec_code != mytype]
+    #
+    # Cells outside of a window are at least as far from the epicenter as
+    # the nearest row or column outside of it, where longitude differences
+    # are scaled by the smallest cosine of latitude in the grid.
+    #
+    mincos = min(np.cos(0.5 * (center_lat_rad + lats[0])),
+                 np.cos(0.5 * (center_lat_rad + lats[-1])))
+    for step in WINDOW_STEPS + [None]:
+        if not remaining:
+            break
+        if step is None:
+            r0, r1, c0, c1 = 0, gd.ny, 0, gd.nx
+        else:
+            hy = int(np.ceil(step / 2 / gd.dy))
+            hx = int(np.ceil(step / 2 / gd.dx))
+            r0, r1 = max(midy - hy, 0), min(midy + hy + 1, gd.ny)
+            c0, c1 = max(midx - hx, 0), min(midx + hx + 1, gd.nx)
+        lat_gap = min(_get_gap(lats[:r0], center_lat_rad),
+                      _get_gap(lats[r1:], center_lat_rad))
+        lon_gap = min(_get_gap(lons[:c0], center_lon_rad),
+                      _get_gap(lons[c1:], center_lon_rad))
+        bound = EARTH_RADIUS * min(lat_gap, mincos * lon_gap) * (1 - 1e-9)
+        window = grid._data[r0:r1, c0:c1]
+        for tec_code in list(remaining):
+            # within a row, distances grow with the longitude difference, so
+            # only the nearest cells on either side of the epicenter count.
+            rows, cols = _get_nearest_columns(window == tec_code,
+                                              adlons[c0:c1],
+                                              min(max(split - c0, 0), c1 - c0))
+            if not len(rows):
+                continue
+            # the same arithmetic as geodetic_distance()
+            rows += r0
+            cols += c0
+            dists = 6371.0 * np.sqrt((dlons[cols] * coslats[rows])**2 +
+                                     dlats2[rows])
+            mindist = np.min(dists)
+            if mindist <= bound:
+                dist_to_type[regions[tec_code]] = mindist
+                remaining.remove(tec_code)
+    return dist_to_type
+
 
-        dist_to_type[tectype] = np.min(dists)
+def _get_tectonic_type(code):
+    # tectonic region type of a tectonic region code, None where the grid has
+    # no data.  Other codes are volcanic, as where no region type is at the
+    # epicenter in Regionalizer.getRegions().
+    if code == REGION_NODATA:
+        return None
+    return TECTONIC_TYPES.get(code, 'Volcanic')
+
+
+def _get_oceanic_flag(code):
+    # oceanic flag of an oceanic region code, None where the grid has no data
+    if code == REGION_NODATA:
+        return None
+    return code == 1
+
+
+def _get_frame_columns(frame, nx):
+    # rows and columns of a window frame from get_window_frame() as one block,
+    # with columns past the east edge of a global grid continuing from nx.
+    # None for frames with no cells.
+    row0, row1, col0, col1 = frame[0]
+    if len(frame) > 1:
+        rrow0, rrow1, rcol0, rcol1 = frame[1]
+        if (rrow0, rrow1) != (row0, row1) or col1 != nx or rcol0 != 0:
+            return None
+        col1 = nx + rcol1
+    if row1 <= row0 or col1 <= col0:
+        return None
+    return (row0, row1, col0, col1)
+
+
+def _get_uniform_distances(code, regions):
+    # get_dist_to_type() results for a window holding only one region code
+    distances = np.ones(len(regions)) * np.inf
+    dist_to_type = dict(zip(list(regions.values()), distances))
+    dist_to_type[regions[code]] = 0
     return dist_to_type
 
 
 class Regionalizer(object):
-    def __init__(self, datafolder):
+    def __init__(self, datafolder, max_bytes=TILE_CACHE_BYTES):
         """Determine tectonic region information given epicenter and depth.
 
+        If datafolder contains up to date distance rasters (see
+        build_region_distances()), region distances are read from them rather
+        than computed from windows of the tectonic and oceanic grids.
+        Otherwise, if it contains up to date KD-trees of region edges (see
+        build_region_boundaries()), distances are measured to the nearest
+        region edge at any range.
+
+        If datafolder contains up to date tile summaries (see
+        build_region_tiles()), events inside tiles of the tectonic or oceanic
+        grid holding a single region code, with no other region code nearby,
+        are answered from the summaries without reading the grid.
+        If it contains up to date raw copies of the grids (see
+        build_region_codes()), the region codes at each epicenter are read
+        from memory maps of those.  If it contains an up to date packed
+        raster of both grids (see build_region_types()), that is kept in
+        memory, and used instead of reading either grid.
+
+        Windows of the tectonic and oceanic grids are assembled from tiles of
+        TILE_SIZE degrees, which are kept in a least recently used cache, so
+        that events close to recent events are answered from memory.
+
         Args:
             datafolder (str): Path to directory containing spatial data
             for tectonic regions.
+            max_bytes (int): Maximum total size in bytes of cached grid
+                tiles, or None for no limit.
         """
         self._datafolder = datafolder
-        self._tectonic_grid = os.path.join(datafolder, 'tectonic_global.grd')
-        self._oceanic_grid = os.path.join(datafolder, 'oceanic_global.grd')
+        self._tectonic_grid = os.path.join(datafolder, TECTONIC_GRID)
+        self._oceanic_grid = os.path.join(datafolder, OCEANIC_GRID)
+        self._tile_cache = GridCache(max_bytes=max_bytes)
+        self._file_frames = {}
+        self._datasets = {}
+        self._loadRegionData()
+
+    def _loadRegionData(self):
+        # precomputed distance rasters and region edge trees, if they have
+        # been built
+        self._distances = read_region_distances(self._datafolder)
+        self._boundaries = read_region_boundaries(self._datafolder)
+        self._tiles = read_region_tiles(self._datafolder)
+        self._codes = read_region_codes(self._datafolder)
+        self._types = read_region_types(self._datafolder)
+        self._type_window = None
 
     @classmethod
     def load(cls):
@@ -137,13 +1202,20 @@ class Regionalizer(object):
         datadir = config['DATA']['folder']
         return cls(datadir)
 
-    def getRegions(self, lat, lon, depth):
+    def getRegions(self, lat, lon, depth, distances=True):
         """Get information about the tectonic region of a given hypocenter.
 
+        With distances set to False, only the region types of the grid cells
+        containing the epicenter are looked up, which is much faster.  The
+        TectonicRegion and Oceanic labels are then None where the tectonic or
+        oceanic grid has no data at the epicenter.
+
         Args:
             lat (float): Earthquake hypocentral latitude.
             lon (float): Earthquake hypocentral longitude.
             depth (float): Earthquake hypocentral depth.
+            distances (bool): If False, return only the TectonicRegion and
+                Oceanic labels.
         Returns:
             Series: Pandas series object containing labels:
                 - TectonicRegion: Subduction, Active, Stable, or Volcanic.
@@ -158,15 +1230,13 @@ class Regionalizer(object):
                 - DistanceToContinental: Distance in km to nearest continental
                                          region.
         """
-        regions = OrderedDict()
+        if not distances:
+            tectonic_code, oceanic_code = self._getRegionCodes(lat, lon)
+            return pd.Series([_get_tectonic_type(tectonic_code),
+                              _get_oceanic_flag(oceanic_code)],
+                             index=REGION_TYPE_LABELS, dtype=object)
 
-        gd = GeoDict.createDictFromCenter(lon, lat, DX, DY, XSPAN, YSPAN)
-
-        tec_grid = read(self._tectonic_grid, samplegeodict=gd)
-        region_dict = get_dist_to_type(lon, lat, tec_grid, TECTONIC_REGIONS)
-
-        ocean_grid = read(self._oceanic_grid, samplegeodict=gd)
-        ocean_dict = get_dist_to_type(lon, lat, ocean_grid, OCEANIC_REGIONS)
+        region_dict = self._getDistances(lat, lon)
 
         if region_dict['DistanceToActive'] == 0:
             region_dict['TectonicRegion'] = 'Active'
@@ -177,19 +1247,564 @@ class Regionalizer(object):
         else:
             region_dict['TectonicRegion'] = 'Volcanic'
 
-        region_dict['DistanceToOceanic'] = ocean_dict['DistanceToOceanic']
-        region_dict['DistanceToContinental'] = ocean_dict['DistanceToContinental']
         region_dict['Oceanic'] = False
-        if ocean_dict['DistanceToOceanic'] == 0:
+        if region_dict['DistanceToOceanic'] == 0:
             region_dict['Oceanic'] = True
 
-        regions = pd.Series(region_dict, index=['TectonicRegion',
-                                                'DistanceToStable',
-                                                'DistanceToActive',
-                                                'DistanceToSubduction',
-                                                'DistanceToVolcanic',
-                                                'Oceanic',
-                                                'DistanceToOceanic',
-                                                'DistanceToContinental'])
+        regions = pd.Series(region_dict, index=REGION_COLUMNS)
 
         return regions
+
+    def getRegionsBatch(self, lats, lons, depths, distances=True):
+        """Get tectonic region information for arrays of hypocenters.
+
+        The results are the same as those of getRegions() for each
+        hypocenter.  Without distance rasters or region edge trees, events
+        are grouped by the TILE_SIZE tile containing their epicenter, and
+        the union of the search windows of each group is read once.
+
+        Args:
+            lats (ndarray): Earthquake hypocentral latitudes.
+            lons (ndarray): Earthquake hypocentral longitudes.
+            depths (ndarray): Earthquake hypocentral depths.
+            distances (bool): If False, return only the TectonicRegion and
+                Oceanic columns.
+        Returns:
+            DataFrame: Pandas dataframe with one row per hypocenter, and the
+                columns described in getRegions().
+        """
+        lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+        lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+        if not distances:
+            tectonic_codes, oceanic_codes = self._getRegionCodesBatch(lats, lons)
+            types = np.array([_get_tectonic_type(code)
+                              for code in tectonic_codes.tolist()],
+                             dtype=object)
+            flags = np.array([_get_oceanic_flag(code)
+                              for code in oceanic_codes.tolist()],
+                             dtype=object)
+            return pd.DataFrame({'TectonicRegion': types, 'Oceanic': flags},
+                                columns=list(REGION_TYPE_LABELS), dtype=object)
+
+        regions = self._getDistancesBatch(lats, lons)
+        regions['TectonicRegion'] = np.select(
+            [regions['DistanceToActive'] == 0,
+             regions['DistanceToStable'] == 0,
+             regions['DistanceToSubduction'] == 0],
+            ['Active', 'Stable', 'Subduction'], 'Volcanic').astype(object)
+        regions['Oceanic'] = regions['DistanceToOceanic'] == 0
+        return pd.DataFrame(regions, columns=REGION_COLUMNS)
+
+    def _getDistancesBatch(self, lats, lons):
+        # vectorized version of _getDistances(), returning arrays of distances
+        # keyed by DISTANCE_FIELDS
+        if self._distances is not None:
+            data, gd = self._distances
+            rows, cols = get_pixel_index(gd, lats, lons)
+            counts = data[:, rows, cols]
+            distances = np.where(counts == DISTANCE_NODATA, np.inf,
+                                 counts * DISTANCE_SCALE)
+            far = np.isinf(distances).any(axis=0)
+            if self._boundaries is not None and far.any():
+                idx = np.flatnonzero(far)
+                trees = self._getTreeDistancesBatch(lats[idx], lons[idx])
+                for band, field in enumerate(DISTANCE_FIELDS):
+                    distances[band, idx] = trees[field]
+            return OrderedDict(zip(DISTANCE_FIELDS, distances))
+        if self._boundaries is not None:
+            return self._getTreeDistancesBatch(lats, lons)
+        return self._getWindowDistancesBatch(lats, lons)
+
+    def _getTreeDistancesBatch(self, lats, lons):
+        # vectorized version of _getTreeDistances()
+        tectonic_codes, oceanic_codes = self._getRegionCodesBatch(lats, lons)
+        epicenter_codes = ([tectonic_codes] * len(TECTONIC_REGIONS) +
+                           [oceanic_codes] * len(OCEANIC_REGIONS))
+        points = _get_unit_vectors(lats, lons)
+        distances = OrderedDict()
+        for tree, code, codes, field in zip(self._boundaries, DISTANCE_CODES,
+                                            epicenter_codes, DISTANCE_FIELDS):
+            if tree is None:
+                dists = np.full(len(lats), np.inf)
+            else:
+                chords, _ = tree.query(points)
+                dists = _get_chord_distance(chords)
+            dists[codes == code] = 0.0
+            distances[field] = dists
+        return distances
+
+    def _getWindowDistancesBatch(self, lats, lons):
+        # vectorized version of _getWindowDistances(), reading the union of
+        # the search windows of the events in each tile once
+        distances = OrderedDict((field, np.full(len(lats), np.nan))
+                                for field in DISTANCE_FIELDS)
+        tiles = np.column_stack([np.floor(lats / TILE_SIZE),
+                                 np.floor(lons / TILE_SIZE)])
+        _, groups = np.unique(tiles, axis=0, return_inverse=True)
+        for group in np.unique(groups):
+            idx = np.flatnonzero(groups == group)
+            for grid_file, regions in [(self._tectonic_grid, TECTONIC_REGIONS),
+                                       (self._oceanic_grid, OCEANIC_REGIONS)]:
+                results = self._getGroupDistances(grid_file, regions,
+                                                  lats[idx], lons[idx])
+                for i, dist_to_type in zip(idx, results):
+                    for field, dist in dist_to_type.items():
+                        distances[field][i] = dist
+        return distances
+
+    def _getGroupDistances(self, grid_file, regions, lats, lons):
+        # _getGridDistances() for a group of nearby events, cutting the
+        # window of each event from one read of the union of their windows
+        results = [None] * len(lats)
+        transform, ny, nx, fdict = self._getRegionFrame(grid_file)
+        ranges = {}
+        for i, (lat, lon) in enumerate(zip(lats, lons)):
+            code = self._getTileCode(grid_file, regions, lat, lon,
+                                     max(XSPAN, YSPAN))
+            if code is not None:
+                results[i] = _get_uniform_distances(code, regions)
+                continue
+            gd = GeoDict.createDictFromCenter(lon, lat, DX, DY, XSPAN, YSPAN)
+            cells = None
+            if fdict.intersects(gd):
+                frame, window = get_window_frame(transform, ny, nx, gd)
+                cells = _get_frame_columns(frame, nx)
+            if cells is None:
+                # windows outside of the grid, or with no cells
+                grid = self._readRegionWindow(grid_file, gd)
+                results[i] = get_dist_to_type(lon, lat, grid, regions)
+                continue
+            row0, row1, col0, col1 = cells
+            if _is_global(fdict):
+                # keep the columns of all windows in the group on the same
+                # side of the antimeridian
+                center = (lon - transform.c) / transform.a
+                if col0 > center % nx + nx / 2:
+                    col0, col1 = col0 - nx, col1 - nx
+                elif col1 < center % nx - nx / 2:
+                    col0, col1 = col0 + nx, col1 + nx
+            ranges[i] = ((row0, row1, col0, col1), window)
+        if not ranges:
+            return results
+        extents = np.array([cells for cells, _ in ranges.values()])
+        urow0, ucol0 = extents[:, 0].min(), extents[:, 2].min()
+        union = self._readRegionCells(grid_file, urow0, extents[:, 1].max(),
+                                      ucol0, extents[:, 3].max())
+        for i, ((row0, row1, col0, col1), window) in ranges.items():
+            data = union[row0 - urow0:row1 - urow0, col0 - ucol0:col1 - ucol0]
+            grid = Grid2D(data, window)
+            results[i] = get_dist_to_type(lons[i], lats[i], grid, regions)
+        return results
+
+    def _getRegionCodesBatch(self, lats, lons):
+        # vectorized version of _getRegionCodes(), returning arrays of codes
+        if self._types is not None:
+            packed, _, gd = self._types
+            rows, cols = get_pixel_index(gd, lats, lons)
+            values = (packed[rows, cols // 2] >> (4 * (cols % 2))) & 0x0F
+            return _split_region_types(values)
+        if self._codes is not None:
+            codes = []
+            for grid_name in [TECTONIC_GRID, OCEANIC_GRID]:
+                data, gd = self._codes[grid_name]
+                rows, cols = get_pixel_index(gd, lats, lons)
+                codes.append(np.asarray(data[rows, cols]))
+            return tuple(codes)
+        codes = np.array([self._getRegionCodes(lat, lon)
+                          for lat, lon in zip(lats, lons)], dtype=int)
+        codes = codes.reshape((len(lats), 2))
+        return (codes[:, 0], codes[:, 1])
+
+    def _getDistances(self, lat, lon):
+        # distances to each region type, keyed by DISTANCE_FIELDS
+        if self._distances is not None:
+            distances = self._getRasterDistances(lat, lon)
+            # region types farther away than the rasters can hold
+            if (self._boundaries is not None and
+                    np.isinf(list(distances.values())).any()):
+                distances = self._getTreeDistances(lat, lon)
+            return distances
+        if self._boundaries is not None:
+            return self._getTreeDistances(lat, lon)
+        return self._getWindowDistances(lat, lon)
+
+    def _getWindowDistances(self, lat, lon):
+        # search windows of the tectonic and oceanic grids around the epicenter
+        region_dict = self._getGridDistances(self._tectonic_grid,
+                                             TECTONIC_REGIONS, lat, lon)
+        ocean_dict = self._getGridDistances(self._oceanic_grid,
+                                            OCEANIC_REGIONS, lat, lon)
+
+        region_dict['DistanceToOceanic'] = ocean_dict['DistanceToOceanic']
+        region_dict['DistanceToContinental'] = ocean_dict['DistanceToContinental']
+        return region_dict
+
+    def _getGridDistances(self, grid_file, regions, lat, lon):
+        # distances to each region type in a window of one grid, or from the
+        # tile summaries if the window holds only one region code
+        code = self._getTileCode(grid_file, regions, lat, lon,
+                                 max(XSPAN, YSPAN))
+        if code is not None:
+            return _get_uniform_distances(code, regions)
+        gd = GeoDict.createDictFromCenter(lon, lat, DX, DY, XSPAN, YSPAN)
+        grid = self._readRegionWindow(grid_file, gd)
+        return get_dist_to_type(lon, lat, grid, regions)
+
+    def _getTileCode(self, grid_file, regions, lat, lon, span):
+        # the region code of the tile containing an epicenter, if the tile
+        # holds only that code, the epicenter is not near the edges of the
+        # tile, and no other code in regions is within a window of span
+        # degrees around the epicenter.  None otherwise.
+        if self._tiles is None:
+            return None
+        tile_cells, classes, reach = self._tiles[os.path.basename(grid_file)]
+        transform, ny, nx, fdict = self._getFileFrame(grid_file)
+        # windows that do not fit inside the grid are handled by reading it
+        hy = int(np.ceil(span / 2 / fdict.dy)) + TILE_MARGIN
+        hx = int(np.ceil(span / 2 / fdict.dx)) + TILE_MARGIN
+        row = int(np.floor((lat - transform.f) / transform.e))
+        col = int(np.floor((lon - transform.c) / transform.a))
+        if row - hy < 0 or row + hy >= ny:
+            return None
+        if _is_global(fdict):
+            col = col % nx
+        elif col - hx < 0 or col + hx >= nx:
+            return None
+        tile_row, cell_row = divmod(row, tile_cells)
+        tile_col, cell_col = divmod(col, tile_cells)
+        if (min(cell_row, cell_col) < TILE_MARGIN or
+                max(cell_row, cell_col) >= tile_cells - TILE_MARGIN):
+            return None
+        bits = int(classes[tile_row, tile_col])
+        code = bits.bit_length() - 1
+        if bits != 1 << code or code not in regions:
+            return None
+        # the number of tiles the window reaches beyond the tile containing
+        # the epicenter
+        need = max(tile_row - (row - hy) // tile_cells,
+                   (row + hy) // tile_cells - tile_row,
+                   tile_col - (col - hx) // tile_cells,
+                   (col + hx) // tile_cells - tile_col)
+        for band, other in enumerate(regions.keys()):
+            if other != code and reach[band, tile_row, tile_col] <= need:
+                return None
+        return code
+
+    def _getRasterDistances(self, lat, lon):
+        # one cell from each of the precomputed distance rasters
+        data, gd = self._distances
+        row, col = get_pixel_index(gd, lat, lon)
+        counts = data[:, row, col]
+        distances = np.where(counts == DISTANCE_NODATA, np.inf,
+                             counts * DISTANCE_SCALE)
+        return OrderedDict(zip(DISTANCE_FIELDS, distances.tolist()))
+
+    def _getRegionCodes(self, lat, lon):
+        # tectonic region code and oceanic flag at the epicenter, from the
+        # packed raster, the raw grid copies, or the few cells of each grid
+        # around it
+        if self._types is not None:
+            packed, _, gd = self._types
+            row, col = get_pixel_index(gd, lat, lon)
+            value = (int(packed[row, col // 2]) >> (4 * (col % 2))) & 0x0F
+            return tuple(int(code) for code in _split_region_types(value))
+        if self._codes is not None:
+            codes = []
+            for grid_name in [TECTONIC_GRID, OCEANIC_GRID]:
+                data, gd = self._codes[grid_name]
+                row, col = get_pixel_index(gd, lat, lon)
+                codes.append(int(data[row, col]))
+            return tuple(codes)
+        gd = GeoDict.createDictFromCenter(lon, lat, DX, DY, 2 * DX, 2 * DY)
+        codes = []
+        for grid_file, regions in [(self._tectonic_grid, TECTONIC_REGIONS),
+                                   (self._oceanic_grid, OCEANIC_REGIONS)]:
+            code = self._getTileCode(grid_file, regions, lat, lon, 2 * DX)
+            if code is not None:
+                codes.append(code)
+                continue
+            grid = self._readRegionWindow(grid_file, gd)
+            row, col = get_window_cell(grid.getGeoDict(), lat, lon)
+            code = grid.getData()[row, col]
+            codes.append(REGION_NODATA if np.isnan(code) else int(code))
+        return tuple(codes)
+
+    def getCacheStats(self):
+        """Return statistics of the cache of tectonic and oceanic grid tiles.
+
+        Returns:
+            dict: Dictionary described in strec.slab.GridCache.getStats(),
+                  where each cached item is a grid tile.
+        """
+        return self._tile_cache.getStats()
+
+    def _getDataset(self, grid_file):
+        # open rasterio dataset of a grid file, kept open for tile reads
+        if grid_file not in self._datasets:
+            self._datasets[grid_file] = rasterio.open(grid_file)
+        return self._datasets[grid_file]
+
+    def _getFileFrame(self, grid_file):
+        # affine transform, number of rows and columns and GeoDict of a grid
+        # file
+        if grid_file not in self._file_frames:
+            src = self._getDataset(grid_file)
+            transform = src.transform
+            ny, nx = src.height, src.width
+            self._file_frames[grid_file] = (
+                transform, ny, nx, geodict_from_affine(transform, ny, nx))
+        return self._file_frames[grid_file]
+
+    def _readTiles(self, grid_file, keys):
+        # tiles of a grid file that are not in the tile cache, from one
+        # windowed read of the block of tiles spanning all of them
+        fdict = self._getFileFrame(grid_file)[3]
+        src = self._getDataset(grid_file)
+        ncells = int(round(TILE_SIZE / fdict.dx))
+        tile_rows = [key[1] for key in keys]
+        tile_cols = [key[2] for key in keys]
+        brow0 = min(tile_rows) * ncells
+        bcol0 = min(tile_cols) * ncells
+        brow1 = min((max(tile_rows) + 1) * ncells, fdict.ny)
+        bcol1 = min((max(tile_cols) + 1) * ncells, fdict.nx)
+        block = src.read(1, window=Window(bcol0, brow0, bcol1 - bcol0,
+                                          brow1 - brow0))
+        # no data values become NaN, as in read()
+        bdict = GeoDict({'xmin': fdict.xmin + bcol0 * fdict.dx,
+                         'xmax': fdict.xmin + (bcol1 - 1) * fdict.dx,
+                         'ymin': fdict.ymax - (brow1 - 1) * fdict.dy,
+                         'ymax': fdict.ymax - brow0 * fdict.dy,
+                         'dx': fdict.dx, 'dy': fdict.dy,
+                         'nx': bcol1 - bcol0, 'ny': brow1 - brow0,
+                         'nodata': src.nodata})
+        grid = Grid2D(block, bdict)
+        grid.applyNaN(force=True)
+        block = grid.getData()
+        tiles = {}
+        for key in keys:
+            _, tile_row, tile_col = key
+            row0 = tile_row * ncells
+            col0 = tile_col * ncells
+            row1 = min(row0 + ncells, fdict.ny)
+            col1 = min(col0 + ncells, fdict.nx)
+            tdict = GeoDict({'xmin': fdict.xmin + col0 * fdict.dx,
+                             'xmax': fdict.xmin + (col1 - 1) * fdict.dx,
+                             'ymin': fdict.ymax - (row1 - 1) * fdict.dy,
+                             'ymax': fdict.ymax - row0 * fdict.dy,
+                             'dx': fdict.dx, 'dy': fdict.dy,
+                             'nx': col1 - col0, 'ny': row1 - row0})
+            tile = (block[row0 - brow0:row1 - brow0,
+                          col0 - bcol0:col1 - bcol0].copy(), tdict)
+            tiles[key] = self._tile_cache.get(key, lambda: tile)[0]
+        return tiles
+
+    def _readCells(self, grid_file, row0, row1, col0, col1):
+        # a block of cells of a grid file, assembled from tiles.  Tiles
+        # missing from the tile cache are read together.
+        fdict = self._getFileFrame(grid_file)[3]
+        if row1 <= row0 or col1 <= col0:
+            # windows narrower than a cell of the grid file are empty
+            return np.empty((max(row1 - row0, 0), max(col1 - col0, 0)))
+        ncells = int(round(TILE_SIZE / fdict.dx))
+        tile_rows = range(row0 // ncells, (row1 - 1) // ncells + 1)
+        tile_cols = range(col0 // ncells, (col1 - 1) // ncells + 1)
+        tiles = {}
+        missing = []
+        for tile_row in tile_rows:
+            for tile_col in tile_cols:
+                key = (grid_file, tile_row, tile_col)
+                if key in self._tile_cache:
+                    tiles[key] = self._tile_cache.get(key, None)[0]
+                else:
+                    missing.append(key)
+        if missing:
+            tiles.update(self._readTiles(grid_file, missing))
+        rows = []
+        for tile_row in tile_rows:
+            trow0 = max(row0 - tile_row * ncells, 0)
+            trow1 = min(row1 - tile_row * ncells, ncells)
+            pieces = []
+            for tile_col in tile_cols:
+                tcol0 = max(col0 - tile_col * ncells, 0)
+                tcol1 = min(col1 - tile_col * ncells, ncells)
+                tile = tiles[(grid_file, tile_row, tile_col)]
+                pieces.append(tile[trow0:trow1, tcol0:tcol1])
+            rows.append(np.concatenate(pieces, axis=1))
+        return np.concatenate(rows, axis=0)
+
+    def _readWindow(self, grid_file, gdict):
+        # the same as read(grid_file, samplegeodict=gdict), from cached tiles
+        transform, ny, nx, fdict = self._getFileFrame(grid_file)
+        if not fdict.intersects(gdict):
+            data = np.ones((gdict.ny, gdict.nx)) * np.nan
+            return Grid2D(data=data, geodict=gdict)
+        frame, window = get_window_frame(transform, ny, nx, gdict)
+        data = np.concatenate([self._readCells(grid_file, *cells)
+                               for cells in frame], axis=1)
+        return Grid2D(data, window)
+
+    def _getRegionFrame(self, grid_file):
+        # affine transform, number of rows and columns and GeoDict of the
+        # tectonic or oceanic grid
+        if self._types is not None:
+            _, transform, fdict = self._types
+            return (transform, fdict.ny, fdict.nx, fdict)
+        return self._getFileFrame(grid_file)
+
+    def _readRegionCells(self, grid_file, row0, row1, col0, col1):
+        # a block of cells of the tectonic or oceanic grid, from the packed
+        # raster if there is one.  Columns outside of the grid wrap around.
+        _, _, nx, _ = self._getRegionFrame(grid_file)
+        pieces = []
+        for start in range(col0 - col0 % nx, col1, nx):
+            c0 = max(col0, start) - start
+            c1 = min(col1, start + nx) - start
+            if self._types is not None:
+                codes, flags = unpack_region_types(self._types[0], row0, row1,
+                                                   c0, c1)
+                pieces.append(codes if grid_file == self._tectonic_grid
+                              else flags)
+            else:
+                pieces.append(self._readCells(grid_file, row0, row1, c0, c1))
+        return np.concatenate(pieces, axis=1)
+
+    def _readRegionWindow(self, grid_file, gdict):
+        # a window of the tectonic or oceanic grid, from the packed raster if
+        # there is one.  Both grids are unpacked from one read of the packed
+        # raster, and kept until a different window is read.
+        if self._types is None:
+            return self._readWindow(grid_file, gdict)
+        key = (gdict.xmin, gdict.xmax, gdict.ymin, gdict.ymax,
+               gdict.dx, gdict.dy, gdict.nx, gdict.ny)
+        if self._type_window is None or self._type_window[0] != key:
+            packed, transform, fdict = self._types
+            if not fdict.intersects(gdict):
+                data = np.ones((gdict.ny, gdict.nx)) * np.nan
+                grids = (Grid2D(data=data, geodict=gdict),
+                         Grid2D(data=data.copy(), geodict=gdict))
+            else:
+                frame, window = get_window_frame(transform, fdict.ny,
+                                                 fdict.nx, gdict)
+                blocks = [unpack_region_types(packed, *cells)
+                          for cells in frame]
+                grids = tuple(Grid2D(np.concatenate(pieces, axis=1), window)
+                              for pieces in zip(*blocks))
+            self._type_window = (key, grids)
+        if grid_file == self._tectonic_grid:
+            return self._type_window[1][0]
+        return self._type_window[1][1]
+
+    def _getTreeDistances(self, lat, lon):
+        # distances to the nearest edge of each region type not at the
+        # epicenter
+        tectonic_code, oceanic_code = self._getRegionCodes(lat, lon)
+        epicenter_codes = ([tectonic_code] * len(TECTONIC_REGIONS) +
+                           [oceanic_code] * len(OCEANIC_REGIONS))
+        point = _get_unit_vectors(lat, lon)[0]
+        distances = []
+        for tree, code, epicenter_code in zip(self._boundaries, DISTANCE_CODES,
+                                              epicenter_codes):
+            if code == epicenter_code:
+                distances.append(0.0)
+            elif tree is None:
+                distances.append(np.inf)
+            else:
+                chord, _ = tree.query(point)
+                distances.append(float(_get_chord_distance(chord)))
+        return OrderedDict(zip(DISTANCE_FIELDS, distances))
+
+
+class PolygonRegionalizer(Regionalizer):
+    """Determine tectonic region information from the region polygons.
+
+    The tectonic and oceanic region polygons are loaded once, and split into
+    small prepared pieces indexed by an STRtree.  For each event, the pieces
+    containing the epicenter give the region types at zero distance, and the
+    distances to the other region types are measured to the pieces that
+    intersect the search window (clipped to the window), projected into an
+    azimuthal equidistant projection centered on the epicenter.  No grids are
+    read, and the results follow those of the windowed grid search of
+    Regionalizer, where region types outside of the search window are at an
+    infinite distance.
+    """
+
+    def _loadRegionData(self):
+        # load and index the region polygons
+        datafolder = self._datafolder
+        polygons = []
+        fields = []
+        # where tectonic region polygons overlap, the type rasterized last is
+        # the one that applies.
+        covered = None
+        for code in reversed(TECTONIC_POLYGONS):
+            geom = _read_polygons(os.path.join(datafolder,
+                                               TECTONIC_POLYGONS[code]))
+            region = geom
+            if covered is None:
+                covered = geom
+            else:
+                region = shapely.difference(geom, covered)
+                covered = shapely.union(covered, geom)
+            pieces = _split_geometry(region)
+            polygons += pieces
+            fields += [DISTANCE_FIELDS.index(TECTONIC_REGIONS[code])] * len(pieces)
+        oceanic = _read_polygons(os.path.join(datafolder, OCEANIC_POLYGONS))
+        continental = shapely.difference(shapely.box(-180, -90, 180, 90),
+                                         oceanic)
+        for code, region in [(1, oceanic), (0, continental)]:
+            pieces = _split_geometry(region)
+            polygons += pieces
+            fields += [DISTANCE_FIELDS.index(OCEANIC_REGIONS[code])] * len(pieces)
+        self._polygons = np.array(polygons, dtype=object)
+        self._polygon_fields = np.array(fields)
+        shapely.prepare(self._polygons)
+        self._tree = shapely.STRtree(self._polygons)
+
+    def _getDistancesBatch(self, lats, lons):
+        distances = OrderedDict((field, np.zeros(len(lats)))
+                                for field in DISTANCE_FIELDS)
+        for i, (lat, lon) in enumerate(zip(lats, lons)):
+            for field, dist in self._getDistances(lat, lon).items():
+                distances[field][i] = dist
+        return distances
+
+    def _getRegionCodesBatch(self, lats, lons):
+        codes = np.array([self._getRegionCodes(lat, lon)
+                          for lat, lon in zip(lats, lons)], dtype=int)
+        codes = codes.reshape((len(lats), 2))
+        return (codes[:, 0], codes[:, 1])
+
+    def _getRegionCodes(self, lat, lon):
+        # tectonic region code and oceanic flag of the pieces containing the
+        # epicenter
+        index = self._tree.query(shapely.Point(lon, lat), predicate='intersects')
+        codes = [0, 0]
+        for field in self._polygon_fields[index]:
+            if DISTANCE_FIELDS[field] in OCEANIC_REGIONS.values():
+                codes[1] = max(codes[1], DISTANCE_CODES[field])
+            else:
+                codes[0] = DISTANCE_CODES[field]
+        return tuple(codes)
+
+    def _getDistances(self, lat, lon):
+        distances = np.full(len(DISTANCE_FIELDS), np.inf)
+        origin = shapely.Point(0, 0)
+        for box in get_window_boxes(lat, lon):
+            index = self._tree.query(shapely.box(*box))
+            if not len(index):
+                continue
+            polygons = self._polygons[index]
+            fields = self._polygon_fields[index]
+            inside = shapely.contains_xy(polygons, lon, lat)
+            distances[fields[inside]] = 0
+            outside = ~inside & (distances[fields] > 0)
+            if not outside.any():
+                continue
+            clipped = shapely.clip_by_rect(polygons[outside], *box)
+            projected = shapely.transform(
+                clipped, lambda coords: project_aeqd(coords, lat, lon))
+            dists = shapely.distance(projected, origin)
+            # pieces with nothing left inside the window are NaN
+            dists[np.isnan(dists)] = np.inf
+            np.minimum.at(distances, fields[outside], dists)
+        return OrderedDict(zip(DISTANCE_FIELDS, distances.tolist()))
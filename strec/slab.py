@@ -1,23 +1,1528 @@
 # stdlib imports
 import os.path
 import glob
+import json
+import math
+from collections import OrderedDict
 
 # third party imports
 from mapio.gmt import GMTGrid
+from mapio.geodict import GeoDict
+from mapio.dataset import DataSetException
 import numpy as np
 import pandas as pd
+import pyproj
+from scipy.spatial import cKDTree
 
 MAX_INTERFACE_DEPTH = 70  # depth beyond which any tectonic regime has to be intraslab
 
 # Slab 1.0 does not have depth uncertainty, so we make this a constant
 DEFAULT_DEPTH_ERROR = 10
 
+# column names (and order) for batch slab query results
+SLAB_COLUMNS = ['region', 'strike', 'dip', 'depth',
+                'maximum_interface_depth', 'depth_uncertainty']
+
+# name of the (optional) table of maximum interface depths per slab region
+INTERFACE_TABLE = 'maximum_interface_depths.csv'
+
+# extensions of the raw (memory-mappable) copies of slab grids, and of the
+# JSON header files that describe them.
+MAPPED_DATA_EXT = '.bin'
+MAPPED_HEADER_EXT = '.json'
+
+# suffix of the files holding coarse occupancy masks of slab models, and the
+# number of grid cells along each side of an occupancy mask block.
+OCCUPANCY_SUFFIX = '_occupancy.npz'
+OCCUPANCY_FACTOR = 5
+
+# number of grid cells read on each side of the query points when slab grids
+# are read in windows.
+WINDOW_PAD = 1
+
+# name of the packed slab store, the marker at the start of that file, and the
+# number of grid cells along each side of a tile in the store.
+SLAB_STORE_FILE = 'slab_store.bin'
+SLAB_STORE_MAGIC = b'STRECSLB'
+SLAB_TILE_SIZE = 64
+
+# name and resolution (decimal degrees) of the global slab coverage raster
+COVERAGE_FILE = 'slab_coverage.npz'
+COVERAGE_RES = 0.1
+
+# suffix of the files caching KD-trees of slab surface nodes
+SURFACE_TREE_SUFFIX = '_surface.npz'
+
+# WGS84 ellipsoid semi-major axis (km) and first eccentricity squared
+WGS84_A = 6378.137
+WGS84_E2 = 6.69437999014e-3
+
+# name of the file holding the edges of the valid data of all slab models,
+# and the mean radius of the earth (km) used to measure distances to them.
+BOUNDARY_FILE = 'slab_boundaries.npz'
+EARTH_RADIUS = 6371.0
+
+# lower bound (km) on the distance from the center of the earth to any slab
+# surface node or hypocenter, used to size the windows of slab depth grids
+# read for slab surface distances in windowed mode, and the number of extra
+# grid cells read around those windows.
+SURFACE_WINDOW_RADIUS = EARTH_RADIUS - 1000.0
+SURFACE_WINDOW_PAD = 2
+
+# column names (and order) for batch nearest slab and slab distance query
+# results
+NEAREST_SLAB_COLUMNS = ['region', 'distance', 'lat', 'lon', 'depth']
+
+# name of the slab manifest, listing the slab models in a slab data folder
+SLAB_MANIFEST_FILE = 'slab_manifest.json'
+
+# slab model layers, in the order depth, dip, strike, depth uncertainty
+SLAB_LAYERS = ['dep', 'dip', 'str', 'unc']
+
+
+def get_profile_points(lat0, lon0, lat1, lon1, npoints):
+    """Return equally spaced points along the geodesic between two points.
+
+    Args:
+        lat0 (float): Latitude of start of profile in decimal degrees.
+        lon0 (float): Longitude of start of profile in decimal degrees.
+        lat1 (float): Latitude of end of profile in decimal degrees.
+        lon1 (float): Longitude of end of profile in decimal degrees.
+        npoints (int): Number of points, including both ends of the profile.
+    Returns:
+        tuple: (latitudes, longitudes (-180 to 180), distances in km from the
+               start of the profile) as numpy arrays.
+    """
+    geod = pyproj.Geod(ellps='WGS84')
+    azimuth, _, length = geod.inv(lon0, lat0, lon1, lat1)
+    distances = np.linspace(0, length, npoints)
+    lons, lats, _ = geod.fwd(np.full(npoints, float(lon0)),
+                             np.full(npoints, float(lat0)),
+                             np.full(npoints, azimuth), distances)
+    lons = np.asarray(lons, dtype=np.float64)
+    lons = np.where(lons > 180, lons - 360, lons)
+    lons = np.where(lons < -180, lons + 360, lons)
+    return (np.asarray(lats, dtype=np.float64), lons, distances / 1000)
+
+
+def read_interface_depths(datafolder):
+    """Read the table of maximum interface depths found in a slab data folder.
+
+    Args:
+        datafolder (str): Path to directory containing slab grids.
+    Returns:
+        dict: Dictionary of maximum interface depths keyed by region code, or
+              None if no table is present in datafolder.
+    """
+    table_file_name = os.path.join(datafolder, INTERFACE_TABLE)
+    if not os.path.isfile(table_file_name):
+        return None
+    df = pd.read_csv(table_file_name)
+    depths = {}
+    for _, row in df.iterrows():
+        zone = row['zone'].strip()
+        # the first entry for a zone wins, as it did when querying the table
+        if zone not in depths:
+            depths[zone] = row['interface_max_depth']
+    return depths
+
+
+def _get_row_cols(gdict, lats, lons):
+    # same nearest neighbor arithmetic as GeoDict.getRowCol(), without
+    # modifying the input longitudes in place.
+    if gdict.xmax < gdict.xmin:
+        lons = np.where(lons < 0, lons + 360, lons)
+    rows = np.round((gdict.ymax - lats) / gdict.dy).astype(int)
+    cols = np.round((lons - gdict.xmin) / gdict.dx).astype(int)
+    return (rows, cols)
+
+
+def _contains_lon(xmin, xmax, lons):
+    # longitude part of GridSlab.contains(), where bounding boxes whose xmin
+    # is greater than xmax wrap across the antimeridian.
+    wraps = xmin > xmax
+    lo = np.where(wraps & (lons < 0), xmin - 360, xmin)
+    hi = np.where(wraps & (lons >= 0), xmax + 360, xmax)
+    return (lons >= lo) & (lons <= hi)
+
+
+def _load_grid(grid_file):
+    # return (data, geodict) for one slab grid, memory mapping the raw copy
+    # if there is one.
+    layer = read_mapped_grid(grid_file)
+    if layer is None:
+        grid = GMTGrid.load(grid_file)
+        layer = (grid.getData(), grid.getGeoDict())
+    return layer
+
+
+def _get_mapped_files(grid_file):
+    stem, ext = os.path.splitext(grid_file)
+    return (stem + MAPPED_DATA_EXT, stem + MAPPED_HEADER_EXT)
+
+
+def _get_source_stamp(grid_file):
+    stat = os.stat(grid_file)
+    return {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+
+def write_mapped_grid(grid_file):
+    """Write a raw memory-mappable copy of a slab grid, plus a JSON header.
+
+    Args:
+        grid_file (str): Path to slab grid file.
+    Returns:
+        tuple: (Path to raw data file, path to JSON header file).
+    """
+    data_file, header_file = _get_mapped_files(grid_file)
+    grid = GMTGrid.load(grid_file)
+    data = np.ascontiguousarray(grid.getData())
+    gd = grid.getGeoDict()
+    header = {'xmin': gd.xmin, 'xmax': gd.xmax,
+              'ymin': gd.ymin, 'ymax': gd.ymax,
+              'dx': gd.dx, 'dy': gd.dy,
+              'nx': gd.nx, 'ny': gd.ny,
+              'dtype': data.dtype.str,
+              'source': _get_source_stamp(grid_file)}
+    # write to temporary files and move them into place, so that other
+    # processes never see a partially written file.
+    tmp_data_file = data_file + '.tmp'
+    tmp_header_file = header_file + '.tmp'
+    data.tofile(tmp_data_file)
+    with open(tmp_header_file, 'wt') as f:
+        json.dump(header, f)
+    os.replace(tmp_data_file, data_file)
+    os.replace(tmp_header_file, header_file)
+    return (data_file, header_file)
+
+
+def _read_mapped_header(grid_file):
+    data_file, header_file = _get_mapped_files(grid_file)
+    if not os.path.isfile(header_file) or not os.path.isfile(data_file):
+        return None
+    with open(header_file, 'rt') as f:
+        header = json.load(f)
+    # the raw copy is stale if the source grid has changed since it was made
+    if header['source'] != _get_source_stamp(grid_file):
+        return None
+    return header
+
+
+def _get_header_geodict(header):
+    keys = ['xmin', 'xmax', 'ymin', 'ymax', 'dx', 'dy', 'nx', 'ny']
+    return GeoDict({key: header[key] for key in keys})
+
+
+def read_mapped_grid(grid_file):
+    """Memory map the raw copy of a slab grid written by write_mapped_grid().
+
+    Args:
+        grid_file (str): Path to slab grid file.
+    Returns:
+        tuple: (Read-only numpy memmap of grid data, GeoDict), or None if there
+               is no up to date raw copy of grid_file.
+    """
+    header = _read_mapped_header(grid_file)
+    if header is None:
+        return None
+    data_file, _ = _get_mapped_files(grid_file)
+    data = np.memmap(data_file, dtype=np.dtype(header['dtype']), mode='r',
+                     shape=(header['ny'], header['nx']))
+    return (data, _get_header_geodict(header))
+
+
+def convert_slab_grids(datafolder):
+    """Write memory-mappable copies of all slab grids in a folder.
+
+    Processes reading these copies share a single copy of the data through
+    the operating system page cache, and only read the pages they query.
+
+    Args:
+        datafolder (str): Path to directory containing slab grids.
+    Returns:
+        list: List of raw data files written.
+    """
+    data_files = []
+    for depth_file in glob.glob(os.path.join(datafolder, '*_dep*.grd')):
+        for layer in ['dep', 'dip', 'str', 'unc']:
+            grid_file = depth_file.replace('dep', layer)
+            if not os.path.isfile(grid_file):
+                continue
+            data_file, _ = write_mapped_grid(grid_file)
+            data_files.append(data_file)
+    return data_files
+
+
+def _get_occupancy_file(depth_file):
+    stem, ext = os.path.splitext(depth_file)
+    return stem + OCCUPANCY_SUFFIX
+
+
+def _get_occupancy_sources(depth_file):
+    # the depth, dip, strike and uncertainty grids that exist for a slab model
+    grid_files = []
+    for layer in SLAB_LAYERS:
+        grid_file = depth_file.replace('dep', layer)
+        if os.path.isfile(grid_file):
+            grid_files.append(grid_file)
+    return grid_files
+
+
+def compute_occupancy(grids, factor=OCCUPANCY_FACTOR):
+    """Compute a coarse mask of where any of a set of aligned grids has data.
+
+    Args:
+        grids (list): List of 2D numpy arrays of identical shape.
+        factor (int): Number of grid cells along each side of a mask block.
+    Returns:
+        ndarray: Boolean array, True for blocks where any cell of any grid is
+                 not NaN.
+    """
+    valid = np.zeros(grids[0].shape, dtype=bool)
+    for data in grids:
+        valid |= ~np.isnan(data)
+    ny, nx = valid.shape
+    mny = int(np.ceil(ny / factor))
+    mnx = int(np.ceil(nx / factor))
+    padded = np.zeros((mny * factor, mnx * factor), dtype=bool)
+    padded[:ny, :nx] = valid
+    return padded.reshape(mny, factor, mnx, factor).any(axis=(1, 3))
+
+
+def write_occupancy(depth_file, factor=OCCUPANCY_FACTOR):
+    """Write the occupancy mask for the slab model with a given depth grid.
+
+    Blocks are marked as occupied where any of the depth, dip, strike or
+    uncertainty grids has data.
+
+    Args:
+        depth_file (str): Path to slab depth grid file.
+        factor (int): Number of grid cells along each side of a mask block.
+    Returns:
+        str: Path to occupancy mask file.
+    """
+    grid_files = _get_occupancy_sources(depth_file)
+    grids = [GMTGrid.load(grid_file).getData() for grid_file in grid_files]
+    mask = compute_occupancy(grids, factor=factor)
+    occupancy_file = _get_occupancy_file(depth_file)
+    tmp_file = occupancy_file + '.tmp.npz'
+    # the mask is stale if any of the grids it was made from changes
+    np.savez(tmp_file, mask=mask, factor=factor,
+             **_get_source_stamp_arrays(grid_files))
+    os.replace(tmp_file, occupancy_file)
+    return occupancy_file
+
+
+def read_occupancy(depth_file):
+    """Read the occupancy mask written by write_occupancy().
+
+    Args:
+        depth_file (str): Path to slab depth grid file.
+    Returns:
+        tuple: (Boolean mask array, number of grid cells along each side of a
+               mask block), or None if there is no up to date mask.
+    """
+    occupancy_file = _get_occupancy_file(depth_file)
+    if not os.path.isfile(occupancy_file):
+        return None
+    with np.load(occupancy_file) as npz:
+        if not _check_source_stamps(npz, _get_occupancy_sources(depth_file)):
+            return None
+        return (npz['mask'], int(npz['factor']))
+
+
+def build_occupancy_masks(datafolder):
+    """Write occupancy masks for all slab models in a folder.
+
+    Args:
+        datafolder (str): Path to directory containing slab grids.
+    Returns:
+        list: List of occupancy mask files written.
+    """
+    occupancy_files = []
+    for depth_file in glob.glob(os.path.join(datafolder, '*_dep*.grd')):
+        occupancy_files.append(write_occupancy(depth_file))
+    return occupancy_files
+
+
+def _get_store_data_offset(header_length):
+    # tile data starts at the first 64 byte boundary after the header
+    return int(np.ceil((len(SLAB_STORE_MAGIC) + 8 + header_length) / 64) * 64)
+
+
+def build_slab_store(datafolder, tile_size=SLAB_TILE_SIZE):
+    """Pack all slab grids in a folder into a single tiled float32 file.
+
+    Each grid is split into square tiles, and tiles where every cell is NaN
+    are not stored.  The store is written to SLAB_STORE_FILE in datafolder.
+
+    Args:
+        datafolder (str): Path to directory containing slab grids.
+        tile_size (int): Number of grid cells along each side of a tile.
+    Returns:
+        str: Path to slab store file.
+    """
+    grids = {}
+    chunks = []
+    ntiles = 0
+    for depth_file in sorted(glob.glob(os.path.join(datafolder, '*_dep*.grd'))):
+        for layer in ['dep', 'dip', 'str', 'unc']:
+            grid_file = depth_file.replace('dep', layer)
+            if not os.path.isfile(grid_file):
+                continue
+            grid = GMTGrid.load(grid_file)
+            data = grid.getData().astype(np.float32)
+            gd = grid.getGeoDict()
+            ny, nx = data.shape
+            ntr = int(np.ceil(ny / tile_size))
+            ntc = int(np.ceil(nx / tile_size))
+            padded = np.full((ntr * tile_size, ntc * tile_size), np.nan,
+                             dtype=np.float32)
+            padded[:ny, :nx] = data
+            offsets = np.full((ntr, ntc), -1, dtype=np.int64)
+            for itr in range(ntr):
+                for itc in range(ntc):
+                    tile = padded[itr * tile_size:(itr + 1) * tile_size,
+                                  itc * tile_size:(itc + 1) * tile_size]
+                    if np.isnan(tile).all():
+                        continue
+                    offsets[itr, itc] = ntiles * tile_size * tile_size
+                    chunks.append(np.ascontiguousarray(tile))
+                    ntiles += 1
+            grids[os.path.basename(grid_file)] = {
+                'geodict': {'xmin': gd.xmin, 'xmax': gd.xmax,
+                            'ymin': gd.ymin, 'ymax': gd.ymax,
+                            'dx': gd.dx, 'dy': gd.dy,
+                            'nx': gd.nx, 'ny': gd.ny},
+                'source': _get_source_stamp(grid_file),
+                'offsets': offsets.tolist()}
+    header = json.dumps({'tile_size': tile_size, 'grids': grids}).encode('utf-8')
+    data_offset = _get_store_data_offset(len(header))
+    store_file = os.path.join(datafolder, SLAB_STORE_FILE)
+    tmp_file = store_file + '.tmp'
+    with open(tmp_file, 'wb') as f:
+        f.write(SLAB_STORE_MAGIC)
+        f.write(np.uint64(len(header)).tobytes())
+        f.write(header)
+        f.write(b'\0' * (data_offset - f.tell()))
+        for chunk in chunks:
+            f.write(chunk.tobytes())
+    os.replace(tmp_file, store_file)
+    return store_file
+
+
+class PackedGrid(object):
+    """Read-only grid stored as float32 tiles, where all-NaN tiles are omitted.
+
+    PackedGrid objects support the subset of numpy indexing used to sample
+    slab grids: data[rows, cols] with integer (array) rows and columns.
+    """
+
+    def __init__(self, values, offsets, shape, tile_size):
+        """Construct a PackedGrid.
+
+        Args:
+            values (ndarray): 1D float32 array holding the stored tiles.
+            offsets (ndarray): 2D array of the position in values of each tile
+                (row major, tile_size x tile_size), or -1 for all-NaN tiles.
+            shape (tuple): Number of rows and columns in the grid.
+            tile_size (int): Number of grid cells along each side of a tile.
+        """
+        self._values = values
+        self._offsets = offsets
+        self._shape = tuple(shape)
+        self._tile_size = tile_size
+
+    @property
+    def shape(self):
+        return self._shape
+
+    @property
+    def dtype(self):
+        return self._values.dtype
+
+    @property
+    def nbytes(self):
+        ntiles = np.count_nonzero(self._offsets >= 0)
+        return int(ntiles * self._tile_size ** 2 * self._values.itemsize)
+
+    def __getitem__(self, index):
+        rows, cols = index
+        rows = np.asarray(rows)
+        cols = np.asarray(cols)
+        tsize = self._tile_size
+        offsets = self._offsets[rows // tsize, cols // tsize]
+        empty = offsets < 0
+        positions = offsets + (rows % tsize) * tsize + cols % tsize
+        values = self._values[np.where(empty, 0, positions)]
+        values = np.where(empty, np.float32(np.nan), values)
+        if values.ndim == 0:
+            return values[()]
+        return values
+
+
+class SlabStore(object):
+    """Packed store of slab grids written by build_slab_store().
+
+    The store is memory mapped, so only the tiles that are queried are read.
+    """
+
+    def __init__(self, store_file):
+        """Open a slab store.
+
+        Args:
+            store_file (str): Path to slab store file.
+        Raises:
+            ValueError: When store_file is not a slab store.
+        """
+        with open(store_file, 'rb') as f:
+            magic = f.read(len(SLAB_STORE_MAGIC))
+            if magic != SLAB_STORE_MAGIC:
+                raise ValueError('%s is not a slab store file.' % store_file)
+            header_length = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+            header = json.loads(f.read(header_length).decode('utf-8'))
+        self._tile_size = header['tile_size']
+        self._grids = header['grids']
+        data_offset = _get_store_data_offset(header_length)
+        if os.path.getsize(store_file) > data_offset:
+            self._values = np.memmap(store_file, dtype=np.float32, mode='r',
+                                     offset=data_offset)
+        else:
+            self._values = np.zeros(0, dtype=np.float32)
+
+    @classmethod
+    def load(cls, datafolder):
+        """Open the slab store in a folder, if there is one.
+
+        Args:
+            datafolder (str): Path to directory containing slab grids.
+        Returns:
+            SlabStore: SlabStore object, or None if there is no store.
+        """
+        store_file = os.path.join(datafolder, SLAB_STORE_FILE)
+        if not os.path.isfile(store_file):
+            return None
+        return cls(store_file)
+
+    def _getEntry(self, grid_file):
+        entry = self._grids.get(os.path.basename(grid_file))
+        if entry is None:
+            return None
+        # ignore grids that have changed since the store was built
+        if entry['source'] != _get_source_stamp(grid_file):
+            return None
+        return entry
+
+    def getGeoDict(self, grid_file):
+        """Return the GeoDict of a stored grid.
+
+        Args:
+            grid_file (str): Path to slab grid file.
+        Returns:
+            GeoDict: GeoDict of grid, or None if the grid is not stored (or has
+                     changed since the store was built).
+        """
+        entry = self._getEntry(grid_file)
+        if entry is None:
+            return None
+        return _get_header_geodict(entry['geodict'])
+
+    def getGrid(self, grid_file):
+        """Return a stored grid.
+
+        Args:
+            grid_file (str): Path to slab grid file.
+        Returns:
+            tuple: (PackedGrid, GeoDict), or None if the grid is not stored (or
+                   has changed since the store was built).
+        """
+        entry = self._getEntry(grid_file)
+        if entry is None:
+            return None
+        gdict = _get_header_geodict(entry['geodict'])
+        offsets = np.array(entry['offsets'], dtype=np.int64)
+        grid = PackedGrid(self._values, offsets, (gdict.ny, gdict.nx),
+                          self._tile_size)
+        return (grid, gdict)
+
+
+def _get_coverage_cells(lats, lons, res):
+    # global coverage raster row/column containing each point
+    nrows = int(round(180 / res))
+    ncols = int(round(360 / res))
+    lons = np.mod(np.asarray(lons, dtype=np.float64) + 180, 360) - 180
+    rows = np.floor((np.asarray(lats, dtype=np.float64) + 90) / res).astype(int)
+    cols = np.floor((lons + 180) / res).astype(int)
+    return (np.clip(rows, 0, nrows - 1), np.clip(cols, 0, ncols - 1))
+
+
+def _get_source_stamp_arrays(depth_files):
+    # names, sizes and mtimes of slab grids, for saving with numpy
+    names = [os.path.basename(depth_file) for depth_file in depth_files]
+    stamps = [_get_source_stamp(depth_file) for depth_file in depth_files]
+    return {'names': np.array(names),
+            'sizes': np.array([stamp['size'] for stamp in stamps]),
+            'mtimes': np.array([stamp['mtime'] for stamp in stamps])}
+
+
+def _check_source_stamps(npz, depth_files):
+    # True if the arrays from _get_source_stamp_arrays() saved in npz describe
+    # exactly the (unchanged) slab grids in depth_files.
+    names = [str(name) for name in npz['names']]
+    stamps = [{'size': int(size), 'mtime': float(mtime)}
+              for size, mtime in zip(npz['sizes'], npz['mtimes'])]
+    current = {}
+    for depth_file in depth_files:
+        current[os.path.basename(depth_file)] = _get_source_stamp(depth_file)
+    if sorted(names) != sorted(current.keys()):
+        return False
+    return all(current[name] == stamp for name, stamp in zip(names, stamps))
+
+
+def build_slab_coverage(datafolder, res=COVERAGE_RES):
+    """Write a global raster listing the slab models with data in each cell.
+
+    A slab model is listed in every raster cell touched by the footprint of
+    any slab depth grid cell that is not NaN, so the raster never misses a
+    slab model that could return a depth for a point in that cell.  The
+    raster is written to COVERAGE_FILE in datafolder, and must be rebuilt
+    whenever slab depth grids change.
+
+    Args:
+        datafolder (str): Path to directory containing slab grids.
+        res (float): Resolution of raster in decimal degrees.
+    Returns:
+        str: Path to coverage raster file.
+    """
+    depth_files = sorted(glob.glob(os.path.join(datafolder, '*_dep*.grd')))
+    if len(depth_files) > 64:
+        raise ValueError('Slab coverage raster supports at most 64 slab models.')
+    nrows = int(round(180 / res))
+    ncols = int(round(360 / res))
+    bits = np.zeros((nrows, ncols), dtype=np.uint64)
+    # a small margin keeps the raster conservative at cell boundaries
+    margin = 1e-6
+    for ibit, depth_file in enumerate(depth_files):
+        data, gdict = _load_grid(depth_file)
+        rows, cols = np.nonzero(~np.isnan(data))
+        lats, lons = gdict.getLatLon(rows, cols)
+        hy = gdict.dy / 2 + margin
+        hx = gdict.dx / 2 + margin
+        r0, c0 = _get_coverage_cells(lats - hy, lons - hx, res)
+        r1, c1 = _get_coverage_cells(lats + hy, lons + hx, res)
+        # footprints that wrap across the antimeridian end in a lower column
+        c1 = np.where(c1 < c0, c1 + ncols, c1)
+        bit = np.uint64(1) << np.uint64(ibit)
+        for drow in range(int((r1 - r0).max(initial=0)) + 1):
+            for dcol in range(int((c1 - c0).max(initial=0)) + 1):
+                use = (r0 + drow <= r1) & (c0 + dcol <= c1)
+                cells_r = r0[use] + drow
+                cells_c = np.mod(c0[use] + dcol, ncols)
+                bits[cells_r, cells_c] |= bit
+    # store each cell as an index into the (short) list of distinct sets of
+    # slab models, rather than as a 64 bit mask.
+    sets, ids = np.unique(bits, return_inverse=True)
+    ids = ids.reshape(bits.shape).astype(np.min_scalar_type(len(sets) - 1))
+    coverage_file = os.path.join(datafolder, COVERAGE_FILE)
+    tmp_file = coverage_file + '.tmp.npz'
+    np.savez_compressed(tmp_file, ids=ids, sets=sets, res=res,
+                        **_get_source_stamp_arrays(depth_files))
+    os.replace(tmp_file, coverage_file)
+    return coverage_file
+
+
+class SlabCoverage(object):
+    """Global raster of the slab models with data in each cell.
+    """
+
+    def __init__(self, ids, sets, res):
+        """Construct a SlabCoverage object.
+
+        Args:
+            ids (ndarray): 2D array (south row first, starting at -180
+                longitude) of indices into sets.
+            sets (ndarray): Boolean array of shape (number of distinct sets,
+                number of slab models), True where the slab model is a member
+                of the set.
+            res (float): Resolution of raster in decimal degrees.
+        """
+        self._ids = ids
+        self._sets = sets
+        self._res = res
+
+    @classmethod
+    def load(cls, datafolder, depth_files):
+        """Load the coverage raster written by build_slab_coverage().
+
+        Args:
+            datafolder (str): Path to directory containing slab grids.
+            depth_files (list): Slab depth grid files, in the order in which
+                slab models should be numbered.
+        Returns:
+            SlabCoverage: SlabCoverage object, or None if the raster is
+                missing or was built from different slab depth grids.
+        """
+        coverage_file = os.path.join(datafolder, COVERAGE_FILE)
+        if not os.path.isfile(coverage_file):
+            return None
+        with np.load(coverage_file) as npz:
+            names = [str(name) for name in npz['names']]
+            if not _check_source_stamps(npz, depth_files):
+                return None
+            ids = npz['ids']
+            bits = npz['sets']
+            res = float(npz['res'])
+        sets = np.zeros((len(bits), len(depth_files)), dtype=bool)
+        for islab, depth_file in enumerate(depth_files):
+            ibit = names.index(os.path.basename(depth_file))
+            bit = np.uint64(1) << np.uint64(ibit)
+            sets[:, islab] = (bits & bit) != 0
+        return cls(ids, sets, res)
+
+    def getCandidates(self, lat, lon):
+        """Return the slab models with data near a point.
+
+        Args:
+            lat (float):  Latitude in decimal degrees.
+            lon (float):  Longitude in decimal degrees.
+        Returns:
+            ndarray: Boolean array, True for slab models with data in the
+                     raster cell containing the point.
+        """
+        row, col = _get_coverage_cells(lat, lon, self._res)
+        return self._sets[self._ids[row, col]]
+
+    def getCandidatesBatch(self, lats, lons):
+        """Vectorized version of getCandidates().
+
+        Args:
+            lats (ndarray):  Latitudes in decimal degrees.
+            lons (ndarray):  Longitudes in decimal degrees.
+        Returns:
+            ndarray: Boolean array of shape (number of points, number of slab
+                     models), True for slab models with data in the raster
+                     cell containing each point.
+        """
+        rows, cols = _get_coverage_cells(lats, lons, self._res)
+        return self._sets[self._ids[rows, cols]]
+
+
+def geodetic_to_ecef(lats, lons, depths):
+    """Convert WGS84 geodetic coordinates to earth centered, earth fixed ones.
+
+    Args:
+        lats (ndarray): Latitudes in decimal degrees.
+        lons (ndarray): Longitudes in decimal degrees.
+        depths (ndarray): Depths below the ellipsoid in km.
+    Returns:
+        ndarray: Array of (x, y, z) coordinates in km, with shape (N, 3).
+    """
+    lats = np.radians(np.asarray(lats, dtype=np.float64))
+    lons = np.radians(np.asarray(lons, dtype=np.float64))
+    heights = -1 * np.asarray(depths, dtype=np.float64)
+    sinlat = np.sin(lats)
+    coslat = np.cos(lats)
+    radius = WGS84_A / np.sqrt(1 - WGS84_E2 * sinlat ** 2)
+    x = (radius + heights) * coslat * np.cos(lons)
+    y = (radius + heights) * coslat * np.sin(lons)
+    z = (radius * (1 - WGS84_E2) + heights) * sinlat
+    return np.column_stack([np.ravel(x), np.ravel(y), np.ravel(z)])
+
+
+def _dot(u, v):
+    # row-wise dot products of (..., 3) arrays
+    return np.einsum('...i,...i->...', u, v)
+
+
+def _cross(u, v):
+    # row-wise cross products of (N, 3) arrays (faster than np.cross for the
+    # small arrays of single queries)
+    return np.column_stack([u[:, 1] * v[:, 2] - u[:, 2] * v[:, 1],
+                            u[:, 2] * v[:, 0] - u[:, 0] * v[:, 2],
+                            u[:, 0] * v[:, 1] - u[:, 1] * v[:, 0]])
+
+
+def _get_segment_distance(points, start, end):
+    # distances from points to the segments from start to end (all (..., 3))
+    segment = end - start
+    length2 = _dot(segment, segment)
+    t = _dot(points - start, segment) / np.where(length2 > 0, length2, 1)
+    t = np.clip(t, 0, 1)
+    offset = points - start - t[..., np.newaxis] * segment
+    return np.sqrt(_dot(offset, offset))
+
+
+def _get_triangle_distance(points, a, b, c):
+    # distances from points to the triangles a, b, c (all (N, 3)).  The
+    # closest point is either the projection of the point onto the plane of
+    # the triangle, or on one of its edges.
+    ab = b - a
+    ac = c - a
+    normal = _cross(ab, ac)
+    area2 = _dot(normal, normal)
+    ap = points - a
+    # barycentric coordinates of the projection onto the plane
+    v = _dot(_cross(ap, ac), normal) / area2
+    w = _dot(_cross(ab, ap), normal) / area2
+    inside = (v >= 0) & (w >= 0) & (v + w <= 1)
+    plane_distance = np.abs(_dot(ap, normal)) / np.sqrt(area2)
+    edge_distance = _get_segment_distance(np.stack([points, points, points]),
+                                          np.stack([a, b, a]),
+                                          np.stack([b, c, c])).min(axis=0)
+    return np.where(inside, plane_distance, edge_distance)
+
+
+class SurfaceTree(object):
+    """KD-tree of the earth centered, earth fixed positions of slab surface nodes.
+
+    Distances are measured to the surface made by splitting each grid cell with
+    slab depths at all four corners into two triangles, around the slab
+    surface node nearest to each query point.
+    """
+
+    def __init__(self, tree, node_index, depths, gdict):
+        """Construct a SurfaceTree.
+
+        Args:
+            tree (cKDTree): KD-tree of slab surface node positions (km).
+            node_index (ndarray): 2D array of the position in the tree of each
+                slab depth grid node, or -1 where there is no slab.
+            depths (ndarray): Slab depth (km) of each node in the tree.
+            gdict (GeoDict): GeoDict of the slab depth grid.
+        """
+        self._tree = tree
+        self._node_index = node_index
+        self._depths = depths
+        self._gdict = gdict
+        # grid row and column of each tree node
+        self._rows, self._cols = np.divmod(np.flatnonzero(node_index >= 0),
+                                           node_index.shape[1])
+
+    @classmethod
+    def fromGrid(cls, data, gdict):
+        """Build a SurfaceTree from a slab depth grid.
+
+        Args:
+            data (ndarray): 2D array of (negative) slab depths.
+            gdict (GeoDict): GeoDict of the slab depth grid.
+        Returns:
+            SurfaceTree: SurfaceTree object.
+        """
+        data = np.asarray(data)
+        valid = ~np.isnan(data)
+        rows, cols = np.nonzero(valid)
+        lats = gdict.ymax - rows * gdict.dy
+        lons = gdict.xmin + cols * gdict.dx
+        # slab grids are negative depth
+        depths = -1 * data[rows, cols]
+        points = geodetic_to_ecef(lats, lons, depths)
+        node_index = np.full(data.shape, -1, dtype=np.int32)
+        node_index[rows, cols] = np.arange(len(rows))
+        return cls(cKDTree(points), node_index, depths, gdict)
+
+    @property
+    def nbytes(self):
+        """Approximate size in bytes of the tree, as counted by GridCache.
+        """
+        arrays = [self._tree.data, self._tree.indices, self._node_index,
+                  self._depths, self._rows, self._cols]
+        return sum(array.nbytes for array in arrays)
+
+    def getNodeCount(self):
+        """Return the number of slab surface nodes in the tree.
+
+        Returns:
+            int: Number of nodes.
+        """
+        return self._tree.n
+
+    def query(self, lats, lons, depths):
+        """Find the distance from points to the slab surface.
+
+        Args:
+            lats (ndarray): Latitudes in decimal degrees.
+            lons (ndarray): Longitudes in decimal degrees.
+            depths (ndarray): Depths in km.
+        Returns:
+            tuple: (distances in km to the slab surface, latitudes, longitudes
+                   and depths of the nearest slab surface nodes) as arrays.
+        """
+        points = geodetic_to_ecef(np.atleast_1d(lats), np.atleast_1d(lons),
+                                  np.atleast_1d(depths))
+        if not self._tree.n:
+            empty = np.full(len(points), np.nan)
+            return (empty, empty.copy(), empty.copy(), empty.copy())
+        distances, nodes = self._tree.query(points)
+        rows = self._rows[nodes]
+        cols = self._cols[nodes]
+        ny, nx = self._node_index.shape
+        # the upper left corners of the four cells sharing the nearest node
+        row0 = rows[:, np.newaxis] + np.array([-1, -1, 0, 0])
+        col0 = cols[:, np.newaxis] + np.array([-1, 0, -1, 0])
+        incell = (row0 >= 0) & (row0 < ny - 1) & (col0 >= 0) & (col0 < nx - 1)
+        row0 = np.where(incell, row0, 0)
+        col0 = np.where(incell, col0, 0)
+        index = self._node_index
+        upper_left = index[row0, col0]
+        upper_right = index[row0, col0 + 1]
+        lower_left = index[row0 + 1, col0]
+        lower_right = index[row0 + 1, col0 + 1]
+        # each cell is split into two triangles
+        a = np.concatenate([upper_left, upper_right], axis=1)
+        b = np.concatenate([upper_right, lower_right], axis=1)
+        c = np.concatenate([lower_left, lower_left], axis=1)
+        valid = np.tile(incell, 2) & (a >= 0) & (b >= 0) & (c >= 0)
+        if valid.any():
+            positions = self._tree.data
+            tpoints = np.broadcast_to(points[:, np.newaxis], a.shape + (3,))
+            tdist = np.full(a.shape, np.inf)
+            tdist[valid] = _get_triangle_distance(tpoints[valid],
+                                                  positions[a[valid]],
+                                                  positions[b[valid]],
+                                                  positions[c[valid]])
+            distances = np.minimum(distances, tdist.min(axis=1))
+        gdict = self._gdict
+        node_lats = gdict.ymax - rows * gdict.dy
+        node_lons = gdict.xmin + cols * gdict.dx
+        node_lons = np.where(node_lons > 180, node_lons - 360, node_lons)
+        node_depths = self._depths[nodes].astype(np.float64)
+        return (distances, node_lats, node_lons, node_depths)
+
+
+def _get_surface_tree_file(depth_file):
+    stem, ext = os.path.splitext(depth_file)
+    return stem + SURFACE_TREE_SUFFIX
+
+
+def write_surface_tree(depth_file):
+    """Build and cache the SurfaceTree of a slab depth grid.
+
+    Args:
+        depth_file (str): Path to slab depth grid file.
+    Returns:
+        str: Path to the cached SurfaceTree file.
+    """
+    tree_file = _get_surface_tree_file(depth_file)
+    data, gdict = _load_grid(depth_file)
+    surface_tree = SurfaceTree.fromGrid(data, gdict)
+    stamp = _get_source_stamp(depth_file)
+    # the KD-tree is rebuilt from the node positions when the file is read
+    tmp_file = tree_file + '.tmp.npz'
+    np.savez(tmp_file, node_index=surface_tree._node_index,
+             positions=surface_tree._tree.data,
+             depths=surface_tree._depths,
+             xmin=gdict.xmin, xmax=gdict.xmax,
+             ymin=gdict.ymin, ymax=gdict.ymax,
+             dx=gdict.dx, dy=gdict.dy, nx=gdict.nx, ny=gdict.ny,
+             size=stamp['size'], mtime=stamp['mtime'])
+    os.replace(tmp_file, tree_file)
+    return tree_file
+
+
+def read_surface_tree(depth_file):
+    """Read the SurfaceTree cached by write_surface_tree().
+
+    Args:
+        depth_file (str): Path to slab depth grid file.
+    Returns:
+        SurfaceTree: SurfaceTree object, or None if there is no up to date
+                     cached tree.
+    """
+    tree_file = _get_surface_tree_file(depth_file)
+    if not os.path.isfile(tree_file):
+        return None
+    with np.load(tree_file, allow_pickle=False) as npz:
+        stamp = {'size': int(npz['size']), 'mtime': float(npz['mtime'])}
+        if stamp != _get_source_stamp(depth_file):
+            return None
+        return SurfaceTree(cKDTree(npz['positions']), npz['node_index'],
+                           npz['depths'], _get_header_geodict(npz))
+
+
+def build_surface_trees(datafolder):
+    """Cache the SurfaceTree of every slab model in a folder.
+
+    Args:
+        datafolder (str): Path to directory containing slab grids.
+    Returns:
+        list: List of cached SurfaceTree files written.
+    """
+    tree_files = []
+    for depth_file in glob.glob(os.path.join(datafolder, '*_dep*.grd')):
+        tree_files.append(write_surface_tree(depth_file))
+    return tree_files
+
+
+def compute_slab_boundary(data, gdict):
+    """Find the grid nodes on the edges of the valid data of a slab depth grid.
+
+    Edge nodes are nodes with a slab depth, at least one of whose four
+    neighbors has no slab depth (or is outside the grid).
+
+    Args:
+        data (ndarray): 2D array of (negative) slab depths.
+        gdict (GeoDict): GeoDict of the slab depth grid.
+    Returns:
+        tuple: (latitudes, longitudes (-180 to 180), slab depths in km) of the
+               edge nodes, as arrays.
+    """
+    valid = ~np.isnan(np.asarray(data))
+    padded = np.pad(valid, 1, constant_values=False)
+    interior = (padded[:-2, 1:-1] & padded[2:, 1:-1] &
+                padded[1:-1, :-2] & padded[1:-1, 2:])
+    rows, cols = np.nonzero(valid & ~interior)
+    lats = gdict.ymax - rows * gdict.dy
+    lons = gdict.xmin + cols * gdict.dx
+    lons = np.where(lons > 180, lons - 360, lons)
+    # slab grids are negative depth
+    depths = -1 * np.asarray(data)[rows, cols]
+    return (lats, lons, depths)
+
+
+def _get_unit_vectors(lats, lons):
+    # positions on the unit sphere of points in decimal degrees
+    lats = np.radians(np.asarray(lats, dtype=np.float64))
+    lons = np.radians(np.asarray(lons, dtype=np.float64))
+    coslat = np.cos(lats)
+    return np.column_stack([np.ravel(coslat * np.cos(lons)),
+                            np.ravel(coslat * np.sin(lons)),
+                            np.ravel(np.sin(lats))])
+
+
+def build_slab_boundaries(datafolder):
+    """Write the edges of the valid data of all slab models in a folder.
+
+    The edge nodes are written to BOUNDARY_FILE in datafolder, and must be
+    rebuilt whenever slab depth grids change.
+
+    Args:
+        datafolder (str): Path to directory containing slab grids.
+    Returns:
+        str: Path to slab boundary file.
+    """
+    depth_files = sorted(glob.glob(os.path.join(datafolder, '*_dep*.grd')))
+    boundaries = SlabBoundaries.fromGrids(depth_files)
+    boundary_file = os.path.join(datafolder, BOUNDARY_FILE)
+    tmp_file = boundary_file + '.tmp.npz'
+    np.savez_compressed(tmp_file, lats=boundaries._lats, lons=boundaries._lons,
+                        depths=boundaries._depths, slabs=boundaries._slabs,
+                        **_get_source_stamp_arrays(depth_files))
+    os.replace(tmp_file, boundary_file)
+    return boundary_file
+
+
+class SlabBoundaries(object):
+    """Spatial index of the edges of the valid data of a set of slab models.
+
+    Edge nodes of all slab models are held in one KD-tree of positions on the
+    unit sphere, so that the nearest slab to any point can be found without
+    looking at each slab model in turn.
+    """
+
+    def __init__(self, lats, lons, depths, slabs):
+        """Construct a SlabBoundaries object.
+
+        Args:
+            lats (ndarray): Latitudes of slab edge nodes.
+            lons (ndarray): Longitudes of slab edge nodes.
+            depths (ndarray): Slab depths (km) at slab edge nodes.
+            slabs (ndarray): Index of the slab model of each edge node.
+        """
+        self._lats = np.asarray(lats, dtype=np.float64)
+        self._lons = np.asarray(lons, dtype=np.float64)
+        self._depths = np.asarray(depths, dtype=np.float32)
+        self._slabs = np.asarray(slabs, dtype=np.int16)
+        self._tree = cKDTree(_get_unit_vectors(self._lats, self._lons))
+
+    @classmethod
+    def fromGrids(cls, depth_files):
+        """Find the slab edge nodes of a list of slab depth grids.
+
+        Args:
+            depth_files (list): Slab depth grid files, in the order in which
+                slab models should be numbered.
+        Returns:
+            SlabBoundaries: SlabBoundaries object.
+        """
+        lats = [np.zeros(0)]
+        lons = [np.zeros(0)]
+        depths = [np.zeros(0)]
+        slabs = [np.zeros(0, dtype=int)]
+        for islab, depth_file in enumerate(depth_files):
+            data, gdict = _load_grid(depth_file)
+            slab_lats, slab_lons, slab_depths = compute_slab_boundary(data, gdict)
+            lats.append(slab_lats)
+            lons.append(slab_lons)
+            depths.append(slab_depths)
+            slabs.append(np.full(len(slab_lats), islab))
+        return cls(np.concatenate(lats), np.concatenate(lons),
+                   np.concatenate(depths), np.concatenate(slabs))
+
+    @classmethod
+    def load(cls, datafolder, depth_files):
+        """Load the slab edge nodes written by build_slab_boundaries().
+
+        Args:
+            datafolder (str): Path to directory containing slab grids.
+            depth_files (list): Slab depth grid files, in the order in which
+                slab models should be numbered.
+        Returns:
+            SlabBoundaries: SlabBoundaries object, or None if the file is
+                missing or was built from different slab depth grids.
+        """
+        boundary_file = os.path.join(datafolder, BOUNDARY_FILE)
+        if not os.path.isfile(boundary_file):
+            return None
+        with np.load(boundary_file) as npz:
+            if not _check_source_stamps(npz, depth_files):
+                return None
+            names = [str(name) for name in npz['names']]
+            # renumber slab models in the order of depth_files
+            numbers = np.zeros(len(names), dtype=int)
+            for islab, depth_file in enumerate(depth_files):
+                numbers[names.index(os.path.basename(depth_file))] = islab
+            slabs = numbers[npz['slabs']]
+            return cls(npz['lats'], npz['lons'], npz['depths'], slabs)
+
+    def query(self, lats, lons):
+        """Find the nearest slab edge nodes to points.
+
+        Args:
+            lats (ndarray): Latitudes in decimal degrees.
+            lons (ndarray): Longitudes in decimal degrees.
+        Returns:
+            tuple: (index of the nearest slab model (-1 if there are none),
+                   great circle distances (km), latitudes, longitudes, and
+                   slab depths (km) of the nearest slab edge nodes), as arrays.
+        """
+        points = _get_unit_vectors(np.atleast_1d(lats), np.atleast_1d(lons))
+        npoints = len(points)
+        if not self._tree.n:
+            empty = np.full(npoints, np.nan)
+            return (np.full(npoints, -1), empty, empty.copy(), empty.copy(),
+                    empty.copy())
+        chords, nodes = self._tree.query(points)
+        distances = 2 * EARTH_RADIUS * np.arcsin(np.minimum(chords / 2, 1))
+        return (self._slabs[nodes].astype(int), distances, self._lats[nodes],
+                self._lons[nodes], self._depths[nodes].astype(np.float64))
+
+
+def _get_layer_files(depth_file):
+    # return (dip, strike, error) grid files for a slab depth grid, where
+    # the error file is None if missing (Slab 1.0).
+    dip_file = depth_file.replace('dep', 'dip')
+    strike_file = depth_file.replace('dep', 'str')
+    error_file = depth_file.replace('dep', 'unc')
+    if not os.path.isfile(error_file):
+        error_file = None
+    return (dip_file, strike_file, error_file)
+
+
+def _get_slab_version(depth_file):
+    # alu_slab2_dep_02.23.18.grd -> slab2_02.23.18
+    stem, _ = os.path.splitext(os.path.basename(depth_file))
+    parts = stem.split('_')[1:]
+    return '_'.join([part for part in parts if part != 'dep'])
+
+
+def build_slab_manifest(datafolder):
+    """Write a manifest of the slab models in a slab data folder.
+
+    The manifest lists, for each slab model, the grid files of all layers, the
+    GeoDict and shape of the grids, the Slab version and the maximum interface
+    depth, so that SlabCollection objects can be set up without searching the
+    folder or opening any grid files.  The manifest is trusted until files are
+    added to or removed from the folder, so it should be rebuilt (see
+    strec_cache) whenever slab grids are replaced.
+
+    Args:
+        datafolder (str): Path to directory containing slab grids.
+    Returns:
+        str: Path to manifest file.
+    """
+    interface_depths = read_interface_depths(datafolder)
+    table_file = os.path.join(datafolder, INTERFACE_TABLE)
+    interface_table = None
+    if interface_depths is not None:
+        interface_table = _get_source_stamp(table_file)
+    slabs = []
+    for depth_file in sorted(glob.glob(os.path.join(datafolder, '*_dep*.grd'))):
+        dip_file, strike_file, error_file = _get_layer_files(depth_file)
+        region = os.path.basename(depth_file).split('_')[0]
+        gd, _ = GMTGrid.getFileGeoDict(depth_file)
+        files = {}
+        for layer, grid_file in zip(SLAB_LAYERS, [depth_file, dip_file,
+                                                  strike_file, error_file]):
+            files[layer] = None
+            if grid_file is not None:
+                files[layer] = os.path.basename(grid_file)
+        max_int_depth = None
+        if interface_depths is not None:
+            max_int_depth = interface_depths.get(region)
+        slabs.append({'region': region,
+                      'version': _get_slab_version(depth_file),
+                      'files': files,
+                      'geodict': {'xmin': gd.xmin, 'xmax': gd.xmax,
+                                  'ymin': gd.ymin, 'ymax': gd.ymax,
+                                  'dx': gd.dx, 'dy': gd.dy,
+                                  'nx': gd.nx, 'ny': gd.ny},
+                      'shape': [gd.ny, gd.nx],
+                      'maximum_interface_depth': max_int_depth})
+    manifest = {'interface_table': interface_table,
+                'slabs': slabs}
+    manifest_file = os.path.join(datafolder, SLAB_MANIFEST_FILE)
+    # the manifest is written in place, rather than moved into place, so that
+    # the modification time of the folder recorded in it is taken after the
+    # manifest file itself has been created.
+    with open(manifest_file, 'wt') as f:
+        manifest['folder_mtime'] = os.stat(datafolder).st_mtime
+        json.dump(manifest, f, indent=2)
+    return manifest_file
+
+
+def read_slab_manifest(datafolder):
+    """Read the manifest written by build_slab_manifest().
+
+    The slab grids listed in the manifest are not checked, only the
+    modification time of the folder (which changes when slab models are added
+    or removed) and the table of maximum interface depths.
+
+    Args:
+        datafolder (str): Path to directory containing slab grids.
+    Returns:
+        dict: Manifest dictionary, with keys 'interface_table' (source stamp
+              of the table of maximum interface depths, or None),
+              'folder_mtime' (modification time of the folder when the
+              manifest was written) and 'slabs' (list of dictionaries
+              describing each slab model), or None if there is no manifest or
+              it is out of date.
+    """
+    manifest_file = os.path.join(datafolder, SLAB_MANIFEST_FILE)
+    if not os.path.isfile(manifest_file):
+        return None
+    try:
+        with open(manifest_file, 'rt') as f:
+            manifest = json.load(f)
+    except ValueError:
+        # the manifest is being written
+        return None
+    if manifest.get('folder_mtime') != os.stat(datafolder).st_mtime:
+        return None
+    table_file = os.path.join(datafolder, INTERFACE_TABLE)
+    try:
+        if manifest['interface_table'] is not None:
+            if manifest['interface_table'] != _get_source_stamp(table_file):
+                return None
+        elif os.path.isfile(table_file):
+            return None
+    except FileNotFoundError:
+        return None
+    return manifest
+
+
+class GridCache(object):
+    """Least recently used cache of slab grids, bounded by a memory budget.
+
+    Grids are keyed by file path.  When adding a grid takes the total size of
+    cached grids over the budget, the least recently used grids are evicted
+    (the most recently added grid is always kept).  Memory mapped grids are
+    counted at their full size, like grids read into memory.
+    """
+
+    def __init__(self, max_bytes=None):
+        """Construct an empty GridCache.
+
+        Args:
+            max_bytes (int): Maximum total size in bytes of cached grids, or
+                None for no limit.
+        """
+        self._max_bytes = max_bytes
+        self._grids = OrderedDict()
+        self._nbytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def __contains__(self, grid_file):
+        return grid_file in self._grids
+
+    def __len__(self):
+        return len(self._grids)
+
+    def get(self, grid_file, loader):
+        """Return a cached grid, loading it on a cache miss.
+
+        Args:
+            grid_file (str): Path to grid file, used as the cache key.
+            loader (function): Function of no arguments returning a tuple of
+                (numpy array, GeoDict) for grid_file.
+        Returns:
+            tuple: (numpy array, GeoDict) for grid_file.
+        """
+        if grid_file in self._grids:
+            self._hits += 1
+            self._grids.move_to_end(grid_file)
+            return self._grids[grid_file]
+        self._misses += 1
+        layer = loader()
+        self._grids[grid_file] = layer
+        self._nbytes += layer[0].nbytes
+        if self._max_bytes is not None:
+            while self._nbytes > self._max_bytes and len(self._grids) > 1:
+                _, (data, _) = self._grids.popitem(last=False)
+                self._nbytes -= data.nbytes
+                self._evictions += 1
+        return layer
+
+    def peek(self, grid_file):
+        """Return a cached grid without updating statistics or recency.
+
+        Args:
+            grid_file (str): Path to grid file, used as the cache key.
+        Returns:
+            tuple: (numpy array, GeoDict) for grid_file, or None if it is not
+                   cached.
+        """
+        return self._grids.get(grid_file)
+
+    def clear(self):
+        """Remove all grids from the cache.
+        """
+        self._grids.clear()
+        self._nbytes = 0
+
+    def getStats(self):
+        """Return cache statistics.
+
+        Returns:
+            dict: Dictionary containing keys:
+                - hits Number of requests answered from the cache.
+                - misses Number of requests that loaded a grid.
+                - evictions Number of grids evicted to stay within budget.
+                - ngrids Number of grids currently cached.
+                - nbytes Total size in bytes of currently cached grids.
+                - max_bytes Memory budget in bytes (None for no limit).
+        """
+        stats = {'hits': self._hits,
+                 'misses': self._misses,
+                 'evictions': self._evictions,
+                 'ngrids': len(self._grids),
+                 'nbytes': self._nbytes,
+                 'max_bytes': self._max_bytes}
+        return stats
+
+
+def _get_geodict_key(gdict):
+    # hashable summary of the grid geometry described by a GeoDict
+    return (gdict.xmin, gdict.xmax, gdict.ymin, gdict.ymax,
+            gdict.dx, gdict.dy, gdict.nx, gdict.ny)
+
+
+class GridSampler(object):
+    """Sample grids that share one GeoDict at a fixed set of points.
+
+    Grid row and column indices (and interpolation weights) are computed once,
+    when the sampler is constructed, so that the depth, dip, strike and
+    uncertainty grids of a slab model can all be read with simple array
+    indexing, rather than repeating the geodict arithmetic and bounds checks of
+    Grid2D.getValue() for every grid.  Samplers made with scalar coordinates
+    avoid numpy array overhead altogether.
+    """
+
+    def __init__(self, gdict, lats, lons, method='nearest'):
+        """Construct a GridSampler.
+
+        Args:
+            gdict (GeoDict): GeoDict describing the grids to be sampled.
+            lats (float or ndarray): Latitudes in decimal degrees.
+            lons (float or ndarray): Longitudes in decimal degrees.
+            method (str): 'nearest' to take the value of the nearest grid node
+                (exactly as Grid2D.getValue() does), or 'bilinear' to
+                interpolate between the four surrounding grid nodes.
+        Raises:
+            ValueError: If method is not one of 'nearest' or 'bilinear'.
+        """
+        if method not in ('nearest', 'bilinear'):
+            raise ValueError('Unknown sampling method %s.' % method)
+        self._method = method
+        self._scalar = np.ndim(lats) == 0 and np.ndim(lons) == 0
+        if self._scalar:
+            self._initScalar(gdict, float(lats), float(lons))
+        else:
+            self._initArray(gdict, lats, lons)
+
+    def _initScalar(self, gdict, lat, lon):
+        # the arithmetic of _initArray() for one point, in plain Python.
+        # round() rounds halves to even, as np.round() does.
+        if gdict.xmax < gdict.xmin and lon < 0:
+            lon += 360
+        frow = (gdict.ymax - lat) / gdict.dy
+        fcol = (lon - gdict.xmin) / gdict.dx
+        nrow = round(frow)
+        ncol = round(fcol)
+        self._inside = (0 <= nrow <= gdict.ny - 1) and (0 <= ncol <= gdict.nx - 1)
+        if self._method == 'nearest':
+            self._nodes = [(nrow, ncol, 1.0)]
+            return
+        row0 = min(max(math.floor(frow), 0), max(gdict.ny - 2, 0))
+        col0 = min(max(math.floor(fcol), 0), max(gdict.nx - 2, 0))
+        row1 = min(row0 + 1, gdict.ny - 1)
+        col1 = min(col0 + 1, gdict.nx - 1)
+        rfrac = min(max(frow - row0, 0.0), 1.0)
+        cfrac = min(max(fcol - col0, 0.0), 1.0)
+        self._nodes = [(row0, col0, (1 - rfrac) * (1 - cfrac)),
+                       (row0, col1, (1 - rfrac) * cfrac),
+                       (row1, col0, rfrac * (1 - cfrac)),
+                       (row1, col1, rfrac * cfrac)]
+
+    def _initArray(self, gdict, lats, lons):
+        lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+        lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+        if gdict.xmax < gdict.xmin:
+            lons = np.where(lons < 0, lons + 360, lons)
+        frows = (gdict.ymax - lats) / gdict.dy
+        fcols = (lons - gdict.xmin) / gdict.dx
+        # points are inside the grid wherever their nearest node is
+        nrows = np.round(frows).astype(int)
+        ncols = np.round(fcols).astype(int)
+        self._inside = ((nrows >= 0) & (nrows <= gdict.ny - 1) &
+                        (ncols >= 0) & (ncols <= gdict.nx - 1))
+        if self._method == 'nearest':
+            rows = nrows[np.newaxis]
+            cols = ncols[np.newaxis]
+            weights = np.ones(rows.shape)
+        else:
+            # points within half a cell outside of the outer grid nodes take
+            # the value at the edge of the grid.
+            row0 = np.clip(np.floor(frows).astype(int), 0, max(gdict.ny - 2, 0))
+            col0 = np.clip(np.floor(fcols).astype(int), 0, max(gdict.nx - 2, 0))
+            row1 = np.minimum(row0 + 1, gdict.ny - 1)
+            col1 = np.minimum(col0 + 1, gdict.nx - 1)
+            rfrac = np.clip(frows - row0, 0, 1)
+            cfrac = np.clip(fcols - col0, 0, 1)
+            rows = np.stack([row0, row0, row1, row1])
+            cols = np.stack([col0, col1, col0, col1])
+            weights = np.stack([(1 - rfrac) * (1 - cfrac), (1 - rfrac) * cfrac,
+                                rfrac * (1 - cfrac), rfrac * cfrac])
+        # sample the first node of the grid for points outside of it
+        self._rows = np.where(self._inside, rows, 0)
+        self._cols = np.where(self._inside, cols, 0)
+        self._weights = weights
+
+    @property
+    def method(self):
+        return self._method
+
+    def subset(self, index):
+        """Return a GridSampler for a subset of the points of this one.
+
+        Args:
+            index (ndarray): Boolean or integer index array selecting points.
+        Returns:
+            GridSampler: Sampler for the selected points.
+        Raises:
+            TypeError: If this sampler was constructed with scalar coordinates.
+        """
+        if self._scalar:
+            raise TypeError('Cannot take a subset of a single point sampler.')
+        sampler = GridSampler.__new__(GridSampler)
+        sampler._method = self._method
+        sampler._scalar = False
+        sampler._inside = self._inside[index]
+        sampler._rows = self._rows[:, index]
+        sampler._cols = self._cols[:, index]
+        sampler._weights = self._weights[:, index]
+        return sampler
+
+    def getNodeBounds(self):
+        """Return the range of grid nodes used to sample points inside the grid.
+
+        Returns:
+            tuple: (first row, last row, first column, last column), or None
+                   if no points fall inside the grid.
+        """
+        if self._scalar:
+            if not self._inside:
+                return None
+            rows = [node[0] for node in self._nodes]
+            cols = [node[1] for node in self._nodes]
+            return (min(rows), max(rows), min(cols), max(cols))
+        if not self._inside.any():
+            return None
+        rows = self._rows[:, self._inside]
+        cols = self._cols[:, self._inside]
+        return (int(rows.min()), int(rows.max()),
+                int(cols.min()), int(cols.max()))
+
+    def sample(self, data, row_offset=0, col_offset=0, circular=False):
+        """Sample a grid at the points of this sampler.
+
+        Args:
+            data (ndarray): 2D grid data array (or any object supporting
+                data[rows, cols] with integer index arrays).
+            row_offset (int): Grid row of the first row of data, where data
+                holds a window of the grid.
+            col_offset (int): Grid column of the first column of data.
+            circular (bool): If True, the grid holds angles in degrees, which
+                are interpolated along the shortest arc (bilinear only).
+        Returns:
+            float or ndarray: Sampled values, NaN for points outside the grid.
+                Nearest neighbor values keep the grid data type.  A scalar is
+                returned if the sampler was constructed with scalar
+                coordinates.
+        """
+        if self._scalar:
+            return self._sampleScalar(data, row_offset, col_offset, circular)
+        values = data[self._rows - row_offset, self._cols - col_offset]
+        if len(self._weights) == 1:
+            values = values[0]
+        else:
+            values = values.astype(np.float64)
+            # NaN nodes only count where they carry some weight
+            weights = self._weights
+            if circular:
+                radians = np.radians(values)
+                ssum = np.where(weights > 0, weights * np.sin(radians), 0).sum(axis=0)
+                csum = np.where(weights > 0, weights * np.cos(radians), 0).sum(axis=0)
+                values = np.mod(np.degrees(np.arctan2(ssum, csum)), 360)
+            else:
+                values = np.where(weights > 0, weights * values, 0).sum(axis=0)
+        if not self._inside.all():
+            values = np.where(self._inside, values,
+                              np.array(np.nan, dtype=values.dtype))
+        return values
+
+    def _sampleScalar(self, data, row_offset, col_offset, circular):
+        if not self._inside:
+            return np.nan
+        if len(self._nodes) == 1:
+            row, col, _ = self._nodes[0]
+            return data[row - row_offset, col - col_offset]
+        nodes = [(float(data[row - row_offset, col - col_offset]), weight)
+                 for row, col, weight in self._nodes if weight > 0]
+        if circular:
+            ssum = sum(weight * math.sin(math.radians(value)) for value, weight in nodes)
+            csum = sum(weight * math.cos(math.radians(value)) for value, weight in nodes)
+            return math.degrees(math.atan2(ssum, csum)) % 360
+        return sum(weight * value for value, weight in nodes)
+
 
 class GridSlab(object):
     """Represents USGS Slab model grids for a given subduction zone.
+
+    Grid headers are read once, and grids are kept in memory once they have
+    been loaded, so a GridSlab object can be queried repeatedly without
+    returning to disk.  Grids are read from a packed slab store (see
+    build_slab_store()) when one is supplied, otherwise where
+    convert_slab_grids() has written raw copies of the grids, those are
+    memory mapped instead of read.  Where
+    build_occupancy_masks() has written an occupancy mask, points in blocks
+    without slab data are answered without touching the grids.
     """
 
-    def __init__(self, depth_file, dip_file, strike_file, error_file):
+    def __init__(self, depth_file, dip_file, strike_file, error_file,
+                 interface_depths=None, grid_cache=None, slab_store=None,
+                 windowed=False, geodict=None):
         """Construct GridSlab object from input files.
 
         Args:
@@ -25,21 +1530,322 @@ class GridSlab(object):
             dip_file (str): Path to Slab dip grid file.
             strike_file (str): Path to Slab strike grid file.
             error_file (str): Path to Slab depth error grid file (can be None).
+            interface_depths (dict): Dictionary of maximum interface depths
+                keyed by region code, as returned by read_interface_depths().
+                If None, the table in the same directory as depth_file is read
+                (if present).
+            grid_cache (GridCache): Cache holding loaded slab grids, which may
+                be shared between GridSlab objects.  If None, an unbounded
+                cache is used.
+            slab_store (SlabStore): Packed slab store to read grids from, in
+                preference to the grid files (can be None).
+            windowed (bool): If True, read only a small window around the
+                query points from grid files, and do not keep them in memory.
+                Memory mapped grids (see slab_store) are still used when
+                available.
+            geodict (GeoDict): GeoDict of the slab grids, if already known
+                (for example from the slab manifest), or None to read it from
+                the grids when needed.
         """
         self._depth_file = depth_file
         self._dip_file = dip_file
         self._strike_file = strike_file
         self._error_file = error_file  # can be None for Slab 1.0
 
+        fpath, fname = os.path.split(self._depth_file)
+        self._region = fname.split('_')[0]
+
         # there may be a table of maximum slab depths in the same directory
         # as all of the slab grids.  Read it into a local dictionary if found,
         # otherwise we'll use the MAX_INTERFACE_DEPTH constant found above.
-        fpath, fname = os.path.split(self._depth_file)
-        table_file_name = os.path.join(fpath, 'maximum_interface_depths.csv')
-        if os.path.isfile(table_file_name):
-            self._slab_table = pd.read_csv(table_file_name)
+        if interface_depths is None:
+            interface_depths = read_interface_depths(fpath)
+        self._interface_depths = interface_depths
+
+        if grid_cache is None:
+            grid_cache = GridCache()
+        self._grid_cache = grid_cache
+        self._slab_store = slab_store
+        self._windowed = windowed
+        self._mapped = {}
+        self._file_geodicts = {}
+
+        self._geodict = geodict
+        self._occupancy = None
+        self._occupancy_read = False
+
+    @property
+    def region(self):
+        """Three letter Slab model region code.
+        """
+        return self._region
+
+    def getGeoDict(self):
+        """Return the GeoDict describing the slab depth grid.
+
+        The grid file header is only read the first time this is called.
+
+        Returns:
+            GeoDict: GeoDict object for the slab depth grid.
+        """
+        if self._geodict is None and self._slab_store is not None:
+            self._geodict = self._slab_store.getGeoDict(self._depth_file)
+        if self._geodict is None:
+            header = _read_mapped_header(self._depth_file)
+            if header is not None:
+                self._geodict = _get_header_geodict(header)
+            else:
+                self._geodict, _ = GMTGrid.getFileGeoDict(self._depth_file)
+        return self._geodict
+
+    def load(self):
+        """Read all of the slab grids into memory.
+        """
+        for grid_file in self._getGridFiles():
+            self._getGrid(grid_file)
+
+    def _getGridFiles(self):
+        grid_files = [self._depth_file, self._dip_file, self._strike_file]
+        if self._error_file is not None:
+            grid_files.append(self._error_file)
+        return grid_files
+
+    def getLoadedGrids(self):
+        """Return the slab grids of this region that are currently cached.
+
+        Returns:
+            dict: Dictionary of (numpy array, GeoDict) tuples keyed by grid
+                  file path.
+        """
+        loaded = {}
+        for grid_file in self._getGridFiles():
+            if grid_file in self._grid_cache:
+                loaded[grid_file] = self._grid_cache.peek(grid_file)
+        return loaded
+
+    def _getGrid(self, grid_file):
+        # return (data, geodict) for one slab grid
+        return self._grid_cache.get(grid_file, lambda: self._loadGrid(grid_file))
+
+    def _loadGrid(self, grid_file):
+        if self._slab_store is not None:
+            layer = self._slab_store.getGrid(grid_file)
+            if layer is not None:
+                return layer
+        return _load_grid(grid_file)
+
+    def _isMapped(self, grid_file):
+        # True if grid_file can be read from the slab store or a raw copy
+        if grid_file not in self._mapped:
+            mapped = _read_mapped_header(grid_file) is not None
+            if self._slab_store is not None:
+                mapped |= self._slab_store.getGeoDict(grid_file) is not None
+            self._mapped[grid_file] = mapped
+        return self._mapped[grid_file]
+
+    def _getFileGeoDict(self, grid_file):
+        if grid_file not in self._file_geodicts:
+            self._file_geodicts[grid_file], _ = GMTGrid.getFileGeoDict(grid_file)
+        return self._file_geodicts[grid_file]
+
+    def _sample(self, grid_file, lats, lons, method='nearest', samplers=None,
+                circular=False):
+        # sample one slab grid.  samplers holds the GridSampler objects
+        # already made for these points, keyed by grid geometry, so that
+        # grids sharing a GeoDict share one sampler.
+        if samplers is None:
+            samplers = {}
+        data = None
+        if self._windowed and not self._isMapped(grid_file):
+            gdict = self._getFileGeoDict(grid_file)
+        else:
+            data, gdict = self._getGrid(grid_file)
+        key = _get_geodict_key(gdict)
+        if key not in samplers:
+            samplers[key] = GridSampler(gdict, lats, lons, method=method)
+        sampler = samplers[key]
+        if data is None:
+            return self._sampleWindow(grid_file, sampler, circular=circular)
+        return sampler.sample(data, circular=circular)
+
+    def _sampleWindow(self, grid_file, sampler, circular=False):
+        # read the window of grid_file around the grid nodes used by sampler,
+        # and sample those nodes.
+        bounds = sampler.getNodeBounds()
+        if bounds is None:
+            return sampler.sample(np.full((1, 1), np.nan), circular=circular)
+        row0, row1, col0, col1 = bounds
+        data, row_offset, col_offset = self._readWindow(
+            grid_file, row0 - WINDOW_PAD, row1 + WINDOW_PAD,
+            col0 - WINDOW_PAD, col1 + WINDOW_PAD)
+        return sampler.sample(data, row_offset=row_offset,
+                              col_offset=col_offset, circular=circular)
+
+    def _readWindow(self, grid_file, row0, row1, col0, col1):
+        # read rows row0 to row1 and columns col0 to col1 (inclusive, clipped
+        # to the grid) of grid_file, returning (data, row and column of the
+        # first cell of data in the grid).  The window may be larger than
+        # asked for.
+        fdict = self._getFileGeoDict(grid_file)
+        row0 = max(row0, 0)
+        row1 = min(row1, fdict.ny - 1)
+        col0 = max(col0, 0)
+        col1 = min(col1, fdict.nx - 1)
+        xmin = fdict.xmin + col0 * fdict.dx
+        xmax = fdict.xmin + col1 * fdict.dx
+        if xmin > 180:
+            xmin -= 360
+        if xmax > 180:
+            xmax -= 360
+        window = GeoDict({'xmin': xmin, 'xmax': xmax,
+                          'ymin': fdict.ymax - row1 * fdict.dy,
+                          'ymax': fdict.ymax - row0 * fdict.dy,
+                          'dx': fdict.dx, 'dy': fdict.dy,
+                          'nx': col1 - col0 + 1, 'ny': row1 - row0 + 1})
+        try:
+            grid = GMTGrid.load(grid_file, samplegeodict=window)
+        except DataSetException:
+            # mapio rejects some windows on the edges of grids crossing the
+            # antimeridian, so read the whole grid.
+            grid = GMTGrid.load(grid_file)
+        # locate the window in the grid
+        wdict = grid.getGeoDict()
+        row_offset = int(np.round((fdict.ymax - wdict.ymax) / fdict.dy))
+        dlon = np.mod(wdict.xmin - fdict.xmin + 180, 360) - 180
+        col_offset = int(np.round(dlon / fdict.dx))
+        return (grid.getData(), row_offset, col_offset)
+
+    def getOccupancy(self):
+        """Return the coarse occupancy mask for this slab model.
+
+        Returns:
+            tuple: (Boolean mask array, number of grid cells along each side of
+                   a mask block), or None if no up to date mask is available.
+        """
+        if not self._occupancy_read:
+            self._occupancy = read_occupancy(self._depth_file)
+            self._occupancy_read = True
+        return self._occupancy
+
+    def _isOccupied(self, lats, lons):
+        # False where the occupancy mask says that all slab grids are NaN
+        occupancy = self.getOccupancy()
+        if occupancy is None:
+            return np.ones(np.shape(lats), dtype=bool)
+        mask, factor = occupancy
+        rows, cols = _get_row_cols(self.getGeoDict(), lats, lons)
+        return mask[rows // factor, cols // factor]
+
+    def getSurfaceTree(self):
+        """Return the KD-tree of slab surface nodes for this slab model.
+
+        The tree cached by build_surface_trees() is read if it is up to date,
+        otherwise the tree is built from the slab depth grid.  The tree is
+        kept in the grid cache, and counts towards its memory budget (in
+        windowed mode, it is not kept).
+
+        Returns:
+            SurfaceTree: SurfaceTree object.
+        """
+        if self._windowed:
+            return self._loadSurfaceTree()[0]
+        tree_file = _get_surface_tree_file(self._depth_file)
+        return self._grid_cache.get(tree_file, self._loadSurfaceTree)[0]
+
+    def _loadSurfaceTree(self):
+        # (SurfaceTree, GeoDict) of the slab depth grid
+        surface_tree = read_surface_tree(self._depth_file)
+        if surface_tree is None:
+            if self._windowed:
+                data, gdict = self._loadGrid(self._depth_file)
+            else:
+                data, gdict = self._getGrid(self._depth_file)
+            surface_tree = SurfaceTree.fromGrid(data, gdict)
+        return (surface_tree, surface_tree._gdict)
+
+    def _getWindowTree(self, lats, lons, depths):
+        # SurfaceTree of the part of the slab depth grid that is close enough
+        # to the hypocenters to hold their nearest slab surface nodes, or None
+        # if that part is not known.  The slab surface node nearest to each
+        # epicenter is no farther from the hypocenter than the straight line
+        # distance to it, which bounds the angle between the hypocenter and
+        # its nearest slab surface node.
+        gdict = self._getFileGeoDict(self._depth_file)
+        rows, cols = _get_row_cols(gdict, lats, lons)
+        inside = ((rows >= 0) & (rows < gdict.ny) &
+                  (cols >= 0) & (cols < gdict.nx))
+        if not inside.all():
+            return None
+        slab_depths = -1 * self._sample(self._depth_file, lats, lons)
+        if np.isnan(slab_depths).any():
+            return None
+        node_lats = gdict.ymax - rows * gdict.dy
+        node_lons = gdict.xmin + cols * gdict.dx
+        bound = np.linalg.norm(geodetic_to_ecef(lats, lons, depths) -
+                               geodetic_to_ecef(node_lats, node_lons,
+                                                slab_depths), axis=1)
+        angle = np.degrees(2 * np.arcsin(
+            np.minimum(bound / (2 * SURFACE_WINDOW_RADIUS), 1)))
+        maxlat = min(np.max(np.abs(lats) + angle), 90.0)
+        coslat = max(np.cos(np.radians(maxlat)), 1e-6)
+        # cells around the nearest node are needed for its triangles
+        row_pad = np.ceil(angle / gdict.dy).astype(int) + SURFACE_WINDOW_PAD
+        col_pad = (np.ceil(angle / (gdict.dx * coslat)).astype(int) +
+                   SURFACE_WINDOW_PAD)
+        row0, row1 = np.min(rows - row_pad), np.max(rows + row_pad)
+        col0, col1 = np.min(cols - col_pad), np.max(cols + col_pad)
+        if self._isMapped(self._depth_file):
+            data, _ = self._getGrid(self._depth_file)
+            row0, row1 = max(row0, 0), min(row1, gdict.ny - 1)
+            col0, col1 = max(col0, 0), min(col1, gdict.nx - 1)
+            data = data[row0:row1 + 1, col0:col1 + 1]
+            row_offset, col_offset = row0, col0
         else:
-            self._slab_table = None
+            data, row_offset, col_offset = self._readWindow(
+                self._depth_file, row0, row1, col0, col1)
+        ny, nx = data.shape
+        wdict = GeoDict({'xmin': gdict.xmin + col_offset * gdict.dx,
+                         'xmax': gdict.xmin + (col_offset + nx - 1) * gdict.dx,
+                         'ymin': gdict.ymax - (row_offset + ny - 1) * gdict.dy,
+                         'ymax': gdict.ymax - row_offset * gdict.dy,
+                         'dx': gdict.dx, 'dy': gdict.dy,
+                         'nx': nx, 'ny': ny})
+        return SurfaceTree.fromGrid(data, wdict)
+
+    def getSurfaceDistance(self, lats, lons, depths):
+        """Return the 3D distance from hypocenters to the slab surface.
+
+        In windowed mode, only the part of the slab depth grid around the
+        hypocenters that can hold their nearest slab surface nodes is read
+        (where the slab depth below each epicenter is known).
+
+        Args:
+            lats (ndarray):  Hypocentral latitudes in decimal degrees.
+            lons (ndarray):  Hypocentral longitudes in decimal degrees.
+            depths (ndarray): Hypocentral depths in km.
+        Returns:
+            tuple: (distances in km to the slab surface, latitudes, longitudes
+                   and depths of the nearest slab surface nodes) as arrays.
+        """
+        if self._windowed:
+            lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+            lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+            depths = np.atleast_1d(np.asarray(depths, dtype=np.float64))
+            surface_tree = self._getWindowTree(lats, lons, depths)
+            if surface_tree is not None:
+                return surface_tree.query(lats, lons, depths)
+        return self.getSurfaceTree().query(lats, lons, depths)
+
+    def getMaximumInterfaceDepth(self):
+        """Return the maximum interface depth for this slab region.
+
+        Returns:
+            float: Maximum interface depth from table (if present), otherwise
+                   MAX_INTERFACE_DEPTH.
+        """
+        if self._interface_depths is None:
+            return MAX_INTERFACE_DEPTH
+        return self._interface_depths[self._region]
 
     def contains(self, lat, lon):
         """Check to see if input coordinates are contained inside Slab model.
@@ -50,7 +1856,7 @@ class GridSlab(object):
         Returns:
             bool: True if point falls inside minimum bounding box of slab model.
         """
-        gdict, tmp = GMTGrid.getFileGeoDict(self._depth_file)
+        gdict = self.getGeoDict()
         gxmin = gdict.xmin
         gxmax = gdict.xmax
         if lon < 0:
@@ -63,12 +1869,103 @@ class GridSlab(object):
             return True
         return False
 
-    def getSlabInfo(self, lat, lon):
+    def containsBatch(self, lats, lons):
+        """Vectorized version of contains().
+
+        Args:
+            lats (ndarray):  Hypocentral latitudes in decimal degrees.
+            lons (ndarray):  Hypocentral longitudes in decimal degrees.
+        Returns:
+            ndarray: Boolean array, True where points fall inside minimum
+                     bounding box of slab model.
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        gdict = self.getGeoDict()
+        inlat = (lats >= gdict.ymin) & (lats <= gdict.ymax)
+        return inlat & _contains_lon(gdict.xmin, gdict.xmax, lons)
+
+    def _sampleLayers(self, lats, lons, method='nearest'):
+        # return arrays of (depth, dip, strike, depth uncertainty) at the input
+        # points.  Grid indices are computed once for all four grids.
+        samplers = {}
+        # slab grids are negative depth
+        depth = -1 * self._sample(self._depth_file, lats, lons, method=method,
+                                  samplers=samplers)
+        # Slab 2.0 dip directions are positive, 1.0 is negative
+        dip = np.abs(self._sample(self._dip_file, lats, lons, method=method,
+                                  samplers=samplers))
+        strike = self._sample(self._strike_file, lats, lons, method=method,
+                              samplers=samplers, circular=True)
+        strike = np.where(strike < 0, strike + 360, strike)
+        # depth uncertainty is only reported (and read) where there is a strike
+        error = np.full(len(lats), np.nan)
+        has_strike = ~np.isnan(strike)
+        if has_strike.any():
+            if self._error_file is not None:
+                subsamplers = {key: sampler.subset(has_strike)
+                               for key, sampler in samplers.items()}
+                error[has_strike] = self._sample(self._error_file,
+                                                 lats[has_strike],
+                                                 lons[has_strike],
+                                                 method=method,
+                                                 samplers=subsamplers)
+            else:
+                error[has_strike] = DEFAULT_DEPTH_ERROR
+        return (depth, dip, strike, error)
+
+    def getSlabInfoBatch(self, lats, lons, method='nearest'):
+        """Vectorized version of getSlabInfo().
+
+        Each slab grid is sampled once for all of the input points that fall
+        inside the slab model bounding box.
+
+        Args:
+            lats (ndarray):  Hypocentral latitudes in decimal degrees.
+            lons (ndarray):  Hypocentral longitudes in decimal degrees.
+            method (str): Grid sampling method, 'nearest' or 'bilinear' (see
+                GridSampler).
+        Returns:
+            tuple: (Boolean array indicating which points fall inside the slab
+                   model bounding box, dictionary of arrays (one value per
+                   input point, NaN outside the bounding box) containing the
+                   keys described in getSlabInfo().)
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        npoints = len(lats)
+        inside = self.containsBatch(lats, lons)
+        slabinfo = {'region': np.where(inside, self._region, ''),
+                    'maximum_interface_depth': np.full(npoints, np.nan)}
+        for key in ['strike', 'dip', 'depth', 'depth_uncertainty']:
+            slabinfo[key] = np.full(npoints, np.nan)
+        if not inside.any():
+            return (inside, slabinfo)
+        slabinfo['maximum_interface_depth'][inside] = self.getMaximumInterfaceDepth()
+
+        # points in empty blocks of the occupancy mask keep NaN values
+        occupied = inside.copy()
+        occupied[inside] = self._isOccupied(lats[inside], lons[inside])
+        if not occupied.any():
+            return (inside, slabinfo)
+
+        depth, dip, strike, error = self._sampleLayers(lats[occupied],
+                                                       lons[occupied],
+                                                       method=method)
+        slabinfo['depth'][occupied] = depth
+        slabinfo['dip'][occupied] = dip
+        slabinfo['strike'][occupied] = strike
+        slabinfo['depth_uncertainty'][occupied] = error
+        return (inside, slabinfo)
+
+    def getSlabInfo(self, lat, lon, method='nearest'):
         """Return a dictionary with depth,dip,strike, and depth uncertainty.
 
         Args:
             lat (float):  Hypocentral latitude in decimal degrees.
             lon (float):  Hypocentral longitude in decimal degrees.
+            method (str): Grid sampling method, 'nearest' or 'bilinear' (see
+                GridSampler).
         Returns:
             dict: Dictionary containing keys:
                 - region Three letter Slab model region code.
@@ -80,38 +1977,41 @@ class GridSlab(object):
         slabinfo = {}
         if not self.contains(lat, lon):
             return slabinfo
-        fpath, fname = os.path.split(self._depth_file)
-        parts = fname.split('_')
-        region = parts[0]
-        depth_grid = GMTGrid.load(self._depth_file)
+        region = self._region
+        # get the maximum interface depth from table (if present)
+        max_int_depth = self.getMaximumInterfaceDepth()
+        if not self._isOccupied(lat, lon):
+            slabinfo = {'region': region,
+                        'strike': np.nan,
+                        'dip': np.nan,
+                        'depth': np.nan,
+                        'maximum_interface_depth': max_int_depth,
+                        'depth_uncertainty': np.nan}
+            return slabinfo
+
+        samplers = {}
         # slab grids are negative depth
-        depth = -1 * depth_grid.getValue(lat, lon)
-        dip_grid = GMTGrid.load(self._dip_file)
-        strike_grid = GMTGrid.load(self._strike_file)
-        if self._error_file is not None:
-            error_grid = GMTGrid.load(self._error_file)
-            error = error_grid.getValue(lat, lon)
-        else:
-            error = DEFAULT_DEPTH_ERROR
+        depth = -1 * self._sample(self._depth_file, lat, lon, method=method,
+                                  samplers=samplers)
 
         # Slab 2.0 dip directions are positive, 1.0 is negative
-        dip = dip_grid.getValue(lat, lon)
+        dip = self._sample(self._dip_file, lat, lon, method=method,
+                           samplers=samplers)
         if dip < 0:
             dip = dip * -1
-        strike = strike_grid.getValue(lat, lon)
-        strike = strike
+        strike = self._sample(self._strike_file, lat, lon, method=method,
+                              samplers=samplers, circular=True)
         if strike < 0:
             strike += 360
 
+        # depth uncertainty is only reported (and read) where there is a strike
         if np.isnan(strike):
             error = np.nan
-
-        # get the maximum interface depth from table (if present)
-        if self._slab_table is not None:
-            df = self._slab_table
-            max_int_depth = df[df['zone'] == region].iloc[0]['interface_max_depth']
+        elif self._error_file is not None:
+            error = self._sample(self._error_file, lat, lon, method=method,
+                                 samplers=samplers)
         else:
-            max_int_depth = MAX_INTERFACE_DEPTH
+            error = DEFAULT_DEPTH_ERROR
 
         slabinfo = {'region': region,
                     'strike': strike,
@@ -122,25 +2022,196 @@ class GridSlab(object):
         return slabinfo
 
 
+class SlabIndex(object):
+    """Interval index over the bounding boxes of a set of slab models.
+
+    The latitude axis is split into bands at every bounding box edge, and each
+    band holds the boxes that overlap it.  A query finds its band with a
+    binary search, then only tests the boxes in that band.  Longitudes wrap
+    across the antimeridian the same way they do in GridSlab.contains().
+    """
+
+    def __init__(self, geodicts):
+        """Construct a SlabIndex from slab model GeoDicts.
+
+        Args:
+            geodicts (list): List of GeoDict objects, one per slab model.
+        """
+        self._ymin = np.array([gd.ymin for gd in geodicts], dtype=np.float64)
+        self._ymax = np.array([gd.ymax for gd in geodicts], dtype=np.float64)
+        self._xmin = np.array([gd.xmin for gd in geodicts], dtype=np.float64)
+        self._xmax = np.array([gd.xmax for gd in geodicts], dtype=np.float64)
+        edges = np.unique(np.concatenate([self._ymin, self._ymax]))
+        if len(edges) == 1:
+            edges = np.array([edges[0], edges[0]])
+        self._edges = edges
+        if not len(edges):
+            self._members = np.zeros((0, 0), dtype=bool)
+            return
+        # each band is the closed interval between two consecutive edges
+        lower = edges[:-1, np.newaxis]
+        upper = edges[1:, np.newaxis]
+        self._members = ((self._ymin[np.newaxis, :] <= upper) &
+                         (self._ymax[np.newaxis, :] >= lower))
+
+    def _getBands(self, lats):
+        nbands = len(self._edges) - 1
+        bands = np.searchsorted(self._edges, lats, side='right') - 1
+        bands = np.clip(bands, 0, max(nbands - 1, 0))
+        if nbands < 1:
+            valid = np.zeros(np.shape(lats), dtype=bool)
+        else:
+            valid = (lats >= self._edges[0]) & (lats <= self._edges[-1])
+        return (bands, valid)
+
+    def getCandidates(self, lat, lon):
+        """Return the slab models whose bounding boxes contain a point.
+
+        Args:
+            lat (float):  Latitude in decimal degrees.
+            lon (float):  Longitude in decimal degrees.
+        Returns:
+            ndarray: Indices (in ascending order) of slab models whose bounding
+                     boxes contain the point.
+        """
+        band, valid = self._getBands(lat)
+        if not valid:
+            return np.array([], dtype=int)
+        idx = np.flatnonzero(self._members[band])
+        inside = ((lat >= self._ymin[idx]) & (lat <= self._ymax[idx]) &
+                  _contains_lon(self._xmin[idx], self._xmax[idx], lon))
+        return idx[inside]
+
+    def getCandidatesBatch(self, lats, lons):
+        """Vectorized version of getCandidates().
+
+        Args:
+            lats (ndarray):  Latitudes in decimal degrees.
+            lons (ndarray):  Longitudes in decimal degrees.
+        Returns:
+            ndarray: Boolean array of shape (number of points, number of slab
+                     models), True where a slab model bounding box contains a
+                     point.
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        bands, valid = self._getBands(lats)
+        candidates = np.zeros((len(lats), len(self._ymin)), dtype=bool)
+        if not valid.any():
+            return candidates
+        vlats = lats[valid, np.newaxis]
+        vlons = lons[valid, np.newaxis]
+        candidates[valid] = (self._members[bands[valid]] &
+                             (vlats >= self._ymin) & (vlats <= self._ymax) &
+                             _contains_lon(self._xmin, self._xmax, vlons))
+        return candidates
+
+
 class SlabCollection(object):
-    def __init__(self, datafolder):
+    def __init__(self, datafolder, preload=False, max_bytes=None,
+                 windowed=False):
         """Object representing a collection of SlabX.Y grids.
 
         This object can be queried with a latitude/longitude to see if that point is
         within a subduction slab - if so, the slab information is returned.
 
+        The list of slab grids and the table of maximum interface depths are
+        read once (from the slab manifest written by build_slab_manifest(),
+        when it is up to date), and grids stay in memory once they have been
+        loaded, so a single SlabCollection should be re-used for many queries.  Loaded
+        grids are held in a least recently used cache, optionally bounded by
+        max_bytes.
+
         Args:
             datafolder (str): String path where grid files and GeoJSON file reside.
+            preload (bool): If True, read all slab grids into memory now rather
+                than on first use.
+            max_bytes (int): Maximum total size in bytes of loaded slab grids,
+                or None for no limit.
+            windowed (bool): If True, read only a small window around each
+                query from the slab grids rather than whole grids.  This is
+                suited to querying a single event with little memory.
+        """
+        self._datafolder = datafolder
+        self._grid_cache = GridCache(max_bytes=max_bytes)
+        self._slab_store = SlabStore.load(datafolder)
+        # the slab manifest lists the slab grids and their geodicts, so that
+        # neither the folder nor the grid headers need to be read.
+        manifest = read_slab_manifest(datafolder)
+        layer_files = []
+        geodicts = []
+        if manifest is not None:
+            interface_depths = None
+            if manifest['interface_table'] is not None:
+                interface_depths = {}
+            for slab in manifest['slabs']:
+                names = [slab['files'][layer] for layer in SLAB_LAYERS]
+                layer_files.append([None if name is None
+                                    else os.path.join(datafolder, name)
+                                    for name in names])
+                geodicts.append(_get_header_geodict(slab['geodict']))
+                max_int_depth = slab['maximum_interface_depth']
+                if interface_depths is not None and max_int_depth is not None:
+                    interface_depths[slab['region']] = max_int_depth
+        else:
+            interface_depths = read_interface_depths(datafolder)
+            for depth_file in glob.glob(os.path.join(datafolder, '*_dep*.grd')):
+                layer_files.append([depth_file] + list(_get_layer_files(depth_file)))
+                geodicts.append(None)
+        self._depth_files = [files[0] for files in layer_files]
+        self._slabs = []
+        for files, geodict in zip(layer_files, geodicts):
+            depth_file, dip_file, strike_file, error_file = files
+            gslab = GridSlab(depth_file, dip_file, strike_file, error_file,
+                             interface_depths=interface_depths,
+                             grid_cache=self._grid_cache,
+                             slab_store=self._slab_store,
+                             windowed=windowed,
+                             geodict=geodict)
+            self._slabs.append(gslab)
+        self._index = None
+        self._boundaries = None
+        self._coverage = SlabCoverage.load(datafolder, self._depth_files)
+        if preload:
+            self.load()
+
+    def load(self):
+        """Read all slab grid headers and grids into memory.
+        """
+        self.getIndex()
+        for gslab in self._slabs:
+            gslab.load()
+
+    def getCacheStats(self):
+        """Return statistics of the cache of loaded slab grids.
+
+        Returns:
+            dict: Dictionary described in GridCache.getStats().
         """
-        self._depth_files = glob.glob(os.path.join(datafolder, '*_dep*.grd'))
+        return self._grid_cache.getStats()
+
+    def getIndex(self):
+        """Return the spatial index of slab model bounding boxes.
+
+        The index is built (reading every slab grid header) on first use.
 
-    def getSlabInfo(self, lat, lon, depth):
+        Returns:
+            SlabIndex: Index of slab model bounding boxes.
+        """
+        if self._index is None:
+            geodicts = [gslab.getGeoDict() for gslab in self._slabs]
+            self._index = SlabIndex(geodicts)
+        return self._index
+
+    def getSlabInfo(self, lat, lon, depth, method='nearest'):
         """Query the entire set of slab models and return a SlabInfo object, or None.
 
         Args:
             lat (float):  Hypocentral latitude in decimal degrees.
             lon (float):  Hypocentral longitude in decimal degrees.
             depth (float): Hypocentral depth in km.
+            method (str): Grid sampling method, 'nearest' or 'bilinear' (see
+                GridSampler).
 
         Returns:
             dict: Dictionary containing keys:
@@ -153,15 +2224,17 @@ class SlabCollection(object):
 
         deep_depth = 99999999999
         slabinfo = {}
-        # loop over all slab regions, return keep all slabs found
-        for depth_file in self._depth_files:
-            dip_file = depth_file.replace('dep', 'dip')
-            strike_file = depth_file.replace('dep', 'str')
-            error_file = depth_file.replace('dep', 'unc')
-            if not os.path.isfile(error_file):
-                error_file = None
-            gslab = GridSlab(depth_file, dip_file, strike_file, error_file)
-            tslabinfo = gslab.getSlabInfo(lat, lon)
+        candidates = self.getIndex().getCandidates(lat, lon)
+        if self._coverage is not None and len(candidates):
+            # Slab models without data near the point can only return a NaN
+            # depth, which is used only when it comes from the first slab
+            # model containing the point.
+            covered = self._coverage.getCandidates(lat, lon)[candidates]
+            covered[0] = True
+            candidates = candidates[covered]
+        # loop over the slab regions whose bounding boxes contain the point
+        for islab in candidates:
+            tslabinfo = self._slabs[islab].getSlabInfo(lat, lon, method=method)
             if not len(tslabinfo):
                 continue
             else:
@@ -173,3 +2246,271 @@ class SlabCollection(object):
                     slabinfo = tslabinfo.copy()
 
         return slabinfo
+
+    def getSlabInfoBatch(self, lats, lons, depths, method='nearest'):
+        """Query the entire set of slab models for arrays of hypocenters.
+
+        Input points are grouped by slab region, so that each region's grids
+        are sampled once.  Where more than one slab model contains a point,
+        the slab is chosen exactly as it is in getSlabInfo().
+
+        Args:
+            lats (ndarray):  Hypocentral latitudes in decimal degrees.
+            lons (ndarray):  Hypocentral longitudes in decimal degrees.
+            depths (ndarray): Hypocentral depths in km.
+            method (str): Grid sampling method, 'nearest' or 'bilinear' (see
+                GridSampler).
+
+        Returns:
+            DataFrame: Pandas dataframe with one row per input point, and
+                columns described in getSlabInfo().  Points not contained in
+                any slab model have an empty region and NaN values.
+        """
+        lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+        lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+        npoints = len(lats)
+        deep_depth = np.full(npoints, 99999999999.0)
+        found = np.zeros(npoints, dtype=bool)
+        slabinfo = {'region': np.full(npoints, '', dtype=object)}
+        for key in SLAB_COLUMNS[1:]:
+            slabinfo[key] = np.full(npoints, np.nan)
+        candidates = self.getIndex().getCandidatesBatch(lats, lons)
+        if self._coverage is not None:
+            # see getSlabInfo() - keep the first slab model containing each
+            # point, and the others only where they have data near the point.
+            first = np.zeros_like(candidates)
+            hit = candidates.any(axis=1)
+            first[hit, np.argmax(candidates[hit], axis=1)] = True
+            covered = self._coverage.getCandidatesBatch(lats, lons)
+            candidates &= covered | first
+        for islab, gslab in enumerate(self._slabs):
+            idx = np.flatnonzero(candidates[:, islab])
+            if not len(idx):
+                continue
+            inside, tslabinfo = gslab.getSlabInfoBatch(lats[idx], lons[idx],
+                                                       method=method)
+            depth = tslabinfo['depth']
+            with np.errstate(invalid='ignore'):
+                deeper = inside & (depth < deep_depth[idx])
+            nan_first = inside & ~deeper & np.isnan(depth) & ~found[idx]
+            take = deeper | nan_first
+            for key in SLAB_COLUMNS:
+                slabinfo[key][idx[take]] = tslabinfo[key][take]
+            deep_depth[idx[deeper]] = depth[deeper]
+            found[idx[take]] = True
+
+        return pd.DataFrame(slabinfo, columns=SLAB_COLUMNS)
+
+    def getBoundaries(self):
+        """Return the spatial index of the edges of the slab models.
+
+        The index written by build_slab_boundaries() is used if it is up to
+        date, otherwise it is built (reading every slab depth grid) on first
+        use.
+
+        Returns:
+            SlabBoundaries: Index of slab model edges.
+        """
+        if self._boundaries is None:
+            self._boundaries = SlabBoundaries.load(self._datafolder,
+                                                   self._depth_files)
+        if self._boundaries is None:
+            self._boundaries = SlabBoundaries.fromGrids(self._depth_files)
+        return self._boundaries
+
+    def getNearestSlab(self, lat, lon):
+        """Find the nearest slab model to an epicenter.
+
+        This is intended for epicenters outside of all slab models, for which
+        getSlabInfo() returns no information.  For epicenters inside a slab
+        model, the distance is to the nearest edge of its data.
+
+        Args:
+            lat (float):  Epicentral latitude in decimal degrees.
+            lon (float):  Epicentral longitude in decimal degrees.
+
+        Returns:
+            dict: Dictionary containing keys:
+                - region Three letter Slab model region code.
+                - distance Great circle distance (km) to the edge of the
+                  slab model data.
+                - lat Latitude of the nearest slab edge node.
+                - lon Longitude of the nearest slab edge node.
+                - depth Slab depth (km) at the nearest slab edge node.
+              or an empty dictionary if there are no slab models.
+        """
+        slabs, distances, lats, lons, depths = self.getBoundaries().query(lat, lon)
+        if slabs[0] < 0:
+            return {}
+        return {'region': self._slabs[slabs[0]].region,
+                'distance': distances[0],
+                'lat': lats[0],
+                'lon': lons[0],
+                'depth': depths[0]}
+
+    def getNearestSlabBatch(self, lats, lons):
+        """Vectorized version of getNearestSlab().
+
+        Args:
+            lats (ndarray):  Epicentral latitudes in decimal degrees.
+            lons (ndarray):  Epicentral longitudes in decimal degrees.
+
+        Returns:
+            DataFrame: Pandas dataframe with one row per input point, and
+                columns described in getNearestSlab().  If there are no slab
+                models, regions are empty and values are NaN.
+        """
+        slabs, distances, elats, elons, depths = self.getBoundaries().query(lats,
+                                                                            lons)
+        regions = np.array([gslab.region for gslab in self._slabs] + [''],
+                           dtype=object)
+        nearest = {'region': regions[slabs],
+                   'distance': distances,
+                   'lat': elats,
+                   'lon': elons,
+                   'depth': depths}
+        return pd.DataFrame(nearest, columns=NEAREST_SLAB_COLUMNS)
+
+    def getSlabDistance(self, lat, lon, depth, region=None):
+        """Return the 3D distance from a hypocenter to the nearest slab surface.
+
+        Unlike the slab depth returned by getSlabInfo(), which is measured
+        vertically below the epicenter, this is the straight line distance to
+        the nearest point on the slab surface, which is more meaningful near
+        steeply dipping slabs.
+
+        Args:
+            lat (float):  Hypocentral latitude in decimal degrees.
+            lon (float):  Hypocentral longitude in decimal degrees.
+            depth (float): Hypocentral depth in km.
+            region (str): Three letter Slab model region code of the slab to
+                measure to, or None to use the nearest of the slab models
+                whose bounding boxes contain the epicenter.
+
+        Returns:
+            dict: Dictionary containing keys:
+                - region Three letter Slab model region code.
+                - distance 3D distance (km) to the slab surface.
+                - lat Latitude of the nearest slab surface node.
+                - lon Longitude of the nearest slab surface node.
+                - depth Depth (km) of the nearest slab surface node.
+              or an empty dictionary if there is no such slab model.
+        """
+        if region is not None:
+            candidates = [islab for islab, gslab in enumerate(self._slabs)
+                          if gslab.region == region]
+        else:
+            candidates = self.getIndex().getCandidates(lat, lon)
+        slabdist = {}
+        for islab in candidates:
+            gslab = self._slabs[islab]
+            distances, nlats, nlons, ndepths = gslab.getSurfaceDistance(lat, lon,
+                                                                        depth)
+            if np.isnan(distances[0]):
+                continue
+            if not len(slabdist) or distances[0] < slabdist['distance']:
+                slabdist = {'region': gslab.region,
+                            'distance': distances[0],
+                            'lat': nlats[0],
+                            'lon': nlons[0],
+                            'depth': ndepths[0]}
+        return slabdist
+
+    def getSlabDistanceBatch(self, lats, lons, depths, region=None):
+        """Vectorized version of getSlabDistance().
+
+        Args:
+            lats (ndarray):  Hypocentral latitudes in decimal degrees.
+            lons (ndarray):  Hypocentral longitudes in decimal degrees.
+            depths (ndarray): Hypocentral depths in km.
+            region (str): Three letter Slab model region code of the slab to
+                measure to, or None to use the nearest of the slab models
+                whose bounding boxes contain each epicenter.
+
+        Returns:
+            DataFrame: Pandas dataframe with one row per input point, and
+                columns described in getSlabDistance().  Points without a slab
+                model to measure to have an empty region and NaN values.
+        """
+        lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+        lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+        depths = np.atleast_1d(np.asarray(depths, dtype=np.float64))
+        npoints = len(lats)
+        slabdist = {'region': np.full(npoints, '', dtype=object)}
+        for key in NEAREST_SLAB_COLUMNS[1:]:
+            slabdist[key] = np.full(npoints, np.nan)
+        if region is not None:
+            candidates = np.zeros((npoints, len(self._slabs)), dtype=bool)
+            for islab, gslab in enumerate(self._slabs):
+                candidates[:, islab] = gslab.region == region
+        else:
+            candidates = self.getIndex().getCandidatesBatch(lats, lons)
+        for islab, gslab in enumerate(self._slabs):
+            idx = np.flatnonzero(candidates[:, islab])
+            if not len(idx):
+                continue
+            distances, nlats, nlons, ndepths = gslab.getSurfaceDistance(
+                lats[idx], lons[idx], depths[idx])
+            current = slabdist['distance'][idx]
+            with np.errstate(invalid='ignore'):
+                closer = ~np.isnan(distances) & (np.isnan(current) |
+                                                 (distances < current))
+            for key, values in zip(NEAREST_SLAB_COLUMNS[1:],
+                                   [distances, nlats, nlons, ndepths]):
+                slabdist[key][idx[closer]] = values[closer]
+            slabdist['region'][idx[closer]] = gslab.region
+        return pd.DataFrame(slabdist, columns=NEAREST_SLAB_COLUMNS)
+
+    def getProfile(self, lat0, lon0, lat1, lon1, npoints=100, method='nearest'):
+        """Sample the slab models along a geodesic profile.
+
+        All of the profile points are sampled in a single call of
+        getSlabInfoBatch(), so this is much faster than calling getSlabInfo()
+        for each point.
+
+        Args:
+            lat0 (float): Latitude of start of profile in decimal degrees.
+            lon0 (float): Longitude of start of profile in decimal degrees.
+            lat1 (float): Latitude of end of profile in decimal degrees.
+            lon1 (float): Longitude of end of profile in decimal degrees.
+            npoints (int): Number of points, including both ends of the profile.
+            method (str): Grid sampling method, 'nearest' or 'bilinear' (see
+                GridSampler).
+
+        Returns:
+            DataFrame: Pandas dataframe with one row per profile point, and
+                columns 'lat', 'lon', 'distance' (km along the profile) followed
+                by the columns of getSlabInfoBatch().
+        """
+        lats, lons, distances = get_profile_points(lat0, lon0, lat1, lon1,
+                                                   npoints)
+        df = self.getSlabInfoBatch(lats, lons, np.zeros(npoints), method=method)
+        df.insert(0, 'lat', lats)
+        df.insert(1, 'lon', lons)
+        df.insert(2, 'distance', distances)
+        return df
+
+    def getMesh(self, lats, lons, method='nearest'):
+        """Sample the slab models over a latitude/longitude mesh.
+
+        Args:
+            lats (ndarray): 1D array of mesh latitudes in decimal degrees.
+            lons (ndarray): 1D array of mesh longitudes in decimal degrees.
+            method (str): Grid sampling method, 'nearest' or 'bilinear' (see
+                GridSampler).
+
+        Returns:
+            dict: Dictionary of 2D arrays (one row per latitude, one column per
+                  longitude) keyed by the columns of getSlabInfoBatch().
+                  Points not contained in any slab model have an empty region
+                  and NaN values.
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        mlons, mlats = np.meshgrid(lons, lats)
+        df = self.getSlabInfoBatch(mlats.ravel(), mlons.ravel(),
+                                   np.zeros(mlats.size), method=method)
+        mesh = {}
+        for column in SLAB_COLUMNS:
+            mesh[column] = df[column].values.reshape(mlats.shape)
+        return mesh
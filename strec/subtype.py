@@ -6,6 +6,7 @@ import logging
 
 # third party imports
 import numpy as np
+import pandas as pd
 from libcomcat.search import get_event_by_id
 from impactutils.rupture.tensor import fill_tensor_from_components
 
@@ -65,8 +66,16 @@ CONSTANTS = {
 class SubductionSelector(object):
     """For events that are inside a subduction zone, determine subduction zone properties."""
 
-    def __init__(self, prefix=None, verbose=False):
-        """Construct a SubductionSelector object."""
+    def __init__(self, prefix=None, verbose=False, windowed=False):
+        """Construct a SubductionSelector object.
+
+        Args:
+            prefix (str): Name of logger to use.
+            verbose (bool): Log progress information.
+            windowed (bool): Read only small windows of the slab grids around
+                each event, rather than keeping whole slab grids in memory.
+                This is best when classifying a single event.
+        """
         if prefix is not None:
             self.logger = logging.getLogger(prefix)
         else:
@@ -74,6 +83,14 @@ class SubductionSelector(object):
         self.verbose = verbose
         self._regionalizer = Regionalizer.load()
         self._config = get_config()
+        # the slab collection keeps slab grids in memory between events
+        max_bytes = None
+        slab_cache_mb = float(self._config["DATA"]["slab_cache_mb"])
+        if slab_cache_mb > 0:
+            max_bytes = int(slab_cache_mb * 1024 * 1024)
+        self._slab_collection = SlabCollection(
+            self._config["DATA"]["slabfolder"], max_bytes=max_bytes, windowed=windowed
+        )
 
     def getSubductionTypeByID(self, eventid):
         """Given an event ID, determine the subduction zone information.
@@ -329,6 +346,10 @@ class SubductionSelector(object):
                 - SlabModelDepthUncertainty : Uncertainty of depth to slab interface.
                 - SlabModelDip : Dip of slab at epicenter.
                 - SlabModelStrike : Strike of slab at epicenter.
+                - SlabModelMaximumDepth : Maximum depth of slab interface.
+                - SlabModelDistance : 3D distance (km) from hypocenter to the
+                  nearest point on the slab surface (NaN where SlabModelDepth
+                  is NaN).
         """
         if self.verbose:
             self.logger.info("Inside getSubductionType...")
@@ -337,8 +358,71 @@ class SubductionSelector(object):
         if depth < 0:
             depth = 0
 
+        tensor_info = self._getTensorInfo(
+            lat, lon, depth, eventid=eventid, tensor_params=tensor_params
+        )
+        slab_params = self._slab_collection.getSlabInfo(lat, lon, depth)
+        regions = self._regionalizer.getRegions(lat, lon, depth)
+        results = self._getResults(regions, slab_params, tensor_info)
+
+        # straight line distance to the slab surface, which (unlike the slab
+        # depth below the epicenter) is meaningful near steeply dipping slabs
+        results["SlabModelDistance"] = self._getSlabDistances(
+            lat, lon, [depth], slab_params
+        )[0]
+
+        return results
+
+    def getSubductionTypeSweep(
+        self, lat, lon, depths, eventid=None, tensor_params=None
+    ):
+        """Determine the subduction zone information for one epicenter at many depths.
+
+        This is equivalent to calling getSubductionType() for each depth, but
+        the parts that depend only on the epicenter (tectonic regions, slab
+        model values at the epicenter, moment tensor) are determined once.
+
+        Args:
+            lat (float): Epicentral latitude.
+            lon (float): Epicentral longitude.
+            depths (ndarray): Candidate hypocentral depths (km).
+            eventid (float): ComCat EventID (Sumatra is official20041226005853450_30).
+            tensor_params (dict): Dictionary containing moment tensor parameters
+                (see getSubductionType()).
+        Returns:
+            DataFrame: Pandas dataframe with one row per depth, with a depth
+                column (the input depths) followed by the columns of the Series
+                returned by getSubductionType().
+        Raises:
+            ValueError: If depths is empty.
+        """
+        if self.verbose:
+            self.logger.info("Inside getSubductionTypeSweep...")
+        input_depths = np.atleast_1d(np.asarray(depths, dtype=float))
+        if not len(input_depths):
+            raise ValueError("At least one depth is required.")
+        # Pin negative depths to 0, as getSubductionType() does.
+        depths = np.where(input_depths < 0, 0, input_depths)
+
+        # the composite moment tensor search (getCompositeCMT()) uses only the
+        # epicenter, so is done once for all depths.
+        tensor_info = self._getTensorInfo(
+            lat, lon, depths[0], eventid=eventid, tensor_params=tensor_params
+        )
+        slab_params = self._slab_collection.getSlabInfo(lat, lon, depths[0])
+        regions = self._regionalizer.getRegions(lat, lon, depths[0])
+        results = self._getResults(regions, slab_params, tensor_info)
+
+        df = pd.DataFrame([results] * len(depths)).reset_index(drop=True)
+        df["SlabModelDistance"] = self._getSlabDistances(lat, lon, depths, slab_params)
+        df.insert(0, "depth", input_depths)
+        return df
+
+    def _getTensorInfo(self, lat, lon, depth, eventid=None, tensor_params=None):
+        # return (tensor_params, tensor_type, tensor_source, similarity,
+        # nevents), finding a ComCat or composite moment tensor if
+        # tensor_params is None.
         config = self._config
-        slab_data_folder = config["DATA"]["slabfolder"]
         tensor_type = None
         tensor_source = None
         similarity = np.nan
@@ -380,11 +464,13 @@ class SubductionSelector(object):
                 tensor_type = tensor_params["type"]
             if "source" in tensor_params:
                 tensor_source = tensor_params["source"]
+        return (tensor_params, tensor_type, tensor_source, similarity, nevents)
 
-        slab_collection = SlabCollection(slab_data_folder)
-        slab_params = slab_collection.getSlabInfo(lat, lon, depth)
-
-        results = self._regionalizer.getRegions(lat, lon, depth)
+    def _getResults(self, regions, slab_params, tensor_info):
+        # combine regionalizer results, slab model values and moment tensor
+        # information into the Series returned by getSubductionType().
+        tensor_params, tensor_type, tensor_source, similarity, nevents = tensor_info
+        results = regions.copy()
         results["TensorType"] = tensor_type
         results["TensorSource"] = tensor_source
         results["CompositeVariability"] = similarity
@@ -448,11 +534,28 @@ class SubductionSelector(object):
                 "SlabModelDip",
                 "SlabModelStrike",
                 "SlabModelMaximumDepth",
+                "SlabModelDistance",
             ]
         )
 
         return results
 
+    def _getSlabDistances(self, lat, lon, depths, slab_params):
+        # 3D distances from the hypocenters at depths to the surface of the
+        # slab model in slab_params (NaN if there is none, or if the slab
+        # model has no depth below the epicenter, so that events away from
+        # slabs never load a slab surface).
+        depths = np.asarray(depths, dtype=np.float64)
+        if not len(slab_params) or np.isnan(slab_params["depth"]):
+            return np.full(len(depths), np.nan)
+        slab_distance = self._slab_collection.getSlabDistanceBatch(
+            np.full(len(depths), lat),
+            np.full(len(depths), lon),
+            depths,
+            region=slab_params["region"],
+        )
+        return slab_distance["distance"].values
+
 
 def get_focal_mechanism(tensor_params):
     """Return focal mechanism (strike-slip,normal, or reverse).
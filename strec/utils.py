@@ -38,11 +38,14 @@ def get_config():
     ~/.strec/strec.ini
     'slabfolder' should be set to point to library data path unless specified in
     ~/.strec/strec.ini
+    'slab_cache_mb' is the memory budget (MB) for loaded slab grids, 0 (the
+    default) meaning no limit.
 
     Returns:
         config (dict): Dictionary containing fields:
             - CONSTANTS Dictionary containing constants for the application.
-            - DATA Dictionary containing 'folder', 'slabfolder', and 'dbfile'.
+            - DATA Dictionary containing 'folder', 'slabfolder', 'dbfile', and
+              'slab_cache_mb'.
     """
     # first look in the default path for a config file
     config_file = get_config_file_name()
@@ -65,6 +68,8 @@ def get_config():
     if 'slabfolder' not in config['DATA']:
         slabfolder = os.path.join(datafolder, 'slabs')
         config['DATA']['slabfolder'] = slabfolder
+    if 'slab_cache_mb' not in config['DATA']:
+        config['DATA']['slab_cache_mb'] = '0'
 
     if 'CONSTANTS' not in config:
         config['CONSTANTS'] = CONSTANTS
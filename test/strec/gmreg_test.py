@@ -0,0 +1,520 @@
+#!/usr/bin/env python
+# stdlib imports
+import os.path
+import shutil
+import tempfile
+
+# third party imports
+from affine import Affine
+from mapio.geodict import GeoDict
+from mapio.grid2d import Grid2D
+import numpy as np
+import pandas as pd
+import rasterio
+from scipy.ndimage import binary_dilation
+
+# local imports
+from strec.gmreg import (Regionalizer, PolygonRegionalizer,
+                         compute_region_boundary, build_region_distances,
+                         read_region_distances, build_region_boundaries,
+                         read_region_boundaries, get_pixel_index,
+                         get_window_cell,
+                         project_aeqd, get_window_boxes, get_dist_to_type,
+                         get_window_frame, compute_region_tiles,
+                         build_region_tiles, read_region_tiles,
+                         build_region_codes, read_region_codes,
+                         pack_region_types, unpack_region_types,
+                         build_region_types, read_region_types,
+                         geodetic_distance, REGION_COLUMNS, REGION_NODATA,
+                         TECTONIC_GRID, OCEANIC_GRID,
+                         TECTONIC_REGIONS, EARTH_RADIUS)
+
+# synthetic tectonic and oceanic grids, 6 x 6 degrees at 30 arc seconds
+RES = 1 / 120
+XMIN = 130.0
+YMAX = 40.0
+NCELLS = 720
+
+
+def _get_region_data():
+    tectonic = np.full((NCELLS, NCELLS), 1, dtype=np.uint8)
+    tectonic[100:400, 150:550] = 2
+    tectonic[250:300, 300:360] = 3
+    tectonic[500:650, 50:700] = 4
+    oceanic = np.zeros((NCELLS, NCELLS), dtype=np.uint8)
+    oceanic[:, 450:] = 1
+    return (tectonic, oceanic)
+
+
+def _write_grid(filename, data, nodata=None):
+    transform = Affine(RES, 0, XMIN, 0, -RES, YMAX)
+    with rasterio.open(filename, 'w', driver='GTiff', height=data.shape[0],
+                       width=data.shape[1], count=1, dtype=data.dtype.name,
+                       transform=transform, nodata=nodata) as dst:
+        dst.write(data, 1)
+
+
+def _write_region_grids(datafolder):
+    tectonic, oceanic = _get_region_data()
+    _write_grid(os.path.join(datafolder, TECTONIC_GRID), tectonic)
+    _write_grid(os.path.join(datafolder, OCEANIC_GRID), oceanic)
+    return (tectonic, oceanic)
+
+
+def _get_great_circle_distance(lat0, lon0, lats, lons):
+    lat0, lon0 = np.radians(lat0), np.radians(lon0)
+    lats, lons = np.radians(lats), np.radians(lons)
+    a = (np.sin((lats - lat0) / 2)**2 +
+         np.cos(lat0) * np.cos(lats) * np.sin((lons - lon0) / 2)**2)
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(a))
+
+
+def _get_brute_distance(data, lat, lon, code):
+    # great circle distance from the center of the cell containing the point
+    # to the center of the nearest cell of type code
+    row = int(np.round((YMAX - RES / 2 - lat) / RES))
+    col = int(np.round((lon - XMIN - RES / 2) / RES))
+    rows, cols = np.nonzero(data == code)
+    dists = _get_great_circle_distance(YMAX - RES / 2 - row * RES,
+                                       XMIN + RES / 2 + col * RES,
+                                       YMAX - RES / 2 - rows * RES,
+                                       XMIN + RES / 2 + cols * RES)
+    return np.min(dists)
+
+
+def _get_dist_to_type_all(center_lon, center_lat, grid, regions):
+    # distances to every cell of the grid of each region type
+    gd = grid.getGeoDict()
+    lons = np.radians(np.linspace(gd.xmin, gd.xmax, gd.nx))
+    lats = np.radians(np.linspace(gd.ymin, gd.ymax, gd.ny))
+    mlons, mlats = np.meshgrid(lons, lats)
+    data = grid.getData()
+    mytype = data[get_window_cell(gd, center_lat, center_lon)]
+    dist_to_type = {}
+    for code, name in regions.items():
+        ixx = data == code
+        if code == mytype:
+            dist_to_type[name] = 0
+        elif not np.any(ixx):
+            dist_to_type[name] = np.inf
+        else:
+            dist_to_type[name] = np.min(geodetic_distance(
+                np.radians(center_lon), np.radians(center_lat),
+                mlons[ixx], mlats[ixx]))
+    return dist_to_type
+
+
+def test_dist_to_type():
+    np.random.seed(7)
+    n = 481
+    for i in range(40):
+        # a few blobs of each region type in a 4 degree window
+        data = np.ones((n, n), dtype=np.uint8)
+        for code in [2, 3, 4]:
+            seeds = np.random.rand(n, n) < 10.0 ** np.random.uniform(-6, -3.5)
+            blobs = binary_dilation(seeds, iterations=np.random.randint(1, 30))
+            data[blobs] = code
+        clat = np.random.uniform(-70, 70)
+        clon = np.random.uniform(-178, 178)
+        gd = GeoDict.createDictFromCenter(clon, clat, RES, RES, 4.0, 4.0)
+        gd = GeoDict({'xmin': gd.xmin, 'xmax': gd.xmin + (n - 1) * RES,
+                      'ymin': gd.ymax - (n - 1) * RES, 'ymax': gd.ymax,
+                      'dx': RES, 'dy': RES, 'nx': n, 'ny': n})
+        grid = Grid2D(data, gd)
+        # epicenters are not always in the middle of the grid
+        lat = clat + np.random.uniform(-0.05, 0.05)
+        lon = clon + np.random.uniform(-0.05, 0.05)
+        dists = get_dist_to_type(lon, lat, grid, TECTONIC_REGIONS)
+        assert dists == _get_dist_to_type_all(lon, lat, grid, TECTONIC_REGIONS)
+        # windows crossing the antimeridian, where xmax is less than xmin
+        if i % 4 == 0:
+            lon = 179.0 + np.random.uniform(0, 1)
+            xmin = lon - (n // 2) * RES
+            gd = GeoDict({'xmin': xmin, 'xmax': xmin + (n - 1) * RES - 360,
+                          'ymin': grid.getGeoDict().ymin,
+                          'ymax': grid.getGeoDict().ymax,
+                          'dx': RES, 'dy': RES, 'nx': n, 'ny': n})
+            grid = Grid2D(data, gd)
+            dists = get_dist_to_type(lon, lat, grid, TECTONIC_REGIONS)
+            assert dists == _get_dist_to_type_all(lon, lat, grid,
+                                                  TECTONIC_REGIONS)
+
+
+def test_region_boundary():
+    data = np.ones((5, 6), dtype=np.uint8)
+    data[1:4, 1:4] = 2
+    boundary = compute_region_boundary(data, 2)
+    assert boundary.sum() == 8
+    assert not boundary[2, 2]
+    # cells outside of the grid are treated as being of the same type
+    boundary = compute_region_boundary(data, 1)
+    assert not boundary[0, 0]
+    assert boundary[0, 1]
+    assert not boundary[2, 5]
+    # columns wrap around on global grids
+    data[:, 0] = 2
+    assert not compute_region_boundary(data, 1)[2, 5]
+    assert compute_region_boundary(data, 1, wrap=True)[2, 5]
+
+
+def test_region_distances():
+    tempdir = tempfile.mkdtemp()
+    try:
+        tectonic, oceanic = _write_region_grids(tempdir)
+        assert read_region_distances(tempdir) is None
+        build_region_distances(tempdir)
+        distances, gdict = read_region_distances(tempdir)
+        assert distances.shape == (6, NCELLS, NCELLS)
+        row, col = get_pixel_index(gdict, YMAX - RES / 2, XMIN + RES / 2)
+        assert (row, col) == (0, 0)
+
+        regionalizer = Regionalizer(tempdir)
+        points = [(37.0, 133.0, 'Active', False),
+                  (37.8, 132.75, 'Volcanic', False),
+                  (39.5, 130.5, 'Stable', False),
+                  (35.0, 135.0, 'Subduction', True),
+                  (34.2, 135.9, 'Stable', True)]
+        tectonic_names = {1: 'DistanceToStable', 2: 'DistanceToActive',
+                          3: 'DistanceToVolcanic', 4: 'DistanceToSubduction'}
+        for lat, lon, region, is_oceanic in points:
+            regions = regionalizer.getRegions(lat, lon, 10.0)
+            assert regions['TectonicRegion'] == region
+            assert regions['Oceanic'] == is_oceanic
+            for code, name in tectonic_names.items():
+                dist = _get_brute_distance(tectonic, lat, lon, code)
+                np.testing.assert_allclose(regions[name], dist, atol=0.051)
+            dist = _get_brute_distance(oceanic, lat, lon, 1)
+            np.testing.assert_allclose(regions['DistanceToOceanic'], dist,
+                                       atol=0.051)
+            dist = _get_brute_distance(oceanic, lat, lon, 0)
+            np.testing.assert_allclose(regions['DistanceToContinental'], dist,
+                                       atol=0.051)
+
+        # the edge trees give the same distances as the rasters
+        assert read_region_boundaries(tempdir) is None
+        build_region_boundaries(tempdir)
+        trees = read_region_boundaries(tempdir)
+        assert len(trees) == 6
+        rows, cols = np.meshgrid(np.arange(0, NCELLS, 37),
+                                 np.arange(0, NCELLS, 41))
+        lats = YMAX - RES / 2 - rows.ravel() * RES
+        lons = XMIN + RES / 2 + cols.ravel() * RES
+        rlats, rlons = np.radians(lats), np.radians(lons)
+        points = np.column_stack([np.cos(rlats) * np.cos(rlons),
+                                  np.cos(rlats) * np.sin(rlons),
+                                  np.sin(rlats)])
+        for band, tree in enumerate(trees):
+            chords, _ = tree.query(points)
+            dists = 2 * EARTH_RADIUS * np.arcsin(chords / 2)
+            counts = distances[band, rows.ravel(), cols.ravel()]
+            outside = counts > 0
+            np.testing.assert_allclose(dists[outside], counts[outside] * 0.1,
+                                       atol=0.051)
+
+        # derived files are ignored once the source grids change
+        tectonic_file = os.path.join(tempdir, TECTONIC_GRID)
+        stat = os.stat(tectonic_file)
+        os.utime(tectonic_file, (stat.st_atime, stat.st_mtime + 10))
+        assert read_region_distances(tempdir) is None
+        assert read_region_boundaries(tempdir) is None
+    except Exception as e:
+        raise e
+    finally:
+        shutil.rmtree(tempdir)
+
+
+def test_window_frame():
+    # a global grid at half a degree
+    transform = Affine(0.5, 0, -180.0, 0, -0.5, 90.0)
+    gd = GeoDict.createDictFromCenter(10.25, 20.25, 0.5, 0.5, 2.0, 2.0)
+    frame, window = get_window_frame(transform, 360, 720, gd)
+    assert frame == [(137, 142, 378, 383)]
+    assert (window.xmin, window.xmax) == (9.25, 11.25)
+    assert (window.ymin, window.ymax) == (19.25, 21.25)
+    assert (window.ny, window.nx) == (5, 5)
+    # windows crossing the antimeridian are read in two pieces
+    gd = GeoDict.createDictFromCenter(179.75, 20.25, 0.5, 0.5, 2.0, 2.0)
+    frame, window = get_window_frame(transform, 360, 720, gd)
+    assert frame == [(137, 142, 717, 720), (137, 142, 0, 2)]
+    assert (window.xmin, window.xmax) == (178.75, -179.25)
+    assert (window.ny, window.nx) == (5, 5)
+
+
+def test_region_tiles():
+    data = np.ones((6, 9), dtype=np.uint8)
+    data[0, 0] = 2
+    data[4:, 6:] = 3
+    classes, reach = compute_region_tiles(data, 3, [1, 2, 3])
+    np.testing.assert_array_equal(classes, [[6, 2, 2], [2, 2, 10]])
+    np.testing.assert_array_equal(reach[0], np.zeros((2, 3)))
+    np.testing.assert_array_equal(reach[1], [[0, 1, 2], [1, 1, 2]])
+    np.testing.assert_array_equal(reach[2], [[2, 1, 1], [2, 1, 0]])
+    # columns wrap around on global grids
+    _, reach = compute_region_tiles(data, 3, [1, 2, 3, 4], wrap=True)
+    np.testing.assert_array_equal(reach[1], [[0, 1, 1], [1, 1, 1]])
+    assert (reach[3] == 255).all()
+
+    tempdir = tempfile.mkdtemp()
+    try:
+        _write_region_grids(tempdir)
+        assert read_region_tiles(tempdir) is None
+        build_region_tiles(tempdir)
+        tiles = read_region_tiles(tempdir)
+        tile_cells, classes, reach = tiles[TECTONIC_GRID]
+        assert tile_cells == 120
+        assert classes.shape == (6, 6)
+        assert reach.shape == (4, 6, 6)
+        regionalizer = Regionalizer(tempdir)
+        tectonic_grid = os.path.join(tempdir, TECTONIC_GRID)
+        # stable tile away from other region types
+        assert regionalizer._getTileCode(tectonic_grid, TECTONIC_REGIONS,
+                                         39.5, 130.5, 2 * RES) == 1
+        # near the edge of the tile
+        assert regionalizer._getTileCode(tectonic_grid, TECTONIC_REGIONS,
+                                         39.5, 130.999, 2 * RES) is None
+        # tile with more than one region type
+        assert regionalizer._getTileCode(tectonic_grid, TECTONIC_REGIONS,
+                                         39.5, 131.5, 2 * RES) is None
+        # window extending beyond the grid
+        assert regionalizer._getTileCode(tectonic_grid, TECTONIC_REGIONS,
+                                         39.5, 130.5, 4.0) is None
+
+        tectonic_file = os.path.join(tempdir, TECTONIC_GRID)
+        stat = os.stat(tectonic_file)
+        os.utime(tectonic_file, (stat.st_atime, stat.st_mtime + 10))
+        assert read_region_tiles(tempdir) is None
+    except Exception as e:
+        raise e
+    finally:
+        shutil.rmtree(tempdir)
+
+
+def test_region_codes():
+    tempdir = tempfile.mkdtemp()
+    try:
+        tectonic, oceanic = _write_region_grids(tempdir)
+        assert read_region_codes(tempdir) is None
+        build_region_codes(tempdir)
+        codes = read_region_codes(tempdir)
+        data, gdict = codes[TECTONIC_GRID]
+        np.testing.assert_array_equal(data, tectonic)
+        assert gdict.xmin == XMIN + RES / 2
+        data, gdict = codes[OCEANIC_GRID]
+        np.testing.assert_array_equal(data, oceanic)
+
+        regionalizer = Regionalizer(tempdir)
+        points = [(37.0, 133.0, 'Active', False),
+                  (37.8, 132.75, 'Volcanic', False),
+                  (39.5, 130.5, 'Stable', False),
+                  (35.0, 135.0, 'Subduction', True),
+                  (34.2, 135.9, 'Stable', True)]
+        for lat, lon, region, is_oceanic in points:
+            regions = regionalizer.getRegions(lat, lon, 10.0, distances=False)
+            assert list(regions.index) == ['TectonicRegion', 'Oceanic']
+            assert regions['TectonicRegion'] == region
+            assert regions['Oceanic'] == is_oceanic
+
+        oceanic_file = os.path.join(tempdir, OCEANIC_GRID)
+        stat = os.stat(oceanic_file)
+        os.utime(oceanic_file, (stat.st_atime, stat.st_mtime + 10))
+        assert read_region_codes(tempdir) is None
+    except Exception as e:
+        raise e
+    finally:
+        shutil.rmtree(tempdir)
+
+
+def test_region_types():
+    np.random.seed(3)
+    tectonic = np.random.randint(0, 5, (7, 9))
+    oceanic = np.random.randint(0, 2, (7, 9))
+    tectonic[0, 3] = REGION_NODATA
+    oceanic[4, 6] = REGION_NODATA
+    packed = pack_region_types(tectonic, oceanic)
+    # cells with no data in either grid have no data in both
+    tectonic[4, 6] = oceanic[0, 3] = REGION_NODATA
+    assert packed.shape == (7, 5)
+    for row0, row1, col0, col1 in [(0, 7, 0, 9), (2, 5, 1, 8), (3, 4, 3, 4),
+                                   (1, 6, 2, 2)]:
+        codes, flags = unpack_region_types(packed, row0, row1, col0, col1)
+        np.testing.assert_array_equal(codes, tectonic[row0:row1, col0:col1])
+        np.testing.assert_array_equal(flags, oceanic[row0:row1, col0:col1])
+
+    tempdir = tempfile.mkdtemp()
+    try:
+        tectonic, oceanic = _write_region_grids(tempdir)
+        assert read_region_types(tempdir) is None
+        build_region_types(tempdir)
+        packed, transform, gdict = read_region_types(tempdir)
+        assert packed.shape == (NCELLS, NCELLS // 2)
+        assert transform == Affine(RES, 0, XMIN, 0, -RES, YMAX)
+        codes, flags = unpack_region_types(packed, 0, NCELLS, 0, NCELLS)
+        np.testing.assert_array_equal(codes, tectonic)
+        np.testing.assert_array_equal(flags, oceanic)
+
+        regionalizer = Regionalizer(tempdir)
+        assert regionalizer._getRegionCodes(35.0, 135.0) == (4, 1)
+        assert regionalizer._getRegionCodes(37.8, 132.75) == (3, 0)
+        # region types with and without distances agree on either side of
+        # the edges of a region, including where the search window is cut by
+        # the edge of the grid
+        top = YMAX - 100 * RES
+        left = XMIN + 150 * RES
+        for lat, lon in [(top, 133.0), (37.0, left), (top, left),
+                         (YMAX - 400 * RES, 133.0)]:
+            for dlat in [-0.3, 0.0, 0.3]:
+                for dlon in [-0.3, 0.0, 0.3]:
+                    plat = lat + dlat * RES
+                    plon = lon + dlon * RES
+                    regions = regionalizer.getRegions(plat, plon, 10.0)
+                    types = regionalizer.getRegions(plat, plon, 10.0,
+                                                    distances=False)
+                    for label in ['TectonicRegion', 'Oceanic']:
+                        assert regions[label] == types[label]
+        gd = GeoDict.createDictFromCenter(133.0, 37.0, RES, RES, 1.0, 1.0)
+        grid = regionalizer._readRegionWindow(
+            os.path.join(tempdir, TECTONIC_GRID), gd)
+        frame, window = get_window_frame(transform, NCELLS, NCELLS, gd)
+        row0, row1, col0, col1 = frame[0]
+        np.testing.assert_array_equal(grid.getData(),
+                                      tectonic[row0:row1, col0:col1])
+        assert grid.getGeoDict() == window
+
+        tectonic_file = os.path.join(tempdir, TECTONIC_GRID)
+        stat = os.stat(tectonic_file)
+        os.utime(tectonic_file, (stat.st_atime, stat.st_mtime + 10))
+        assert read_region_types(tempdir) is None
+    except Exception as e:
+        raise e
+    finally:
+        shutil.rmtree(tempdir)
+
+
+def test_region_nodata():
+    tempdir = tempfile.mkdtemp()
+    try:
+        tectonic, oceanic = [data.astype(np.float32)
+                             for data in _get_region_data()]
+        tectonic[:20, :20] = np.nan
+        oceanic[:20, -20:] = np.nan
+        _write_grid(os.path.join(tempdir, TECTONIC_GRID), tectonic,
+                    nodata=np.nan)
+        _write_grid(os.path.join(tempdir, OCEANIC_GRID), oceanic,
+                    nodata=np.nan)
+        # cells of the tectonic grid and of the oceanic grid with no data
+        points = [(YMAX - 10 * RES, XMIN + 10 * RES, 'TectonicRegion'),
+                  (YMAX - 10 * RES, XMIN + 710 * RES, 'Oceanic')]
+        for build in [None, build_region_codes, build_region_types]:
+            if build is not None:
+                build(tempdir)
+            regionalizer = Regionalizer(tempdir)
+            for lat, lon, label in points:
+                regions = regionalizer.getRegions(lat, lon, 10.0,
+                                                  distances=False)
+                assert regions[label] is None
+            regions = regionalizer.getRegions(37.8, 132.75, 10.0,
+                                              distances=False)
+            assert regions['TectonicRegion'] == 'Volcanic'
+            assert regions['Oceanic'] == False
+            lats = np.array([lat for lat, _, _ in points])
+            lons = np.array([lon for _, lon, _ in points])
+            regions = regionalizer.getRegionsBatch(lats, lons, None,
+                                                   distances=False)
+            assert regions['TectonicRegion'][0] is None
+            assert regions['Oceanic'][1] is None
+        codes = read_region_codes(tempdir)
+        assert codes[TECTONIC_GRID][0][0, 0] == REGION_NODATA
+        assert codes[OCEANIC_GRID][0][0, -1] == REGION_NODATA
+    except Exception as e:
+        raise e
+    finally:
+        shutil.rmtree(tempdir)
+
+
+def _check_regions_batch(regionalizer, lats, lons):
+    regions = regionalizer.getRegionsBatch(lats, lons, np.full(len(lats), 10.0))
+    assert list(regions.columns) == REGION_COLUMNS
+    single = pd.DataFrame([regionalizer.getRegions(lat, lon, 10.0)
+                           for lat, lon in zip(lats, lons)])
+    for column in REGION_COLUMNS:
+        np.testing.assert_array_equal(regions[column].values,
+                                      single[column].values)
+    regions = regionalizer.getRegionsBatch(lats, lons, None, distances=False)
+    assert list(regions.columns) == ['TectonicRegion', 'Oceanic']
+    single = pd.DataFrame([regionalizer.getRegions(lat, lon, 10.0,
+                                                   distances=False)
+                           for lat, lon in zip(lats, lons)])
+    for column in ['TectonicRegion', 'Oceanic']:
+        np.testing.assert_array_equal(regions[column].values,
+                                      single[column].values)
+
+
+def test_regions_batch():
+    np.random.seed(11)
+    lats = np.random.uniform(YMAX - 6, YMAX, 60)
+    lons = np.random.uniform(XMIN, XMIN + 6, 60)
+    # a cluster of events sharing search windows
+    lats[:20] = 37.0 + np.random.normal(0, 0.1, 20)
+    lons[:20] = 133.0 + np.random.normal(0, 0.1, 20)
+    tempdir = tempfile.mkdtemp()
+    try:
+        _write_region_grids(tempdir)
+        # windows cut from the packed raster
+        build_region_types(tempdir)
+        _check_regions_batch(Regionalizer(tempdir), lats, lons)
+        # distance rasters and edge trees
+        build_region_distances(tempdir)
+        build_region_boundaries(tempdir)
+        _check_regions_batch(Regionalizer(tempdir), lats, lons)
+    except Exception as e:
+        raise e
+    finally:
+        shutil.rmtree(tempdir)
+
+
+def test_polygon_regionalizer():
+    # projected distances from the center are great circle distances
+    coords = np.array([[-72.898, -36.122], [-70.0, -33.0], [179.0, 51.0]])
+    projected = project_aeqd(coords, -36.122, -72.898)
+    np.testing.assert_allclose(projected[0], [0, 0], atol=1e-9)
+    dists = _get_great_circle_distance(-36.122, -72.898,
+                                       coords[:, 1], coords[:, 0])
+    np.testing.assert_allclose(np.hypot(projected[:, 0], projected[:, 1]),
+                               dists, rtol=1e-9)
+    # windows are split at the antimeridian
+    assert get_window_boxes(10.0, 20.0) == [(18.0, 8.0, 22.0, 12.0)]
+    assert get_window_boxes(51.0, 179.5) == [(177.5, 49.0, 180.0, 53.0),
+                                             (-180.0, 49.0, -178.5, 53.0)]
+
+    homedir = os.path.dirname(os.path.abspath(__file__))
+    datadir = os.path.join(homedir, '..', '..', 'strec', 'data')
+    regionalizer = PolygonRegionalizer(datadir)
+    # chile 2010
+    regions = regionalizer.getRegions(-36.122, -72.898, 22.9)
+    assert regions['TectonicRegion'] == 'Subduction'
+    assert not regions['Oceanic']
+    assert regions['DistanceToSubduction'] == 0
+    assert regions['DistanceToContinental'] == 0
+    assert 0 < regions['DistanceToOceanic'] < 300
+    assert 0 < regions['DistanceToActive'] < 300
+    regions = regionalizer.getRegions(-36.122, -72.898, 22.9, distances=False)
+    assert regions['TectonicRegion'] == 'Subduction'
+    assert not regions['Oceanic']
+    # distances are continuous across the antimeridian
+    east = regionalizer.getRegions(51.5, 179.99, 10.0)
+    west = regionalizer.getRegions(51.5, -179.99, 10.0)
+    for column in ['DistanceToActive', 'DistanceToOceanic']:
+        assert abs(east[column] - west[column]) < 2.0
+
+
+if __name__ == '__main__':
+    test_dist_to_type()
+    test_region_boundary()
+    test_region_distances()
+    test_window_frame()
+    test_region_tiles()
+    test_region_codes()
+    test_region_types()
+    test_region_nodata()
+    test_regions_batch()
+    test_polygon_regionalizer()
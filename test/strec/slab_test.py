@@ -1,12 +1,38 @@
 #!/usr/bin/env python
 # stdlib imports
 import os.path
+import shutil
+import tempfile
 
 # local imports
-from strec.slab import SlabCollection, GridSlab
+from strec.slab import (SlabCollection, GridSlab, convert_slab_grids,
+                        build_occupancy_masks, read_occupancy,
+                        build_slab_coverage, build_slab_store,
+                        build_slab_manifest,
+                        read_slab_manifest, build_surface_trees,
+                        read_surface_tree, build_slab_boundaries,
+                        compute_slab_boundary, SlabBoundaries, PackedGrid,
+                        GridSampler)
 
 # third party imports
+from mapio.gmt import GMTGrid
+from mapio.geodict import GeoDict
 import numpy as np
+import pandas as pd
+
+
+def _copy_slab_grids(tempdir, regions, interface_depths=True):
+    # copy all layers of slab models from the test data to tempdir, where
+    # regions are file name patterns like 'kur_slab2_%s_02.24.18.grd'
+    homedir = os.path.dirname(os.path.abspath(
+        __file__))  # where is this script?
+    slabdir = os.path.join(homedir, '..', '..', 'strec', 'data', 'slabs')
+    for region in regions:
+        for layer in ['dep', 'dip', 'str', 'unc']:
+            shutil.copy(os.path.join(slabdir, region % layer), tempdir)
+    if interface_depths:
+        shutil.copy(os.path.join(slabdir, 'maximum_interface_depths.csv'),
+                    tempdir)
 
 
 def test_grid_slab():
@@ -67,6 +93,512 @@ def test_inside_grid():
     print('Passed.')
 
 
+def test_collection_reuse():
+    homedir = os.path.dirname(os.path.abspath(
+        __file__))  # where is this script?
+    slabdir = os.path.join(homedir, '..', '..', 'strec', 'data', 'slabs')
+    collection = SlabCollection(slabdir)
+    slabinfo1 = collection.getSlabInfo(10.0, 126.0, 0.0)
+    # grids touched by the first query should now be resident
+    loaded = [gslab for gslab in collection._slabs if len(gslab.getLoadedGrids())]
+    assert len(loaded) >= 1
+    slabinfo2 = collection.getSlabInfo(10.0, 126.0, 0.0)
+    assert slabinfo1 == slabinfo2
+
+    # a preloaded collection should give the same answer
+    preloaded = SlabCollection(slabdir, preload=True)
+    for gslab in preloaded._slabs:
+        assert len(gslab.getLoadedGrids()) == 4
+    slabinfo3 = preloaded.getSlabInfo(10.0, 126.0, 0.0)
+    assert slabinfo1 == slabinfo3
+
+
+def test_slab_info_batch():
+    homedir = os.path.dirname(os.path.abspath(
+        __file__))  # where is this script?
+    slabdir = os.path.join(homedir, '..', '..', 'strec', 'data', 'slabs')
+    collection = SlabCollection(slabdir)
+    # inside phi, inside kur, across the antimeridian (alu, ker), outside
+    lats = np.array([10.0, 40.0, 52.0, -20.0, 0.0])
+    lons = np.array([126.0, 140.0, -175.0, 179.5, -30.0])
+    depths = np.zeros(len(lats))
+    df = collection.getSlabInfoBatch(lats, lons, depths)
+    assert len(df) == len(lats)
+    for i in range(len(lats)):
+        slabinfo = collection.getSlabInfo(lats[i], lons[i], depths[i])
+        row = df.iloc[i]
+        if not len(slabinfo):
+            assert row['region'] == ''
+            assert np.isnan(row['depth'])
+            continue
+        for key, value in slabinfo.items():
+            if isinstance(value, str):
+                assert value == row[key]
+            else:
+                np.testing.assert_equal(value, row[key])
+
+
+def test_mapped_grids():
+    tempdir = tempfile.mkdtemp()
+    try:
+        _copy_slab_grids(tempdir, ['kur_slab2_%s_02.24.18.grd'])
+        slabinfo1 = SlabCollection(tempdir).getSlabInfo(40.0, 140.0, 0.0)
+
+        data_files = convert_slab_grids(tempdir)
+        assert len(data_files) == 4
+        collection = SlabCollection(tempdir, preload=True)
+        for data, gdict in collection._slabs[0].getLoadedGrids().values():
+            assert isinstance(data, np.memmap)
+        slabinfo2 = collection.getSlabInfo(40.0, 140.0, 0.0)
+        assert slabinfo1 == slabinfo2
+
+        # a changed source grid makes the raw copy stale
+        depth_file = os.path.join(tempdir, 'kur_slab2_dep_02.24.18.grd')
+        os.utime(depth_file, (0, 0))
+        collection = SlabCollection(tempdir, preload=True)
+        data, gdict = collection._slabs[0].getLoadedGrids()[depth_file]
+        assert not isinstance(data, np.memmap)
+    finally:
+        shutil.rmtree(tempdir)
+
+
+def test_slab_index():
+    homedir = os.path.dirname(os.path.abspath(
+        __file__))  # where is this script?
+    slabdir = os.path.join(homedir, '..', '..', 'strec', 'data', 'slabs')
+    collection = SlabCollection(slabdir)
+    index = collection.getIndex()
+    np.random.seed(1234)
+    lats = np.random.uniform(-90, 90, 2000)
+    lons = np.random.uniform(-180, 180, 2000)
+    # points on bounding box edges, and across the antimeridian
+    lats[:4] = [45.0, 68.0, -44.0, -14.0]
+    lons[:4] = [161.0, -134.0, 180.0, -172.0]
+    candidates = index.getCandidatesBatch(lats, lons)
+    for i in range(len(lats)):
+        contained = [gslab.contains(lats[i], lons[i])
+                     for gslab in collection._slabs]
+        np.testing.assert_array_equal(candidates[i], contained)
+        np.testing.assert_array_equal(index.getCandidates(lats[i], lons[i]),
+                                      np.flatnonzero(contained))
+
+    # a point in the middle of the Atlantic should not touch any slab grids
+    collection = SlabCollection(slabdir)
+    slabinfo = collection.getSlabInfo(30.0, -40.0, 10.0)
+    assert slabinfo == {}
+    for gslab in collection._slabs:
+        assert not len(gslab.getLoadedGrids())
+
+
+def test_occupancy_masks():
+    tempdir = tempfile.mkdtemp()
+    try:
+        _copy_slab_grids(tempdir, ['kur_slab2_%s_02.24.18.grd'])
+        # inside the kur bounding box, but far from any slab data
+        lat, lon = 36.0, 122.0
+        slabinfo1 = SlabCollection(tempdir).getSlabInfo(lat, lon, 0.0)
+        assert slabinfo1['region'] == 'kur'
+        assert np.isnan(slabinfo1['depth'])
+
+        assert len(build_occupancy_masks(tempdir)) == 1
+        collection = SlabCollection(tempdir)
+        slabinfo2 = collection.getSlabInfo(lat, lon, 0.0)
+        assert not len(collection._slabs[0].getLoadedGrids())
+        assert slabinfo1.keys() == slabinfo2.keys()
+        for key, value in slabinfo1.items():
+            np.testing.assert_equal(value, slabinfo2[key])
+
+        # points with slab data are unaffected
+        slabinfo3 = collection.getSlabInfo(40.0, 140.0, 0.0)
+        np.testing.assert_almost_equal(slabinfo3['depth'], 127.33068, decimal=4)
+
+        # the mask is ignored when any of the grids it was made from changes
+        depth_file = os.path.join(tempdir, 'kur_slab2_dep_02.24.18.grd')
+        assert read_occupancy(depth_file) is not None
+        os.utime(depth_file.replace('dep', 'unc'), (0, 0))
+        assert read_occupancy(depth_file) is None
+    finally:
+        shutil.rmtree(tempdir)
+
+
+def test_grid_cache():
+    homedir = os.path.dirname(os.path.abspath(
+        __file__))  # where is this script?
+    slabdir = os.path.join(homedir, '..', '..', 'strec', 'data', 'slabs')
+    unbounded = SlabCollection(slabdir)
+    max_bytes = 30 * 1024 * 1024
+    collection = SlabCollection(slabdir, max_bytes=max_bytes)
+    # points in kur, phi, sam, sum, alu and back in kur again
+    points = [(40.0, 140.0), (10.0, 126.0), (-20.0, -70.0),
+              (-5.0, 103.0), (52.0, -175.0), (40.1, 140.1)]
+    for lat, lon in points:
+        slabinfo1 = unbounded.getSlabInfo(lat, lon, 0.0)
+        slabinfo2 = collection.getSlabInfo(lat, lon, 0.0)
+        assert slabinfo1 == slabinfo2
+    stats = collection.getCacheStats()
+    assert stats['max_bytes'] == max_bytes
+    assert stats['nbytes'] <= max_bytes
+    assert stats['evictions'] > 0
+
+    # repeated queries in the same region hit the cache
+    collection.getSlabInfo(40.2, 140.2, 0.0)
+    stats2 = collection.getCacheStats()
+    assert stats2['misses'] == stats['misses']
+    assert stats2['hits'] > stats['hits']
+
+
+def test_slab_coverage():
+    tempdir = tempfile.mkdtemp()
+    try:
+        # kur and ryu overlap, alu crosses the antimeridian
+        _copy_slab_grids(tempdir, ['kur_slab2_%s_02.24.18.grd',
+                                   'ryu_slab2_%s_02.26.18.grd',
+                                   'alu_slab2_%s_02.23.18.grd'])
+        nocoverage = SlabCollection(tempdir)
+        build_slab_coverage(tempdir)
+        collection = SlabCollection(tempdir)
+        assert collection._coverage is not None
+
+        np.random.seed(4321)
+        lats = np.random.uniform(19, 68, 1000)
+        lons = np.random.uniform(116, 226, 1000)
+        lons[lons > 180] -= 360
+        df1 = nocoverage.getSlabInfoBatch(lats, lons, np.zeros(len(lats)))
+        df2 = collection.getSlabInfoBatch(lats, lons, np.zeros(len(lats)))
+        pd.testing.assert_frame_equal(df1, df2)
+        for i in range(0, len(lats), 10):
+            slabinfo1 = nocoverage.getSlabInfo(lats[i], lons[i], 0.0)
+            slabinfo2 = collection.getSlabInfo(lats[i], lons[i], 0.0)
+            assert slabinfo1.keys() == slabinfo2.keys()
+            for key, value in slabinfo1.items():
+                np.testing.assert_equal(value, slabinfo2[key])
+
+        # the raster is ignored once a depth grid changes
+        os.utime(os.path.join(tempdir, 'kur_slab2_dep_02.24.18.grd'), (0, 0))
+        assert SlabCollection(tempdir)._coverage is None
+    finally:
+        shutil.rmtree(tempdir)
+
+
+def test_slab_store():
+    tempdir = tempfile.mkdtemp()
+    try:
+        _copy_slab_grids(tempdir, ['kur_slab2_%s_02.24.18.grd',
+                                   'alu_slab2_%s_02.23.18.grd'])
+        nostore = SlabCollection(tempdir, preload=True)
+        build_slab_store(tempdir)
+        collection = SlabCollection(tempdir, preload=True)
+        for gslab in collection._slabs:
+            for data, gdict in gslab.getLoadedGrids().values():
+                assert isinstance(data, PackedGrid)
+        # empty tiles are not stored
+        assert (collection.getCacheStats()['nbytes'] <
+                nostore.getCacheStats()['nbytes'])
+
+        np.random.seed(8765)
+        lats = np.random.uniform(35, 68, 1000)
+        lons = np.random.uniform(121, 226, 1000)
+        lons[lons > 180] -= 360
+        df1 = nostore.getSlabInfoBatch(lats, lons, np.zeros(len(lats)))
+        df2 = collection.getSlabInfoBatch(lats, lons, np.zeros(len(lats)))
+        pd.testing.assert_frame_equal(df1, df2)
+        for i in range(0, len(lats), 10):
+            slabinfo1 = nostore.getSlabInfo(lats[i], lons[i], 0.0)
+            slabinfo2 = collection.getSlabInfo(lats[i], lons[i], 0.0)
+            assert slabinfo1.keys() == slabinfo2.keys()
+            for key, value in slabinfo1.items():
+                np.testing.assert_equal(value, slabinfo2[key])
+
+        # grids that have changed since the store was built are read directly
+        depth_file = os.path.join(tempdir, 'kur_slab2_dep_02.24.18.grd')
+        os.utime(depth_file, (0, 0))
+        collection = SlabCollection(tempdir, preload=True)
+        for gslab in collection._slabs:
+            for grid_file, (data, gdict) in gslab.getLoadedGrids().items():
+                assert isinstance(data, PackedGrid) == (grid_file != depth_file)
+    finally:
+        shutil.rmtree(tempdir)
+
+
+def test_slab_manifest():
+    tempdir = tempfile.mkdtemp()
+    try:
+        _copy_slab_grids(tempdir, ['kur_slab2_%s_02.24.18.grd',
+                                   'izu_slab2_%s_02.24.18.grd'])
+        assert read_slab_manifest(tempdir) is None
+        scanned = SlabCollection(tempdir)
+        build_slab_manifest(tempdir)
+        manifest = read_slab_manifest(tempdir)
+        slabs = {slab['region']: slab for slab in manifest['slabs']}
+        assert sorted(slabs.keys()) == ['izu', 'kur']
+        assert slabs['kur']['version'] == 'slab2_02.24.18'
+        assert slabs['kur']['files']['unc'] == 'kur_slab2_unc_02.24.18.grd'
+        assert slabs['kur']['maximum_interface_depth'] == 54.0
+        assert slabs['kur']['shape'] == [slabs['kur']['geodict']['ny'],
+                                         slabs['kur']['geodict']['nx']]
+
+        # geodicts come from the manifest
+        collection = SlabCollection(tempdir)
+        for gslab in collection._slabs:
+            assert gslab._geodict is not None
+        for lat, lon in [(40.0, 140.0), (30.0, 140.0), (34.0, 140.5),
+                         (0.0, 0.0)]:
+            slabinfo1 = scanned.getSlabInfo(lat, lon, 0.0)
+            slabinfo2 = collection.getSlabInfo(lat, lon, 0.0)
+            assert slabinfo1.keys() == slabinfo2.keys()
+            for key, value in slabinfo1.items():
+                np.testing.assert_equal(value, slabinfo2[key])
+
+        # the manifest is trusted until slab models are added (or removed),
+        # which is detected from the modification time of the folder.  The
+        # folder is made older first, so that it is newer after phi is added
+        # however coarse the file system clock.
+        depth_file = os.path.join(tempdir, 'kur_slab2_dep_02.24.18.grd')
+        os.utime(depth_file, (0, 0))
+        assert read_slab_manifest(tempdir) is not None
+        os.utime(tempdir, (0, 0))
+        assert read_slab_manifest(tempdir) is None
+        build_slab_manifest(tempdir)
+        assert read_slab_manifest(tempdir) is not None
+        _copy_slab_grids(tempdir, ['phi_slab2_%s_02.26.18.grd'],
+                         interface_depths=False)
+        assert read_slab_manifest(tempdir) is None
+        collection = SlabCollection(tempdir)
+        assert len(collection._slabs) == 3
+    finally:
+        shutil.rmtree(tempdir)
+
+
+def test_windowed():
+    homedir = os.path.dirname(os.path.abspath(
+        __file__))  # where is this script?
+    slabdir = os.path.join(homedir, '..', '..', 'strec', 'data', 'slabs')
+    collection = SlabCollection(slabdir)
+    windowed = SlabCollection(slabdir, windowed=True)
+    # inside kur, inside phi, on the edges of alu, outside
+    points = [(40.0, 140.0), (10.0, 126.0), (45.0, 161.0), (68.0, -134.0),
+              (52.0, -175.0), (0.0, -30.0)]
+    for lat, lon in points:
+        slabinfo1 = collection.getSlabInfo(lat, lon, 0.0)
+        slabinfo2 = windowed.getSlabInfo(lat, lon, 0.0)
+        assert slabinfo1.keys() == slabinfo2.keys()
+        for key, value in slabinfo1.items():
+            np.testing.assert_equal(value, slabinfo2[key])
+    # slab surface distances are measured to windows of the slab depth grids
+    for lat, lon, depth in [(40.0, 140.0, 50.0), (10.0, 126.0, 300.0),
+                            (52.0, -175.0, 0.0)]:
+        slabdist1 = collection.getSlabDistance(lat, lon, depth)
+        slabdist2 = windowed.getSlabDistance(lat, lon, depth)
+        assert slabdist1['region'] == slabdist2['region']
+        for key in ['distance', 'lat', 'lon', 'depth']:
+            np.testing.assert_allclose(slabdist1[key], slabdist2[key])
+    # windows are not kept in memory
+    assert windowed.getCacheStats()['ngrids'] == 0
+
+
+def test_grid_sampler():
+    homedir = os.path.dirname(os.path.abspath(
+        __file__))  # where is this script?
+    slabdir = os.path.join(homedir, '..', '..', 'strec', 'data', 'slabs')
+    depth_file = os.path.join(slabdir, 'kur_slab2_dep_02.24.18.grd')
+    grid = GMTGrid.load(depth_file)
+    gdict = grid.getGeoDict()
+    data = grid.getData()
+
+    # nearest neighbor values match Grid2D.getValue()
+    np.random.seed(10)
+    lats = np.random.uniform(gdict.ymin, gdict.ymax, 200)
+    lons = np.random.uniform(gdict.xmin, gdict.xmax, 200)
+    sampler = GridSampler(gdict, lats, lons)
+    values = sampler.sample(data)
+    for lat, lon, value in zip(lats, lons, values):
+        np.testing.assert_equal(value, grid.getValue(lat, lon))
+    assert GridSampler(gdict, 40.0, 140.0).sample(data) == grid.getValue(40.0, 140.0)
+    # points outside the grid are NaN
+    assert np.isnan(GridSampler(gdict, 0.0, 0.0).sample(data))
+
+    # bilinear values are the node values at grid nodes...
+    rows = np.arange(0, gdict.ny, 37)
+    cols = np.arange(0, gdict.nx, 23)[:len(rows)]
+    rows = rows[:len(cols)]
+    nlats = gdict.ymax - rows * gdict.dy
+    nlons = gdict.xmin + cols * gdict.dx
+    bilinear = GridSampler(gdict, nlats, nlons, method='bilinear').sample(data)
+    np.testing.assert_allclose(bilinear, data[rows, cols], rtol=1e-6)
+    # ...and the mean of the surrounding nodes at cell centers
+    valid = ~np.isnan(data)
+    blocks = valid[:-1, :-1] & valid[1:, :-1] & valid[:-1, 1:] & valid[1:, 1:]
+    nodes = np.argwhere(blocks)
+    row, col = nodes[len(nodes) // 2]
+    cell = data[row:row + 2, col:col + 2]
+    clat = gdict.ymax - (row + 0.5) * gdict.dy
+    clon = gdict.xmin + (col + 0.5) * gdict.dx
+    value = GridSampler(gdict, clat, clon, method='bilinear').sample(data)
+    np.testing.assert_allclose(value, cell.astype(np.float64).mean(), rtol=1e-6)
+
+    # angles are interpolated across north
+    angles = np.array([[359.0, 1.0], [359.0, 1.0]])
+    adict = GeoDict({'xmin': 140.0, 'xmax': 140.1, 'ymin': 40.0, 'ymax': 40.1,
+                     'dx': 0.1, 'dy': 0.1, 'nx': 2, 'ny': 2})
+    sampler = GridSampler(adict, adict.ymax, adict.xmin + adict.dx / 2,
+                          method='bilinear')
+    np.testing.assert_allclose(sampler.sample(angles), 180.0)
+    np.testing.assert_allclose(np.mod(sampler.sample(angles, circular=True) + 1, 360),
+                               1.0, atol=1e-9)
+
+    # bilinear slab lookups are close to nearest neighbor ones
+    collection = SlabCollection(slabdir)
+    slabinfo1 = collection.getSlabInfo(40.0, 140.0, 0.0)
+    slabinfo2 = collection.getSlabInfo(40.0, 140.0, 0.0, method='bilinear')
+    assert slabinfo2['region'] == slabinfo1['region']
+    np.testing.assert_allclose(slabinfo2['depth'], slabinfo1['depth'], atol=2)
+    np.testing.assert_allclose(slabinfo2['dip'], slabinfo1['dip'], atol=2)
+
+
+def test_profile_mesh():
+    homedir = os.path.dirname(os.path.abspath(
+        __file__))  # where is this script?
+    slabdir = os.path.join(homedir, '..', '..', 'strec', 'data', 'slabs')
+    collection = SlabCollection(slabdir)
+
+    # trench normal profile across the Kuril slab
+    df = collection.getProfile(41.0, 146.0, 43.0, 139.0, npoints=51)
+    assert len(df) == 51
+    assert list(df.columns[:3]) == ['lat', 'lon', 'distance']
+    np.testing.assert_allclose([df['lat'].iloc[0], df['lon'].iloc[0]],
+                               [41.0, 146.0])
+    np.testing.assert_allclose([df['lat'].iloc[-1], df['lon'].iloc[-1]],
+                               [43.0, 139.0])
+    assert df['distance'].iloc[0] == 0
+    assert (np.diff(df['distance']) > 0).all()
+    # the slab deepens away from the trench
+    depths = df['depth'].values
+    assert np.nanmax(depths) > np.nanmin(depths) + 100
+    for i in range(0, len(df), 10):
+        row = df.iloc[i]
+        slabinfo = collection.getSlabInfo(row['lat'], row['lon'], 0.0)
+        np.testing.assert_equal(row['depth'], slabinfo.get('depth', np.nan))
+
+    # profiles may cross the antimeridian
+    df = collection.getProfile(52.0, 175.0, 52.0, -175.0, npoints=11)
+    assert (df['region'] == 'alu').all()
+    assert (np.abs(df['lon']) <= 180).all()
+
+    lats = np.arange(30, 50.5, 1.0)
+    lons = np.arange(130, 150.5, 2.0)
+    mesh = collection.getMesh(lats, lons)
+    assert mesh['depth'].shape == (len(lats), len(lons))
+    for i in [0, 10, 15]:
+        for j in [0, 5, 8]:
+            slabinfo = collection.getSlabInfo(lats[i], lons[j], 0.0)
+            assert mesh['region'][i, j] == slabinfo.get('region', '')
+            np.testing.assert_equal(mesh['depth'][i, j],
+                                    slabinfo.get('depth', np.nan))
+
+
+def test_slab_distance():
+    tempdir = tempfile.mkdtemp()
+    try:
+        region = 'kur_slab2_%s_02.24.18.grd'
+        _copy_slab_grids(tempdir, [region], interface_depths=False)
+        collection = SlabCollection(tempdir)
+        lat, lon = 40.0, 142.0
+        slabinfo = collection.getSlabInfo(lat, lon, 0.0)
+
+        # points on the slab surface are on it
+        slabdist = collection.getSlabDistance(lat, lon, slabinfo['depth'])
+        assert slabdist['region'] == 'kur'
+        np.testing.assert_allclose(slabdist['distance'], 0.0, atol=1e-6)
+        np.testing.assert_allclose([slabdist['lat'], slabdist['lon']],
+                                   [lat, lon])
+
+        # above a dipping slab the nearest point on the slab is not straight
+        # down, and is about the vertical distance times cos(dip) away.
+        depth = slabinfo['depth'] - 20.0
+        slabdist = collection.getSlabDistance(lat, lon, depth)
+        expected = 20.0 * np.cos(np.radians(slabinfo['dip']))
+        assert slabdist['distance'] < 20.0
+        np.testing.assert_allclose(slabdist['distance'], expected, rtol=0.05)
+
+        # no slab models contain the epicenter
+        assert collection.getSlabDistance(0.0, 0.0, 10.0) == {}
+        assert collection.getSlabDistance(lat, lon, depth, region='alu') == {}
+
+        # cached trees give the same distances
+        assert read_surface_tree(os.path.join(tempdir, region % 'dep')) is None
+        tree_files = build_surface_trees(tempdir)
+        assert len(tree_files) == 1
+        cached = SlabCollection(tempdir)
+        assert read_surface_tree(os.path.join(tempdir, region % 'dep')) is not None
+        assert cached.getSlabDistance(lat, lon, depth) == slabdist
+        np.random.seed(13)
+        lats = np.random.uniform(35, 55, 100)
+        lons = np.random.uniform(140, 165, 100)
+        depths = np.random.uniform(0, 200, 100)
+        gslab1 = collection._slabs[0]
+        gslab2 = cached._slabs[0]
+        for result1, result2 in zip(gslab1.getSurfaceDistance(lats, lons, depths),
+                                    gslab2.getSurfaceDistance(lats, lons, depths)):
+            np.testing.assert_array_equal(result1, result2)
+        # ... but are ignored when the slab grid changes
+        os.utime(os.path.join(tempdir, region % 'dep'), (0, 0))
+        assert read_surface_tree(os.path.join(tempdir, region % 'dep')) is None
+    finally:
+        shutil.rmtree(tempdir)
+
+
+def test_nearest_slab():
+    # edges of the data in a small grid
+    data = np.full((5, 6), np.nan)
+    data[1:4, 1:5] = -10.0
+    gdict = GeoDict({'xmin': 0.0, 'xmax': 5.0, 'ymin': 0.0, 'ymax': 4.0,
+                     'dx': 1.0, 'dy': 1.0, 'nx': 6, 'ny': 5})
+    lats, lons, depths = compute_slab_boundary(data, gdict)
+    assert len(lats) == 12 - 2
+    assert (depths == 10.0).all()
+    assert (2.0, 2.0) not in zip(lats, lons)
+    assert (2.0, 1.0) in zip(lats, lons)
+
+    tempdir = tempfile.mkdtemp()
+    try:
+        _copy_slab_grids(tempdir, ['kur_slab2_%s_02.24.18.grd',
+                                   'izu_slab2_%s_02.24.18.grd'],
+                         interface_depths=False)
+        collection = SlabCollection(tempdir)
+        # south of the Izu-Bonin slab
+        lat, lon = 8.0, 142.0
+        assert collection.getSlabInfo(lat, lon, 0.0) == {}
+        nearest = collection.getNearestSlab(lat, lon)
+        assert nearest['region'] == 'izu'
+        assert nearest['lat'] > lat
+        assert nearest['depth'] > 0
+        # distance is the great circle distance to the edge node
+        dlat = np.radians(nearest['lat'] - lat)
+        dlon = np.radians(nearest['lon'] - lon)
+        h = (np.sin(dlat / 2) ** 2 + np.cos(np.radians(lat)) *
+             np.cos(np.radians(nearest['lat'])) * np.sin(dlon / 2) ** 2)
+        np.testing.assert_allclose(nearest['distance'],
+                                   2 * 6371.0 * np.arcsin(np.sqrt(h)))
+
+        np.random.seed(14)
+        lats = np.random.uniform(-10, 70, 200)
+        lons = np.random.uniform(100, 200, 200)
+        lons[lons > 180] -= 360
+        df = collection.getNearestSlabBatch(lats, lons)
+        for i in range(0, len(lats), 20):
+            nearest = collection.getNearestSlab(lats[i], lons[i])
+            for key, value in nearest.items():
+                assert df[key].iloc[i] == value
+
+        # precomputed boundaries give the same results
+        build_slab_boundaries(tempdir)
+        cached = SlabCollection(tempdir)
+        assert SlabBoundaries.load(tempdir, cached._depth_files) is not None
+        pd.testing.assert_frame_equal(cached.getNearestSlabBatch(lats, lons), df)
+    finally:
+        shutil.rmtree(tempdir)
+
+
 def test_inside_trench():
     homedir = os.path.dirname(os.path.abspath(
         __file__))  # where is this script?
@@ -121,6 +653,20 @@ def test_outside_grid():
 
 if __name__ == '__main__':
     test_inside_grid()
+    test_collection_reuse()
+    test_slab_info_batch()
+    test_mapped_grids()
+    test_slab_index()
+    test_occupancy_masks()
+    test_grid_cache()
+    test_slab_coverage()
+    test_slab_store()
+    test_slab_manifest()
+    test_windowed()
+    test_grid_sampler()
+    test_profile_mesh()
+    test_slab_distance()
+    test_nearest_slab()
     test_inside_trench()
     test_outside_grid()
     test_grid_slab()
@@ -246,6 +246,61 @@ def test_subtype():
     assert results1['SlabModelRegion'] == 'Central America'
 
 
+def test_subtype_sweep():
+    selector = SubductionSelector()
+
+    # chile 2010, with tensor parameters
+    lat = -36.122
+    lon = -72.898
+    depths = [-5.0, 0.0, 22.9, 60.0, 150.0]
+    tensor_params = {'source': 'duputel',
+                     'type': 'Mww',
+                     'NP1': {'strike': 178,
+                             'dip': 77,
+                             'rake': 86},
+                     'NP2': {'strike': 17,
+                             'dip': 14,
+                             'rake': 108},
+                     'T': {'value': 2.236e+22, 'plunge': 58, 'azimuth': 82},
+                     'N': {'value': 0.040e+22, 'plunge': 4, 'azimuth': 179},
+                     'P': {'value': -2.276e+22, 'plunge': 32, 'azimuth': 272}}
+    df = selector.getSubductionTypeSweep(lat, lon, depths,
+                                         tensor_params=tensor_params)
+    assert len(df) == len(depths)
+    np.testing.assert_array_equal(df['depth'], depths)
+    # each row is what getSubductionType() returns for that depth
+    for depth, (_, row) in zip(depths, df.iterrows()):
+        results = selector.getSubductionType(lat, lon, depth,
+                                             tensor_params=tensor_params)
+        res, msg = cmp_dicts(results.to_dict(), row.drop('depth').to_dict())
+        assert res, msg
+    # only the distance to the slab changes with depth
+    assert (df['SlabModelDepth'] == df['SlabModelDepth'].iloc[0]).all()
+    assert df['SlabModelDistance'].nunique() > 1
+
+    # composite moment tensor
+    df = selector.getSubductionTypeSweep(2.321, 128.132, [10.0, 21.7, 40.0])
+    assert (df['TensorType'] == 'composite').all()
+
+    # a single depth, as a vector or a scalar
+    for depth in [[22.9], 22.9]:
+        df = selector.getSubductionTypeSweep(lat, lon, depth,
+                                             tensor_params=tensor_params)
+        assert len(df) == 1
+        results = selector.getSubductionType(lat, lon, 22.9,
+                                             tensor_params=tensor_params)
+        res, msg = cmp_dicts(results.to_dict(),
+                             df.iloc[0].drop('depth').to_dict())
+        assert res, msg
+
+    # no depths
+    try:
+        selector.getSubductionTypeSweep(lat, lon, [])
+        assert 1 == 2
+    except ValueError:
+        pass
+
+
 def test_get_subduction_by_id():
     selector = SubductionSelector()
     # Tohoku, should have an online moment tensor
@@ -266,6 +321,7 @@ def block_test_multiple_slabs():
 if __name__ == '__main__':
     test_get_focal_mechanism()
     test_subtype()
+    test_subtype_sweep()
     test_get_subduction_by_id()
     # test_multiple_slabs()
     test_get_online_tensor()